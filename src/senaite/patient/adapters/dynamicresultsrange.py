@@ -198,6 +198,23 @@ class PatientDynamicResultsRange(DynamicResultsRange):
         # 3) Nada encontrado
         return None
 
+    @property
+    @memoize
+    def age_at_sampling(self):
+        """Edad en días al muestrear. Usa el valor almacenado en el AR y solo
+        la calcula desde DOB y fecha de muestreo si aún no está guardada."""
+        try:
+            age = self.analysisrequest.getAgeAtSampling()
+        except Exception:
+            age = None
+        if age is not None:
+            return age
+        dob_d = self.dob_date
+        smp_d = self.sampled_date
+        if not dob_d or not smp_d:
+            return None
+        return (smp_d - dob_d).days
+
     @property
     @memoize
     def ansi_dob(self):
@@ -303,14 +320,11 @@ class PatientDynamicResultsRange(DynamicResultsRange):
         max_age = _to_int_or_none(max_age)
 
         if min_age is not None or max_age is not None:
-            # cuando la fila trae límites de edad, NECESITAMOS DOB + sampled
-            dob_d = self.dob_date
-            smp_d = self.sampled_date
-            if not dob_d or not smp_d:
+            # cuando la fila trae límites de edad, NECESITAMOS la edad en días
+            age_days = self.age_at_sampling
+            if age_days is None:
                 return False
 
-            # edad en días (inclusivo)
-            age_days = (smp_d - dob_d).days
             if age_days < 0:
                 # DOB futuro improbable → no aplica
                 return False
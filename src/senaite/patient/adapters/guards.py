@@ -18,11 +18,126 @@
 # Copyright 2020-2025 by it's authors.
 # Some rights reserved, see README and LICENSE.
 
+import json
+
 from bika.lims import api
 from bika.lims.interfaces import IGuardAdapter
+from senaite.core.catalog import SAMPLE_CATALOG
 from senaite.patient import check_installed
+from zope.annotation.interfaces import IAnnotations
 from zope.interface import implements
 
+# Key of the request annotation where the guard results are memoized
+GUARDS_CACHE = "senaite.patient.guards"
+
+# Registry records that allow a transition of samples with a temporary MRN
+TEMP_MRN_RECORDS = {
+    "verify": "senaite.patient.verify_temp_mrn",
+    "publish": "senaite.patient.publish_temp_mrn",
+}
+
+
+def get_guards_cache(request=None):
+    """Returns the cache of the guards for the current request
+
+    Listings and bulk transitions evaluate the guards of the same samples
+    many times within a single request, so the temporary MRN flags, the
+    registry records and the guard results are kept in the request
+    """
+    request = request or api.get_request()
+    if request is None:
+        # not within a request (e.g. scripts), no memoization
+        return {"temp_mrn": {}, "registry": {}, "guards": {}}
+    annotations = IAnnotations(request)
+    cache = annotations.get(GUARDS_CACHE)
+    if cache is None:
+        cache = {"temp_mrn": {}, "registry": {}, "guards": {}}
+        annotations[GUARDS_CACHE] = cache
+    return cache
+
+
+def invalidate_guards(sample):
+    """Flushes the memoized values of the sample for the current request
+    """
+    uid = api.get_uid(sample)
+    cache = get_guards_cache()
+    cache["temp_mrn"].pop(uid, None)
+    for key in filter(lambda key: key[0] == uid, cache["guards"].keys()):
+        del cache["guards"][key]
+
+
+def get_registry_flag(name):
+    """Returns the value of the registry record, memoized per request
+    """
+    registry = get_guards_cache()["registry"]
+    if name not in registry:
+        registry[name] = api.get_registry_record(name)
+    return registry[name]
+
+
+def seed_temporary_mrn(brains):
+    """Stores the temporary MRN flags of the samples from the metadata of the
+    sample catalog brains, e.g. from the rows of a listing
+    """
+    flags = get_guards_cache()["temp_mrn"]
+    for brain in brains:
+        value = getattr(brain, "isMedicalRecordTemporary", None)
+        if value is None or callable(value):
+            # metadata column not available
+            continue
+        flags[brain.UID] = bool(value)
+
+
+def prefetch_temporary_mrn(uids):
+    """Stores the temporary MRN flags of the samples with the given UIDs,
+    with a single query against the is_temporary_mrn index
+    """
+    flags = get_guards_cache()["temp_mrn"]
+    uids = filter(lambda uid: uid not in flags, set(uids or []))
+    if not uids:
+        return
+    query = {"UID": uids, "is_temporary_mrn": True}
+    temporary = set([brain.UID for brain in api.search(query, SAMPLE_CATALOG)])
+    for uid in uids:
+        flags[uid] = uid in temporary
+
+
+def get_selected_uids(request=None):
+    """Returns the UIDs of the samples selected in a listing, either from the
+    form of a bulk transition or from the JSON payload of the listing
+    """
+    request = request or api.get_request()
+    if request is None:
+        return []
+    uids = request.form.get("uids")
+    if not uids:
+        body = request.get("BODY") or ""
+        if not body.startswith("{"):
+            return []
+        try:
+            uids = json.loads(body).get("uids")
+        except ValueError:
+            return []
+    if api.is_string(uids):
+        uids = uids.split(",")
+    return filter(api.is_uid, uids or [])
+
+
+def is_temporary_mrn(sample):
+    """Returns whether the sample has a temporary MRN, memoized per request.
+    The flags of all the samples selected in the request are fetched at once
+    from the catalog
+    """
+    uid = api.get_uid(sample)
+    flags = get_guards_cache()["temp_mrn"]
+    if uid not in flags:
+        selected = get_selected_uids()
+        if uid in selected:
+            prefetch_temporary_mrn(selected)
+    if uid not in flags:
+        flags[uid] = sample.isMedicalRecordTemporary()
+    return flags[uid]
+
 
 class SampleGuardAdapter(object):
     implements(IGuardAdapter)
@@ -34,29 +149,31 @@ class SampleGuardAdapter(object):
     def guard(self, action):
         func_name = "guard_{}".format(action)
         func = getattr(self, func_name, None)
-        if func:
-            return func()
+        if not func:
+            # No guard intercept here
+            return True
+
+        guards = get_guards_cache()["guards"]
+        key = (api.get_uid(self.context), action)
+        if key not in guards:
+            guards[key] = func()
+        return guards[key]
 
-        # No guard intercept here
-        return True
+    def is_allowed_with_temp_mrn(self, action):
+        """Returns whether the action is allowed for the sample, depending on
+        whether it has a temporary MRN
+        """
+        if not is_temporary_mrn(self.context):
+            return True
+        # Check whether users can transition samples with a temporary MRN
+        return bool(get_registry_flag(TEMP_MRN_RECORDS[action]))
 
     def guard_verify(self):
         """Returns whether the sample can be verified
         """
-        temp_mrn = self.context.isMedicalRecordTemporary()
-        if temp_mrn:
-            # Check whether users can verify samples with a temporary MRN
-            if not api.get_registry_record("senaite.patient.verify_temp_mrn"):
-                return False
-
-        return True
+        return self.is_allowed_with_temp_mrn("verify")
 
     def guard_publish(self):
         """Returns whether the sample can be published
         """
-        temp_mrn = self.context.isMedicalRecordTemporary()
-        if temp_mrn:
-            if not api.get_registry_record("senaite.patient.publish_temp_mrn"):
-                return False
-
-        return True
+        return self.is_allowed_with_temp_mrn("publish")
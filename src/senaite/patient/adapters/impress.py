@@ -18,23 +18,102 @@
 # Copyright 2020-2025 by it's authors.
 # Some rights reserved, see README and LICENSE.
 
+import json
+
+from bika.lims import api
 from bika.lims.interfaces import IAnalysisRequest
+from senaite.core.catalog import SAMPLE_CATALOG
 from senaite.impress.interfaces import IGroupKeyProvider
+from senaite.patient.api import prefetch_patients
+from zope.annotation.interfaces import IAnnotations
 from zope.component import adapter
 from zope.interface import implementer
 
+# Key of the request annotation where the group keys are kept
+GROUP_KEYS_CACHE = "senaite.patient.group_keys"
+
+
+def to_group_key(client_uid, mrn):
+    """Returns the key to group the samples of a client and patient
+    """
+    if mrn:
+        return "%s_%s" % (client_uid, mrn)
+    return client_uid
+
+
+def get_group_keys(uids, prefetch=True):
+    """Returns a dict of sample UID -> group key, computed from the metadata
+    of the sample catalog with a single query
+
+    :param uids: UIDs of the samples to publish
+    :param prefetch: resolve the patients of the samples in bulk as well
+    """
+    uids = filter(None, set(uids or []))
+    if not uids:
+        return {}
+    query = {"UID": uids}
+    brains = api.search(query, SAMPLE_CATALOG)
+    keys = {}
+    for brain in brains:
+        mrn = brain.getMedicalRecordNumberValue
+        keys[brain.UID] = to_group_key(brain.getClientUID, mrn)
+    if prefetch:
+        # patients are rendered by the report templates
+        prefetch_patients([brain.getPatientUID for brain in brains])
+    return keys
+
+
+def get_publish_uids(request=None):
+    """Returns the UIDs of the samples to publish, either from the items of
+    the publish view or from the JSON payload of its AJAX calls
+    """
+    request = request or api.get_request()
+    if request is None:
+        return []
+    items = request.form.get("items")
+    if not items:
+        body = request.get("BODY") or ""
+        if not body.startswith("{"):
+            return []
+        try:
+            items = json.loads(body).get("items")
+        except ValueError:
+            return []
+    if api.is_string(items):
+        items = items.split(",")
+    return filter(api.is_uid, items or [])
+
 
 @implementer(IGroupKeyProvider)
 @adapter(IAnalysisRequest)
 class GroupKeyProvider(object):
     """Provide a grouping key for PDF separation
+
+    The keys of all the samples to publish are computed at once from the
+    catalog when the key of the first sample is requested
     """
     def __init__(self, context):
         self.context = context
 
+    def get_cache(self):
+        request = api.get_request()
+        if request is None:
+            return {}
+        annotations = IAnnotations(request)
+        cache = annotations.get(GROUP_KEYS_CACHE)
+        if cache is None:
+            cache = annotations[GROUP_KEYS_CACHE] = {}
+        return cache
+
     def __call__(self):
-        client_uid = self.context.getClientUID()
-        mrn = self.context.getMedicalRecordNumberValue()
-        if mrn:
-            return "%s_%s" % (client_uid, mrn)
-        return client_uid
+        uid = api.get_uid(self.context)
+        cache = self.get_cache()
+        if uid not in cache:
+            uids = get_publish_uids()
+            if uid in uids:
+                cache.update(get_group_keys(uids))
+        if uid not in cache:
+            client_uid = self.context.getClientUID()
+            mrn = self.context.getMedicalRecordNumberValue()
+            cache[uid] = to_group_key(client_uid, mrn)
+        return cache[uid]
@@ -18,6 +18,9 @@
 # Copyright 2020-2025 by it's authors.
 # Some rights reserved, see README and LICENSE.
 
+from cgi import escape
+from datetime import timedelta
+
 from bika.lims import api
 from bika.lims.utils import get_link
 from plone.memoize.instance import memoize
@@ -26,9 +29,13 @@ from senaite.app.listing.interfaces import IListingView
 from senaite.app.listing.interfaces import IListingViewAdapter
 from senaite.app.listing.utils import add_column
 from senaite.app.listing.utils import add_review_state
+from senaite.core.api import dtime
 from senaite.patient import check_installed
 from senaite.patient import messageFactory as _
+from senaite.patient.adapters.guards import is_temporary_mrn
+from senaite.patient.adapters.guards import seed_temporary_mrn
 from senaite.patient.api import get_patient_by_mrn
+from senaite.patient.api import get_previous_results
 from zope.component import adapts
 from zope.component import getMultiAdapter
 from zope.interface import implements
@@ -101,6 +108,22 @@ def _analysis_has_alert(a, brain=None):
 # /INFOLABSA
 
 
+def to_age_ymd(days, sampled):
+    """Devuelve la edad en formato ymd a partir de los días de edad al
+    muestrear y la fecha de muestreo
+    """
+    sampled = dtime.to_dt(sampled)
+    if days is None or not sampled:
+        return u""
+    try:
+        days = int(days)
+    except (TypeError, ValueError):
+        # metadata column not populated yet
+        return u""
+    birthdate = sampled - timedelta(days=days)
+    return dtime.get_ymd(birthdate, ref_date=sampled) or u""
+
+
 # Statuses to add. List of dicts
 ADD_STATUSES = [{
     "id": "temp_mrn",
@@ -129,6 +152,13 @@ ADD_COLUMNS = [
         "index": "medical_record_number",
         "after": "getId",
     }),
+    ("AgeAtSampling", {
+        "title": _("Age"),
+        "sortable": True,
+        "index": "age_at_sampling",
+        "toggle": False,
+        "after": "Patient",
+    }),
 ]
 
 
@@ -166,17 +196,24 @@ class SamplesListingAdapter(object):
 
     @check_installed(None)
     def folder_item(self, obj, item, index):
+        # Guardar el flag de MRN temporal desde la metadata del brain, así los
+        # guards de las transiciones de esta petición no lo recalculan
+        if api.is_brain(obj):
+            seed_temporary_mrn([obj])
+            # Edad al muestrear desde la metadata, sin despertar el objeto
+            item["AgeAtSampling"] = to_age_ymd(
+                getattr(obj, "getAgeAtSampling", None), obj.getDateSampled)
+
         # Resolver brain -> objeto si es posible
         try:
             obj = api.get_object(obj)
         except Exception:
             pass
 
-        # Icono MRN temporal (llamar si es método, o leer si es attr)
+        # Icono MRN temporal
         is_temp = False
         try:
-            attr = getattr(obj, "isMedicalRecordTemporary", False)
-            is_temp = attr() if callable(attr) else bool(attr)
+            is_temp = is_temporary_mrn(obj)
         except Exception:
             is_temp = False
 
@@ -239,7 +276,7 @@ class SamplesListingAdapter(object):
         # ===================== /INFOLABSA =================================================
 
         # Obtener el objeto Paciente
-        patient = self.get_patient_by_mrn(sample_patient_mrn)
+        patient = self.get_patient(obj, sample_patient_mrn)
 
         if not patient:
             return
@@ -274,6 +311,19 @@ class SamplesListingAdapter(object):
             # Si no podemos leer datos del paciente, dejamos lo que ya hay
             pass
 
+    def get_patient(self, sample, mrn):
+        if self.is_patient_context():
+            return self.context
+        uid = getattr(sample, "getPatientUID", None)
+        uid = uid() if callable(uid) else None
+        if uid:
+            return self.get_patient_by_uid(uid)
+        return self.get_patient_by_mrn(mrn)
+
+    @viewcache
+    def get_patient_by_uid(self, uid):
+        return api.get_object_by_uid(uid, default=None)
+
     @viewcache
     def get_patient_by_mrn(self, mrn):
         if not mrn:
@@ -313,3 +363,64 @@ class SamplesListingAdapter(object):
         """Check if the current context is a patient
         """
         return api.get_portal_type(self.context) == "Patient"
+
+
+class AnalysesListingAdapter(object):
+    """Adapter for the analyses listing of a sample, that displays the last
+    verified result of the patient for each analysis
+    """
+    adapts(IListingView)
+    implements(IListingViewAdapter)
+
+    # Priority order of this adapter over others
+    priority_order = 99999
+
+    def __init__(self, listing, context):
+        self.listing = listing
+        self.context = context
+
+    @property
+    @memoize
+    def patient(self):
+        uid = self.context.getPatientUID()
+        if not uid:
+            return None
+        return api.get_object_by_uid(uid, default=None)
+
+    @check_installed(None)
+    def before_render(self):
+        if not self.patient:
+            return
+        rv_keys = map(lambda r: r["id"], self.listing.review_states)
+        add_column(
+            listing=self.listing,
+            column_id="PreviousResult",
+            column_values={
+                "title": _("Previous result"),
+                "sortable": False,
+                "toggle": True,
+            },
+            after="Result",
+            review_states=rv_keys)
+
+    @check_installed(None)
+    def folder_item(self, obj, item, index):
+        if not self.patient:
+            return
+        # brain metadata only, lookups are done in the patient annotation
+        keyword = api.safe_getattr(obj, "getKeyword")
+        captured = api.safe_getattr(obj, "getResultCaptureDate")
+        results = get_previous_results(self.patient, keyword,
+                                       exclude=api.get_uid(obj),
+                                       before=captured)
+        if not results:
+            return
+        previous = results[0]
+        # results are free text entered by users, escape before rendering
+        result = escape(api.safe_unicode(previous["result"]), True)
+        sample = escape(api.safe_unicode(previous["sample"]), True)
+        date = dtime.to_localized_time(previous["date"])
+        date = escape(api.safe_unicode(date or u""), True)
+        item["PreviousResult"] = result.encode("utf8")
+        html = u"{} <small>({}, {})</small>".format(result, sample, date)
+        item["replace"]["PreviousResult"] = html.encode("utf8")
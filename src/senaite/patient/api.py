@@ -18,12 +18,27 @@
 # Copyright 2020-2025 by it's authors.
 # Some rights reserved, see README and LICENSE.
 
+import base64
+import json
+import time
+import unicodedata
 from datetime import datetime
 
+import transaction
+from BTrees.OOBTree import OOBTree
 from bika.lims import api
+from bika.lims.api.snapshot import supports_snapshots
+from bika.lims.api.snapshot import take_snapshot
+from DateTime import DateTime
 from senaite.core.api import dtime
+from senaite.core.behaviors import IClientShareableBehavior
+from senaite.core.catalog import ANALYSIS_CATALOG
+from senaite.core.catalog import SAMPLE_CATALOG
+from senaite.patient.config import GENDERS
 from senaite.patient.config import PATIENT_CATALOG
+from senaite.patient.config import SEXES
 from senaite.patient.permissions import AddPatient
+from zope.annotation.interfaces import IAnnotations
 from zope.deprecation import deprecate
 
 CLIENT_TYPE = "Client"
@@ -41,6 +56,26 @@ CLIENT_VIEW_ACTION = {
     "condition": "",
 }
 
+# Annotation key where the last change of a patient is stored
+CHANGE_STORAGE = "senaite.patient.change"
+
+# Seconds a change must be old before it is returned by the change feed. The
+# sequence of a change is taken when its transaction commits, so the lag only
+# has to cover the time from the start of the commit until it finishes
+CHANGE_FEED_LAG = 30
+
+# Annotation key where the last verified results of a patient are stored
+PREVIOUS_RESULTS_STORAGE = "senaite.patient.previous_results"
+
+# Number of verified results kept per analysis keyword
+PREVIOUS_RESULTS_SIZE = 5
+
+# Review states of the analyses whose results are kept as previous results
+PREVIOUS_RESULTS_STATES = ("verified", "published")
+
+# Key of the request annotation where the patients resolved by UID are kept
+PATIENTS_CACHE = "senaite.patient.patients"
+
 _marker = object()
 
 
@@ -130,6 +165,50 @@ def get_patient_by_mrn(mrn, full_object=True, include_inactive=False):
     return api.get_object(results[0])
 
 
+def get_patients_cache():
+    """Returns the patients resolved by UID within the current request
+    """
+    request = api.get_request()
+    if request is None:
+        return {}
+    annotations = IAnnotations(request)
+    cache = annotations.get(PATIENTS_CACHE)
+    if cache is None:
+        cache = annotations[PATIENTS_CACHE] = {}
+    return cache
+
+
+def get_patient_by_uid(uid, default=None):
+    """Get a patient by UID. Patients are resolved once per request
+
+    :param uid: UID of the patient
+    :param default: value to return if no patient is found
+    :returns: Patient or default
+    """
+    cache = get_patients_cache()
+    if uid not in cache:
+        cache[uid] = api.get_object_by_uid(uid, default=None)
+    return cache[uid] or default
+
+
+def prefetch_patients(uids):
+    """Resolves the patients with the given UIDs with a single catalog query,
+    so that later calls to `get_patient_by_uid` within the current request do
+    not hit the catalog. Returns the patients found
+
+    :param uids: UIDs of the patients
+    """
+    cache = get_patients_cache()
+    uids = filter(lambda uid: uid and uid not in cache, set(uids or []))
+    if not uids:
+        return []
+    query = {"portal_type": PATIENT_TYPE, "UID": uids}
+    patients = map(api.get_object, patient_search(query))
+    for patient in patients:
+        cache[api.get_uid(patient)] = patient
+    return patients
+
+
 def get_patient_catalog():
     """Returns the patient catalog
     """
@@ -158,6 +237,405 @@ def update_patient(patient, **values):
     patient.setAddress(values.get("address"))
     # reindex the new values
     patient.reindexObject()
+    mark_patient_changed(patient, "modified")
+
+
+def _normalize_text(value):
+    """Returns the value as a stripped unicode string, as the setters do
+    """
+    if value is None:
+        return u""
+    if not api.is_string(value):
+        value = u"{}".format(value)
+    return api.safe_unicode(value).strip()
+
+
+def _normalize_choice(choices):
+    """Returns a normalizer that maps the choice text to its key
+    """
+    def normalize(value):
+        value = api.safe_unicode(value or u"")
+        for key, text in choices:
+            if value == text:
+                return api.safe_unicode(key)
+        return value
+    return normalize
+
+
+def _normalize_date(value):
+    """Returns the date part of the value in ANSI format for comparison
+    """
+    if not value:
+        return None
+    return dtime.to_ansi(value, show_time=False) or None
+
+
+def _normalize_list(value):
+    """Returns the value as a list of records
+    """
+    return list(value or [])
+
+
+def _get_upsert_fields():
+    """Returns a list of (key, accessor field, setter name, normalizer) tuples
+    for the patient fields supported by `upsert_patient`
+    """
+    return [
+        ("firstname", "firstname", "setFirstname", _normalize_text),
+        ("middlename", "middlename", "setMiddlename", _normalize_text),
+        ("lastname", "lastname", "setLastname", _normalize_text),
+        ("maternal_lastname", "maternal_lastname", "setMaternalLastname",
+         _normalize_text),
+        ("sex", "sex", "setSex", _normalize_choice(SEXES)),
+        ("gender", "gender", "setGender", _normalize_choice(GENDERS)),
+        ("birthdate", "birthdate", "setBirthdate", _normalize_date),
+        ("estimated_birthdate", "estimated_birthdate",
+         "setEstimatedBirthdate", bool),
+        ("deceased", "deceased", "setDeceased", bool),
+        ("email", "email", "setEmail", _normalize_text),
+        ("phone", "phone", "setPhone", _normalize_text),
+        ("address", "address", "setAddress", _normalize_list),
+        ("identifiers", "identifiers", "setIdentifiers", _normalize_list),
+        ("marital_status", "marital_status", "setMaritalStatus",
+         _normalize_text),
+        ("races", "races", "setRaces", _normalize_list),
+        ("ethnicities", "ethnicities", "setEthnicities", _normalize_list),
+        ("email_report", "email_report", "setEmailReport", bool),
+    ]
+
+
+def upsert_patient(mrn, container=None, **values):
+    """Creates or updates the patient with the given MRN
+
+    Only the fields passed in as keyword arguments are considered, and only
+    those whose normalized value differs from the stored one are written.
+    The patient is neither reindexed nor snapshotted when nothing changed, so
+    that repeated calls with the same data (e.g. HIS/LIS feeds) are cheap.
+
+    :param mrn: Unique medical record number of the patient
+    :param container: Container for new patients. Defaults to patient folder
+    :param values: Field values keyed by the names used in `update_patient`
+    :returns: tuple of (patient, changes), where changes is a dict of field
+              name -> (old value, new value)
+    """
+    mrn = _normalize_text(mrn)
+    if not mrn:
+        raise ValueError("MRN is required")
+
+    patient = get_patient_by_mrn(mrn, include_inactive=True)
+    created = patient is None
+    if created:
+        if container is None:
+            container = get_patient_folder()
+        patient = api.create(container, PATIENT_TYPE)
+        patient.setMRN(mrn)
+
+    changes = {}
+    for key, field, setter, normalize in _get_upsert_fields():
+        if key not in values:
+            continue
+        value = values[key]
+        old = normalize(patient.accessor(field)(patient))
+        new = normalize(value)
+        if old == new:
+            continue
+        if key == "birthdate":
+            # store the date as datetime, as the field expects
+            value = dtime.to_dt(value) if value else None
+        elif normalize is _normalize_text:
+            # text setters do not accept None nor non-string values
+            value = new
+        getattr(patient, setter)(value)
+        changes[key] = (old, new)
+
+    if created:
+        changes["mrn"] = (None, mrn)
+
+    if not changes:
+        return patient, changes
+
+    patient.reindexObject()
+    mark_patient_changed(patient, "modified")
+
+    # keep the audit log in sync, as if the patient was edited
+    if not created and supports_snapshots(patient):
+        take_snapshot(patient, action="edit")
+
+    return patient, changes
+
+
+def mark_patient_changed(patient, kind):
+    """Stores the kind of change for the patient and assigns a new change
+    sequence when the transaction commits
+
+    The sequence is the time in microseconds when the transaction commits, so
+    it grows with every change and can be used to query the changes since a
+    given point in time, regardless of how long the transaction took.
+    Modifications of a patient created in the current transaction keep the
+    "created" kind.
+
+    :param patient: the patient that changed
+    :param kind: kind of change, e.g. "created", "modified", "deactivated"
+    """
+    txn = transaction.get()
+    change = get_patient_change(patient)
+    marked = getattr(patient, "_v_change_txn", None) is txn
+    if kind == "modified" and change.get("kind") == "created" and marked:
+        kind = "created"
+    annotations = IAnnotations(patient)
+    annotations[CHANGE_STORAGE] = {"seq": change.get("seq", 0), "kind": kind}
+    patient._v_change_txn = txn
+    if not marked:
+        txn.addBeforeCommitHook(set_change_seq, args=(patient, ))
+
+
+def set_change_seq(patient):
+    """Stores the sequence of the last change of the patient and reindexes it
+
+    Called when the transaction that changed the patient commits.
+    """
+    parent = api.get_parent(patient)
+    if parent._getOb(patient.getId(), None) is None:
+        # removed within the same transaction
+        return
+    change = get_patient_change(patient)
+    seq = int(time.time() * 1e6)
+    # keep the sequence monotonic for the same patient
+    seq = max(seq, change.get("seq", 0) + 1)
+    annotations = IAnnotations(patient)
+    annotations[CHANGE_STORAGE] = dict(change, seq=seq)
+    # the indexing queue might have been processed already
+    catalog = get_patient_catalog()
+    catalog.catalog_object(patient, api.get_path(patient),
+                           idxs=["patient_change_seq"])
+
+
+def get_patient_change(patient):
+    """Returns a dict with the sequence and kind of the last patient change
+    """
+    annotations = IAnnotations(patient)
+    return dict(annotations.get(CHANGE_STORAGE, {}))
+
+
+def to_change_token(seq, uids):
+    """Returns an opaque token for the given change sequence and UIDs
+    """
+    data = json.dumps({"s": seq, "u": uids})
+    return base64.urlsafe_b64encode(data)
+
+
+def from_change_token(token):
+    """Returns a tuple of (sequence, UIDs) from the given change token
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(str(token)))
+        return int(data["s"]), list(data["u"])
+    except (TypeError, ValueError, KeyError):
+        raise ValueError("Invalid token: {}".format(token))
+
+
+def get_patient_changes(token=None, limit=100):
+    """Returns the patient brains that changed since the given token
+
+    The query is a range scan of the `patient_change_seq` index. Brains are
+    sorted by the change sequence, and the token of the last brain allows to
+    get the next page. Patients that share the last sequence are kept in the
+    token, so that no change is returned twice or skipped.
+
+    :param token: opaque token returned by a previous call or None
+    :param limit: maximum number of brains to return
+    :returns: tuple of (brains, next token)
+    """
+    since, seen = 0, []
+    if token:
+        since, seen = from_change_token(token)
+
+    until = int((time.time() - CHANGE_FEED_LAG) * 1e6)
+    query = {
+        "portal_type": "Patient",
+        "patient_change_seq": {"query": [since, until], "range": "min:max"},
+        "sort_on": "patient_change_seq",
+        "sort_order": "ascending",
+    }
+    catalog = get_patient_catalog()
+    brains = catalog(query)
+
+    results = []
+    for brain in brains:
+        if brain.patient_change_seq == since and brain.UID in seen:
+            continue
+        results.append(brain)
+        if len(results) >= limit:
+            break
+
+    if not results:
+        return results, to_change_token(since, seen)
+
+    last = results[-1].patient_change_seq
+    uids = [brain.UID for brain in results
+            if brain.patient_change_seq == last]
+    if last == since:
+        uids = seen + uids
+    return results, to_change_token(last, uids)
+
+
+def get_analysis_patient(analysis):
+    """Returns the patient the sample of the analysis is assigned to
+    """
+    sample = analysis.getRequest()
+    uid = sample and sample.getPatientUID()
+    if not uid:
+        return None
+    return api.get_object_by_uid(uid, default=None)
+
+
+def add_previous_result(patient, analysis):
+    """Stores the result of the verified analysis as the last result of the
+    patient for the analysis keyword. Only the last results are kept
+    """
+    annotations = IAnnotations(patient)
+    storage = annotations.get(PREVIOUS_RESULTS_STORAGE)
+    if storage is None:
+        storage = OOBTree()
+        annotations[PREVIOUS_RESULTS_STORAGE] = storage
+
+    uid = api.get_uid(analysis)
+    date = analysis.getResultCaptureDate() or api.get_creation_date(analysis)
+    record = {
+        "uid": uid,
+        "result": analysis.getResult(),
+        "unit": analysis.getUnit(),
+        "date": date.timeTime(),
+        "sample": api.get_id(analysis.getRequest()),
+    }
+    keyword = analysis.getKeyword()
+    records = [r for r in storage.get(keyword, ()) if r["uid"] != uid]
+    records.append(record)
+    records.sort(key=lambda r: r["date"], reverse=True)
+    storage[keyword] = tuple(records[:PREVIOUS_RESULTS_SIZE])
+
+
+def remove_previous_result(patient, analysis):
+    """Removes the result of the analysis from the last results of the patient
+
+    :returns: True if the result was removed
+    """
+    storage = IAnnotations(patient).get(PREVIOUS_RESULTS_STORAGE)
+    keyword = analysis.getKeyword()
+    if not storage or keyword not in storage:
+        return False
+    uid = api.get_uid(analysis)
+    records = storage[keyword]
+    if uid not in [r["uid"] for r in records]:
+        return False
+    storage[keyword] = tuple([r for r in records if r["uid"] != uid])
+    return True
+
+
+def to_previous_result(brain):
+    """Returns the previous result record of the analysis catalog brain
+    """
+    date = brain.getResultCaptureDate or brain.created
+    return {
+        "uid": brain.UID,
+        "result": brain.getResult,
+        "unit": getattr(brain, "getUnit", None) or "",
+        "date": DateTime(date).timeTime(),
+        "sample": brain.getRequestID,
+    }
+
+
+def refresh_previous_results(patient, keywords, exclude_samples=None):
+    """Recomputes the last verified results of the patient for the analysis
+    keywords from the analysis catalog
+
+    :param patient: the patient object
+    :param keywords: list of analysis keywords to recompute
+    :param exclude_samples: UIDs of samples whose results must not be kept
+    """
+    exclude_samples = exclude_samples or []
+    query = {"portal_type": "AnalysisRequest",
+             "patient_uid": api.get_uid(patient)}
+    sample_uids = [brain.UID for brain in api.search(query, SAMPLE_CATALOG)
+                   if brain.UID not in exclude_samples]
+    records = dict([(keyword, []) for keyword in keywords])
+    if sample_uids:
+        query = {
+            "portal_type": "Analysis",
+            "getAncestorsUIDs": sample_uids,
+            "getKeyword": keywords,
+            "review_state": PREVIOUS_RESULTS_STATES,
+        }
+        for brain in api.search(query, ANALYSIS_CATALOG):
+            records[brain.getKeyword].append(to_previous_result(brain))
+
+    annotations = IAnnotations(patient)
+    storage = annotations.get(PREVIOUS_RESULTS_STORAGE)
+    if storage is None:
+        storage = OOBTree()
+        annotations[PREVIOUS_RESULTS_STORAGE] = storage
+    for keyword, values in records.items():
+        values.sort(key=lambda r: r["date"], reverse=True)
+        storage[keyword] = tuple(values[:PREVIOUS_RESULTS_SIZE])
+
+
+def move_previous_results(sample, old_patient, patient):
+    """Moves the verified results of the sample from the last results of the
+    old patient to the ones of the new patient
+
+    The last results of the old patient are recomputed for the keywords of
+    the results removed, so older results take their place
+    """
+    analyses = filter(
+        lambda an: api.get_review_status(an) in PREVIOUS_RESULTS_STATES,
+        sample.getAnalyses(full_objects=True))
+    keywords = set()
+    for analysis in analyses:
+        if old_patient and remove_previous_result(old_patient, analysis):
+            keywords.add(analysis.getKeyword())
+        if patient:
+            add_previous_result(patient, analysis)
+    if keywords:
+        refresh_previous_results(old_patient, list(keywords),
+                                 exclude_samples=[api.get_uid(sample)])
+
+
+def get_previous_results(patient, keyword, exclude=None, before=None):
+    """Returns the last verified results of the patient for the analysis
+    keyword, the most recent first
+
+    :param patient: the patient object
+    :param keyword: the analysis keyword
+    :param exclude: UID of an analysis whose result must not be returned
+    :param before: date, only results captured before are returned
+    :returns: list of dicts with the uid, result, unit, date and sample id
+    """
+    before = dtime.to_DT(before)
+    before = before.timeTime() if before else None
+    storage = IAnnotations(patient).get(PREVIOUS_RESULTS_STORAGE) or {}
+    records = []
+    for record in storage.get(keyword, ()):
+        if record["uid"] == exclude:
+            continue
+        if before is not None and record["date"] >= before:
+            continue
+        record = dict(record, date=DateTime(record["date"]))
+        records.append(record)
+    return records
+
+
+def get_previous_result(analysis):
+    """Returns the last verified result of the same patient and analysis
+    keyword than the given analysis, captured before the result of the
+    analysis, or None
+    """
+    patient = get_analysis_patient(analysis)
+    if not patient:
+        return None
+    uid = api.get_uid(analysis)
+    results = get_previous_results(patient, analysis.getKeyword(), exclude=uid,
+                                   before=analysis.getResultCaptureDate())
+    return results[0] if results else None
 
 
 @deprecate("Use senaite.core.api.dtime.to_dt instead")
@@ -263,6 +741,66 @@ def get_relative_delta(from_date, to_date=None):
     return dtime.get_relativedelta(from_date, to_date)
 
 
+def to_sortable_name(value):
+    """Returns the name folded for sorting: in lowercase, without accents nor
+    punctuation, and with the Spanish collation of "ñ", that sorts after "n"
+
+    :param value: name to fold
+    :returns: the folded name
+    :rtype: unicode
+    """
+    value = unicodedata.normalize("NFC", api.safe_unicode(value or u""))
+    # "~" sorts after all letters, so "ñ" sorts between "n" and "o"
+    value = value.lower().replace(u"\xf1", u"n~")
+    value = unicodedata.normalize("NFKD", value)
+    value = u"".join([c for c in value if not unicodedata.combining(c)])
+    value = u"".join([c for c in value if c.isalnum() or c in u" ~"])
+    return u" ".join(value.split())
+
+
+def get_sortable_name(patient):
+    """Returns the key to sort the patient by name: lastnames first, then the
+    firstname and middlename, folded for sorting. The UID of the patient is
+    appended, so that the key is unique and listings can be paginated after
+    a given key
+
+    :param patient: Patient object
+    :returns: the sort key, UTF-8 encoded
+    :rtype: str
+    """
+    parts = [
+        patient.getLastname(),
+        patient.getMaternalLastname(),
+        patient.getFirstname(),
+        patient.getMiddlename(),
+    ]
+    name = u" ".join(filter(None, map(to_sortable_name, parts)))
+    if not name:
+        name = to_sortable_name(patient.getFullname())
+    key = u"{}\x00{}".format(name, api.get_uid(patient))
+    return key.encode("utf8")
+
+
+def get_patient_client_uids(patient):
+    """Returns the UIDs of the clients the patient belongs to: the client
+    where the patient is stored, if any, and the clients it is shared with
+
+    :param patient: Patient object
+    :returns: list of client UIDs
+    :rtype: list
+    """
+    uids = []
+    parent = api.get_parent(patient)
+    if api.get_portal_type(parent) == CLIENT_TYPE:
+        uids.append(api.get_uid(parent))
+    shared = IClientShareableBehavior(patient, None)
+    clients = shared.getRawClients() if shared else None
+    for uid in clients or []:
+        if uid and uid not in uids:
+            uids.append(uid)
+    return uids
+
+
 def tuplify_identifiers(identifiers):
     """Convert identifiers to a list of key/value tuples
 
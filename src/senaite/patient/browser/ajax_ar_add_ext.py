@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
 from Products.Five.browser import BrowserView
-from zope.interface import alsoProvides, noLongerProvides
+from zope.interface import Interface, directlyProvidedBy, implementedBy, providedBy
+from zope.interface.declarations import Declaration
 from Products.CMFCore.utils import getToolByName
-from zope.component import getMultiAdapter
+from zope.component import getSiteManager
 
 import json
 import logging
+import re
+import time
 
 from senaite.patient.interfaces import ISenaitePatientLayer
 
@@ -14,6 +17,19 @@ logger = logging.getLogger("senaite.patient.ajax_ar_add_ext")
 # Python 3: reemplazo de basestring
 STRING_TYPES = (str, bytes)
 
+# Caché de profile UID -> (timestamp, (sampletype UID, title)). Se invalida al
+# editar/eliminar un AnalysisProfile; el TTL cubre ediciones hechas en otros
+# clientes ZEO
+_PROFILE_SAMPLETYPES = {}
+PROFILE_CACHE_TTL = 300
+
+# Caché de (clase e interfaces del contexto, clase y capas del request) ->
+# factory de @@ajax_ar_add del core, para no buscar el adaptador en cada request
+_CORE_FACTORIES = {}
+
+# Chequeo sobre el JSON crudo, para no decodificarlo cuando no hace falta
+_RAW_PROFILE = re.compile(r'"Profiles?[^"]*"\s*:\s*(?:"[^"]+"|\[\s*["{]|\{)')
+
 # ------------------------------------------------------------------------------
 # Helpers de capa
 # ------------------------------------------------------------------------------
@@ -21,6 +37,46 @@ def _has_patient_layer(request):
     return ISenaitePatientLayer.providedBy(request)
 
 
+def _core_factory(context, request):
+    """Factory de @@ajax_ar_add del core para el contexto y el request, sin
+    nuestro layer para evitar recursión.
+
+    Se cachea por las interfaces del contexto y las capas del request, así se
+    respetan las capas y overrides registrados sin buscar el adaptador en cada
+    request.
+    """
+    layers = tuple([iface for iface in directlyProvidedBy(request)
+                    if iface is not ISenaitePatientLayer])
+    key = (type(context), tuple(directlyProvidedBy(context)),
+           type(request), layers)
+    factory = _CORE_FACTORIES.get(key)
+    if factory is None:
+        spec = Declaration(*(layers + (implementedBy(type(request)), )))
+        factory = getSiteManager().adapters.lookup(
+            (providedBy(context), spec), Interface, name="ajax_ar_add")
+        if factory is not None:
+            _CORE_FACTORIES[key] = factory
+    return factory
+
+
+def _raw_needs_sampletype(raw):
+    """False si ningún record del JSON crudo tiene Profile; en ese caso no hay
+    nada que autocompletar y no se decodifica. Si alguno lo tiene, el
+    SampleType se revisa record por record en el JSON decodificado.
+    """
+    if not isinstance(raw, STRING_TYPES):
+        return True
+    return bool(_RAW_PROFILE.search(raw))
+
+
+def invalidate_sampletype_cache(profile_uid=None):
+    """Invalida la caché profile -> SampleType (de un profile o completa)."""
+    if profile_uid is None:
+        _PROFILE_SAMPLETYPES.clear()
+    else:
+        _PROFILE_SAMPLETYPES.pop(profile_uid, None)
+
+
 def _json_loads(raw):
     try:
         return json.loads(raw)
@@ -87,28 +143,31 @@ class AjaxARAddExt(BrowserView):
 
     # -------------------------- Delegación segura ------------------------------
     def _core_view(self):
-        """Obtiene @@ajax_ar_add del core removiendo temporalmente nuestro layer
-        para evitar recursión.
+        """Obtiene @@ajax_ar_add del core, sin nuestro layer para evitar
+        recursión.
+
+        La factory de la vista se cachea a nivel de módulo (ver
+        `_core_factory`); la vista se reutiliza dentro del mismo request.
         """
-        request = self.request
-        removed = False
-        if _has_patient_layer(request):
-            noLongerProvides(request, ISenaitePatientLayer)
-            removed = True
-        try:
-            return self.context.restrictedTraverse('@@ajax_ar_add')
-        finally:
-            if removed:
-                alsoProvides(request, ISenaitePatientLayer)
+        core = getattr(self, "_core", None)
+        if core is not None:
+            return core
+
+        factory = _core_factory(self.context, self.request)
+        if factory is None:
+            return None
+        core = factory(self.context, self.request)
+        self._core = core
+        return core
 
     def _delegate_raw(self, method_name):
         core = self._core_view()
         if not core:
-            logger.warning("AjaxARAddExt: no se pudo resolver @@ajax_ar_add (core). Método=%s", method_name)
+            logger.error("AjaxARAddExt: no se pudo resolver @@ajax_ar_add (core). Método=%s", method_name)
             return json.dumps({"success": False, "message": "Core AJAX view not found"})
         method = getattr(core, method_name, None)
         if not method:
-            logger.warning("AjaxARAddExt: el core no expone método %s", method_name)
+            logger.error("AjaxARAddExt: el core no expone método %s", method_name)
             return json.dumps({"success": False, "message": "Core method not found: %s" % method_name})
         return method()
 
@@ -134,51 +193,23 @@ class AjaxARAddExt(BrowserView):
         desde el AnalysisProfile seleccionado.
         """
         raw = self._delegate_raw('recalculate_records')
+
+        # Camino rápido: si ningún record tiene profile no se decodifica
+        if not _raw_needs_sampletype(raw):
+            return raw
+
         payload = _json_loads(raw)
         if payload is None:
             return raw
 
         try:
-            # 0) Marca visible en logs actuales (WARNING)
-            logger.warning("AjaxARAddExt: intercept recalculate_records")
-
-            # 1) Encontrar el record/valores
-            rec, vals = _locate_record_and_values(payload)
-            if not vals:
-                logger.warning("AjaxARAddExt: no hallé dict de valores en payload; devuelvo sin cambios.")
-                return raw
-
-            logger.warning("AjaxARAddExt: values_keys=%s", sorted(list(vals.keys()))[:50])
-
-            # 2) ¿SampleType ya está?
-            if _sampletype_is_set(vals):
-                logger.warning("AjaxARAddExt: SampleType ya estaba seteado; no cambio nada.")
-                return raw
-
-            # 3) Extraer UID de Profile
-            profile_uid = _extract_profile_uid(vals)
-            logger.warning("AjaxARAddExt: profile_uid detectado=%r", profile_uid)
-
-            if not profile_uid:
-                logger.warning("AjaxARAddExt: no encontré profile seleccionado; no autocompleto SampleType.")
-                return raw
-
-            # 4) Resolver SampleType (UID/Title) desde el Profile
-            st_uid, st_title = _resolve_sampletype_from_profile(self.context, profile_uid)
-            logger.warning("AjaxARAddExt: resuelto SampleType (uid=%r, title=%r) desde profile %r",
-                           st_uid, st_title, profile_uid)
-
-            if not st_uid:
-                logger.warning("AjaxARAddExt: el AnalysisProfile %r no tiene SampleType asociado.", profile_uid)
-                return raw
-
-            # 5) Setear en formatos comunes
-            changed = _force_set_sampletype(vals, st_uid, st_title)
+            # 1) Encontrar los valores de cada record
+            changed = False
+            for vals in _locate_values(payload):
+                if _autofill_sampletype(self.context, vals):
+                    changed = True
             if changed:
-                logger.warning("AjaxARAddExt: SampleType autocompletado -> uid=%s, title=%s", st_uid, st_title)
                 return _json_dumps(payload)
-
-            logger.warning("AjaxARAddExt: no se cambió nada (posible clave distinta).")
             return raw
 
         except Exception:
@@ -189,29 +220,55 @@ class AjaxARAddExt(BrowserView):
 # ------------------------------------------------------------------------------
 # Utilidades de JSON/payload
 # ------------------------------------------------------------------------------
-def _locate_record_and_values(payload):
-    """Devuelve (record_dict, values_dict) o (None, None)."""
-    rec = None
-    vals = None
+def _locate_values(payload):
+    """Devuelve la lista de values_dict de todos los records del payload."""
+    records = []
 
     if isinstance(payload, dict):
         container = payload.get("records") or payload.get("data")
-        if isinstance(container, list) and container:
-            rec = container[0]
+        if isinstance(container, list):
+            records = container
         elif isinstance(container, dict):
-            rec = container
+            records = [container]
         elif isinstance(payload.get("values"), dict):
-            rec = payload
+            records = [payload]
 
-    if isinstance(rec, dict):
+    values = []
+    for rec in records:
+        if not isinstance(rec, dict):
+            continue
         if isinstance(rec.get("values"), dict):
-            vals = rec.get("values")
+            values.append(rec.get("values"))
         elif isinstance(rec.get("fields"), dict):
-            vals = rec.get("fields")
+            values.append(rec.get("fields"))
         else:
-            vals = rec
+            values.append(rec)
+    return values
+
 
-    return rec, vals
+def _autofill_sampletype(context, vals):
+    """Autocompleta el SampleType de un record desde su AnalysisProfile.
+    Devuelve True si cambió algo.
+    """
+    # 2) ¿SampleType ya está?
+    if _sampletype_is_set(vals):
+        return False
+
+    # 3) Extraer UID de Profile
+    profile_uid = _extract_profile_uid(vals)
+    if not profile_uid:
+        return False
+
+    # 4) Resolver SampleType (UID/Title) desde el Profile (cacheado)
+    st_uid, st_title = _resolve_sampletype_from_profile(context, profile_uid)
+    if not st_uid:
+        return False
+
+    # 5) Setear en formatos comunes
+    if _force_set_sampletype(vals, st_uid, st_title):
+        logger.debug("AjaxARAddExt: SampleType autocompletado -> uid=%s, title=%s", st_uid, st_title)
+        return True
+    return False
 
 
 def _sampletype_is_set(vals):
@@ -265,6 +322,18 @@ def _extract_profile_uid(vals):
 
 
 def _resolve_sampletype_from_profile(context, profile_uid):
+    """Dado un UID de AnalysisProfile, devuelve el SampleType (uid, title),
+    cacheado por profile.
+    """
+    cached = _PROFILE_SAMPLETYPES.get(profile_uid)
+    if cached and time.time() - cached[0] < PROFILE_CACHE_TTL:
+        return cached[1]
+    result = _lookup_sampletype_from_profile(context, profile_uid)
+    _PROFILE_SAMPLETYPES[profile_uid] = (time.time(), result)
+    return result
+
+
+def _lookup_sampletype_from_profile(context, profile_uid):
     """Dado un UID de AnalysisProfile, intenta obtener el SampleType (uid, title)."""
     try:
         catalog = getToolByName(context, 'senaite_catalog_setup', None)
@@ -272,7 +341,7 @@ def _resolve_sampletype_from_profile(context, profile_uid):
             catalog = getToolByName(context, 'portal_catalog', None)
 
         if not catalog:
-            logger.warning("AjaxARAddExt: no hay catálogo para resolver SampleType.")
+            logger.error("AjaxARAddExt: no hay catálogo para resolver SampleType.")
             return (None, None)
 
         brains = catalog(UID=profile_uid)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import json
+
+from bika.lims import api
+from Products.Five.browser import BrowserView
+from senaite.patient.api import get_patient_changes
+
+# Maximum number of changes returned per request
+MAX_LIMIT = 1000
+
+
+class PatientChangesView(BrowserView):
+    """JSON feed of the patients created, modified, deactivated or merged
+    since a given token
+
+    The first request is done without token and returns the changes from the
+    beginning. Each response contains the token for the next request, e.g.:
+
+        .../patients/patient_changes?token=<next>&limit=500
+    """
+
+    def __call__(self):
+        form = self.request.form
+        token = form.get("token") or None
+        limit = api.to_int(form.get("limit"), 100)
+        limit = min(max(limit, 1), MAX_LIMIT)
+
+        response = self.request.response
+        response.setHeader("Content-Type", "application/json")
+
+        try:
+            brains, next_token = get_patient_changes(token, limit=limit)
+        except ValueError as exc:
+            response.setStatus(400)
+            return json.dumps({"error": str(exc)})
+
+        return json.dumps({
+            "items": map(self.get_change, brains),
+            "count": len(brains),
+            "more": len(brains) == limit,
+            "token": next_token,
+        })
+
+    def get_change(self, brain):
+        """Returns the change record of the patient brain
+        """
+        return {
+            "uid": brain.UID,
+            "mrn": api.safe_unicode(brain.mrn),
+            "kind": brain.patient_change_kind,
+            "seq": brain.patient_change_seq,
+            "review_state": brain.review_state,
+            "path": brain.getPath(),
+            "url": brain.getURL(),
+        }
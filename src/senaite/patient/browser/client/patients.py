@@ -18,6 +18,7 @@
 # Copyright 2020-2025 by it's authors.
 # Some rights reserved, see README and LICENSE.
 
+from bika.lims import api
 from senaite.patient.browser.patientfolder import PatientFolderView
 from senaite.patient.api import is_patient_allowed_in_client
 
@@ -29,6 +30,9 @@ class PatientsView(PatientFolderView):
     def __init__(self, context, request):
         super(PatientsView, self).__init__(context, request)
 
+        # patients stored in the client or shared with it
+        self.contentFilter["patient_client_uids"] = api.get_uid(context)
+
         # remove add action
         if not is_patient_allowed_in_client():
             self.context_actions = {}
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import csv
+import json
+from datetime import date
+from datetime import datetime
+from StringIO import StringIO
+
+from bika.lims import api
+from bika.lims.interfaces import IClient
+from Missing import MV
+from Products.Five.browser import BrowserView
+from senaite.core.api.catalog import to_searchable_text_qs
+from senaite.patient.api import get_patient_catalog
+from senaite.patient.api import tuplify_identifiers
+from senaite.patient.browser.client.patients import PatientsView
+from senaite.patient.browser.facets import get_selected_facets
+from senaite.patient.browser.patientfolder import PatientFolderView
+from senaite.patient.facets import get_facets_query
+
+# Number of brains written to the response at once
+CHUNK_SIZE = 500
+
+# Tuples of (column name, catalog metadata column)
+EXPORT_COLUMNS = (
+    ("mrn", "mrn"),
+    ("fullname", "getFullname"),
+    ("firstname", "getFirstname"),
+    ("middlename", "getMiddlename"),
+    ("lastname", "getLastname"),
+    ("maternal_lastname", "getMaternalLastname"),
+    ("sex", "getSex"),
+    ("gender", "getGender"),
+    ("birthdate", "getBirthdate"),
+    ("estimated_birthdate", "getEstimatedBirthdate"),
+    ("email", "getEmail"),
+    ("email_report", "getEmailReport"),
+    ("phone", "getPhone"),
+    ("identifiers", "getIdentifiers"),
+    ("deceased", "getDeceased"),
+    ("review_state", "review_state"),
+    ("uid", "UID"),
+    ("path", "getPath"),
+)
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+}
+
+
+class PatientExportView(BrowserView):
+    """Streams the patients of the listing as CSV or NDJSON
+
+    The data is taken from the catalog metadata only, without waking up the
+    patient objects. The same base query, review state filters, facets and
+    search term as the patients listing of the context are applied, e.g.:
+
+        .../patients/export_patients?format=ndjson&review_state=deceased
+        .../patients/export_patients?filter=wayne&facet.sex=m
+    """
+
+    def __call__(self):
+        fmt = self.request.form.get("format", "csv")
+        if fmt not in FORMATS:
+            fmt = "csv"
+
+        filename = "patients-{}.{}".format(
+            datetime.now().strftime("%Y%m%d%H%M%S"), fmt)
+        response = self.request.response
+        response.setHeader("Content-Type", FORMATS[fmt])
+        response.setHeader("Content-Disposition",
+                           "attachment; filename={}".format(filename))
+
+        writer = self.write_csv if fmt == "csv" else self.write_ndjson
+        for chunk in writer(self.get_records()):
+            response.write(chunk)
+        return ""
+
+    def get_listing(self):
+        """Returns the patients listing view of the context
+        """
+        if IClient.providedBy(self.context):
+            return PatientsView(self.context, self.request)
+        return PatientFolderView(self.context, self.request)
+
+    def get_query(self):
+        """Returns the listing query, filtered by the selected review state,
+        facets and search term
+        """
+        listing = self.get_listing()
+        query = dict(listing.contentFilter)
+        review_state = self.request.form.get("review_state", "default")
+        for state in listing.review_states:
+            if state.get("id") == review_state:
+                query.update(state.get("contentFilter", {}))
+                break
+        query.update(get_facets_query(get_selected_facets(self.request)))
+        term = self.request.form.get("filter")
+        if term and api.is_string(term) and term.strip():
+            query["patient_searchable_text"] = to_searchable_text_qs(term)
+        return query
+
+    def get_brains(self):
+        """Generates the catalog brains of the query in chunks
+        """
+        catalog = get_patient_catalog()
+        brains = catalog(self.get_query())
+        total = len(brains)
+        for start in range(0, total, CHUNK_SIZE):
+            for brain in brains[start:start + CHUNK_SIZE]:
+                yield brain
+
+    def get_records(self):
+        """Generates a record dict for each patient brain
+        """
+        for brain in self.get_brains():
+            record = {}
+            for key, column in EXPORT_COLUMNS:
+                if column == "getPath":
+                    value = brain.getPath()
+                else:
+                    value = getattr(brain, column, None)
+                record[key] = self.to_json_value(value)
+            yield record
+
+    def to_json_value(self, value):
+        """Converts the metadata value to a JSON serializable value
+        """
+        if value is MV:
+            return None
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        if api.is_string(value):
+            return api.safe_unicode(value)
+        return value
+
+    def to_csv_value(self, value):
+        """Converts the record value to a UTF-8 encoded CSV cell
+        """
+        if value is None:
+            return ""
+        if isinstance(value, bool):
+            return "1" if value else "0"
+        if not api.is_string(value):
+            value = u"{}".format(value)
+        return api.safe_unicode(value).encode("utf8")
+
+    def write_csv(self, records):
+        """Generates CSV chunks of the records
+        """
+        out = StringIO()
+        writer = csv.writer(out)
+        writer.writerow([key for key, column in EXPORT_COLUMNS])
+        for num, record in enumerate(records, 1):
+            row = []
+            for key, column in EXPORT_COLUMNS:
+                value = record[key]
+                if key == "identifiers":
+                    value = " ".join(map(lambda i: u"{}:{}".format(*i),
+                                         tuplify_identifiers(value or [])))
+                row.append(self.to_csv_value(value))
+            writer.writerow(row)
+            if num % CHUNK_SIZE == 0:
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+        yield out.getvalue()
+
+    def write_ndjson(self, records):
+        """Generates NDJSON chunks of the records
+        """
+        lines = []
+        for num, record in enumerate(records, 1):
+            lines.append(json.dumps(record))
+            if num % CHUNK_SIZE == 0:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import json
+
+from bika.lims import api
+from Products.Five.browser import BrowserView
+from senaite.patient import messageFactory as _
+from senaite.patient.api import to_identifier_type_name
+from senaite.patient.config import ETHNICITIES
+from senaite.patient.config import GENDERS
+from senaite.patient.config import MARITAL_STATUSES
+from senaite.patient.config import RACES
+from senaite.patient.config import SEXES
+from senaite.patient.facets import AGE_BANDS
+from senaite.patient.facets import FACETS
+from senaite.patient.facets import get_clients
+from senaite.patient.facets import get_facet_counts
+from senaite.patient.i18n import translate as t
+
+# Prefix of the request parameters with the selected facet values
+FACET_PARAM = "facet."
+
+# Facet titles
+FACET_TITLES = {
+    "sex": _(u"Sex"),
+    "gender": _(u"Gender"),
+    "marital_status": _(u"Marital status"),
+    "race": _(u"Race"),
+    "ethnicity": _(u"Ethnicity"),
+    "identifier": _(u"Identifier"),
+    "age_band": _(u"Age"),
+    "client": _(u"Client"),
+}
+
+
+def get_selected_facets(request):
+    """Returns a dict of facet -> value selected in the request
+    """
+    selected = {}
+    for facet in FACETS:
+        value = request.form.get(FACET_PARAM + facet)
+        if value and api.is_string(value):
+            selected[facet] = value
+    return selected
+
+
+class PatientFacetsView(BrowserView):
+    """JSON of the facets of the patient folder, with the number of patients
+    of each value in the selected review state of the listing. Values are
+    selected with `facet.<id>`, e.g.:
+
+        .../patients/patient_facets?review_state=all&facet.sex=f
+    """
+
+    def __call__(self):
+        response = self.request.response
+        response.setHeader("Content-Type", "application/json")
+
+        selected = get_selected_facets(self.request)
+        counts = get_facet_counts(selected, query=self.get_query())
+        facets = []
+        for facet in FACETS:
+            get_title = self.get_title(facet)
+            values = [{
+                "value": value,
+                "title": get_title(value),
+                "count": num,
+                "selected": selected.get(facet) == value,
+            } for value, num in counts[facet].items()]
+            values.sort(key=lambda v: v["count"], reverse=True)
+            facets.append({
+                "id": facet,
+                "title": t(FACET_TITLES[facet]),
+                "values": values,
+            })
+        return json.dumps({"facets": facets})
+
+    def get_query(self):
+        """Returns the filter of the review state selected in the listing
+        """
+        # the listing imports the facets of the request from this module
+        from senaite.patient.browser.patientfolder import PatientFolderView
+        listing = PatientFolderView(self.context, self.request)
+        review_state = self.request.form.get("review_state", "default")
+        for state in listing.review_states:
+            if state.get("id") == review_state:
+                return dict(state.get("contentFilter", {}))
+        return {}
+
+    def get_title(self, facet):
+        """Returns a function that returns the title of a value of the facet
+        """
+        if facet == "identifier":
+            return to_identifier_type_name
+        if facet == "client":
+            titles = dict([(uid, title) for uid, (path, title)
+                           in get_clients().items()])
+        else:
+            vocabularies = {
+                "sex": SEXES,
+                "gender": GENDERS,
+                "marital_status": MARITAL_STATUSES,
+                "race": RACES,
+                "ethnicity": ETHNICITIES,
+                "age_band": [band[:2] for band in AGE_BANDS],
+            }
+            titles = dict([(k, t(v)) for k, v in vocabularies[facet]])
+        return lambda value: titles.get(value) or value
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import json
+
+from bika.lims import api
+from Products.Five.browser import BrowserView
+from senaite.patient.migration import sweep
+
+
+class MigrationSweepView(BrowserView):
+    """Migrates a limited number of objects to the latest schema version
+
+    Meant to be called periodically, e.g. by a cron job, until all objects
+    are migrated:
+
+        .../patient_migration_sweep?limit=200
+    """
+
+    def __call__(self):
+        limit = api.to_int(self.request.form.get("limit"), 100)
+        progress = sweep(limit=limit)
+        self.request.response.setHeader("Content-Type", "application/json")
+        return json.dumps(dict([
+            (portal_type, {"swept": swept, "total": total})
+            for portal_type, (swept, total) in progress.items()]))
@@ -19,6 +19,7 @@
 # Some rights reserved, see README and LICENSE.
 
 from bika.lims import api
+from plone.memoize.instance import memoize
 from senaite.patient.api import get_patient_name_entry_mode
 from bika.lims.browser.analysisrequest.add2 import \
     AnalysisRequestAddView as BaseView
@@ -30,44 +31,61 @@ class PatientSampleAddView(BaseView):
     def __init__(self, context, request):
         super(PatientSampleAddView, self).__init__(context, request)
 
+    @memoize
+    def get_patient_defaults(self):
+        """Returns a dict of field name -> default value taken from the
+        patient. Computed once per request and reused by all sample columns
+        """
+        patient = self.context
+        mrn = patient.getMRN()
+        if not mrn:
+            record = {"temporary": True, "value": ""}
+        else:
+            record = {"temporary": False, "value": mrn}
+
+        entry_mode = get_patient_name_entry_mode()
+        if entry_mode == "parts":
+            fullname = {
+                "firstname": patient.getFirstname(),
+                "middlename": patient.getMiddlename(),
+                "lastname": patient.getLastname(),
+            }
+        elif entry_mode == "first_last":
+            fullname = {
+                "firstname": patient.getFirstname(),
+                "lastname": patient.getLastname(),
+            }
+        else:
+            fullname = {"firstname": patient.getFullname()}
+
+        from_age = False
+        birthdate = patient.getBirthdate(as_date=False)
+        estimated = patient.getEstimatedBirthdate()
+
+        return {
+            "MedicalRecordNumber": record,
+            "PatientFullName": fullname,
+            "PatientAddress": api.to_utf8(patient.getFormattedAddress()),
+            "DateOfBirth": [birthdate, from_age, estimated],
+            "Sex": patient.getSex(),
+            "Gender": patient.getGender(),
+        }
+
     def get_default_value(self, field, context, arnum):
         """Get the default value of the field
         """
         name = field.getName()
-        mrn = self.context.getMRN()
 
         # Inherit default values from the patient
-        if name == "MedicalRecordNumber":
-            if not mrn:
-                return {"temporary": True, "value": ""}
-            return {"temporary": False, "value": mrn}
-        elif name == "PatientFullName":
-            entry_mode = get_patient_name_entry_mode()
-            if entry_mode == "parts":
-                return {
-                    "firstname": self.context.getFirstname(),
-                    "middlename": self.context.getMiddlename(),
-                    "lastname": self.context.getLastname(),
-                }
-            elif entry_mode == "first_last":
-                return {
-                    "firstname": self.context.getFirstname(),
-                    "lastname": self.context.getLastname(),
-                }
-            else:
-                return {"firstname": self.context.getFullname()}
-        elif name == "PatientAddress":
-            address = self.context.getFormattedAddress()
-            return api.to_utf8(address)
-        elif name == "DateOfBirth":
-            from_age = False
-            birthdate = self.context.getBirthdate(as_date=False)
-            estimated = self.context.getEstimatedBirthdate()
-            return [birthdate, from_age, estimated]
-        elif name == "Sex":
-            return self.context.getSex()
-        elif name == "Gender":
-            return self.context.getGender()
+        defaults = self.get_patient_defaults()
+        if name in defaults:
+            value = defaults[name]
+            # return a copy, so the snapshot is not modified by the columns
+            if isinstance(value, dict):
+                return dict(value)
+            elif isinstance(value, list):
+                return list(value)
+            return value
 
         return super(PatientSampleAddView, self).get_default_value(
             field, context, arnum)
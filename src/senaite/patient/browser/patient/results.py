@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import json
+
+from bika.lims import api
+from DateTime import DateTime
+from Products.Five.browser import BrowserView
+from senaite.patient.results import get_series
+
+
+class PatientResultsView(BrowserView):
+    """JSON of the cumulative results of the patient, for charting
+
+    Without parameters, the analysis keywords with results are returned. The
+    series of one or more keywords are returned with the `keyword` parameter:
+
+        .../P000001/results?keyword=GLU&keyword=HBA1C
+    """
+
+    def __call__(self):
+        response = self.request.response
+        response.setHeader("Content-Type", "application/json")
+
+        series = get_series(self.context)
+        keywords = self.request.form.get("keyword")
+        if not keywords:
+            return json.dumps({
+                "items": map(self.get_summary, series.values()),
+            })
+
+        if api.is_string(keywords):
+            keywords = [keywords]
+        items = [series[kw].to_dict() for kw in keywords if kw in series]
+        return json.dumps({"items": items})
+
+    def get_summary(self, series):
+        """Returns the summary of the series
+        """
+        dates = series.dates
+        last_date = DateTime(dates[-1]).ISO8601() if dates else None
+        return {
+            "keyword": series.keyword,
+            "title": series.title,
+            "unit": series.unit,
+            "count": len(series),
+            "last_result": series.results[-1] if len(series) else None,
+            "last_date": last_date,
+        }
@@ -39,11 +39,7 @@ class SamplesView(BaseView):
             mapping={"patient_fullname": api.safe_unicode(fullname)}
         )
 
-        mrn = self.context.getMRN()
-        if mrn:
-            self.contentFilter["medical_record_number"] = [mrn]
-        else:
-            self.contentFilter["medical_record_number"] = []
+        self.contentFilter["patient_uid"] = api.get_uid(self.context)
 
     def update(self):
         """Called before the listing renders
@@ -25,12 +25,18 @@ from bika.lims.utils import get_email_link
 from bika.lims.utils import get_image
 from bika.lims.utils import get_link
 from senaite.app.listing.view import ListingView
+from senaite.core.api import dtime
 from senaite.patient import messageFactory as _
 from senaite.patient.api import to_identifier_type_name
 from senaite.patient.api import tuplify_identifiers
+from senaite.patient.browser.facets import get_selected_facets
 from senaite.patient.catalog import PATIENT_CATALOG
+from senaite.patient.facets import get_facets_query
 from senaite.patient.i18n import translate as t
+from senaite.patient.pagination import SORT_INDEX
+from senaite.patient.pagination import KeysetResults
 from senaite.patient.permissions import AddPatient
+from senaite.patient.stats import NO_SAMPLE_DATE
 
 
 class PatientFolderView(ListingView):
@@ -44,15 +50,8 @@ class PatientFolderView(ListingView):
 
         self.contentFilter = {
             "portal_type": "Patient",
-            "path": {
-                "query": [
-                    api.get_path(context),
-                    api.get_path(self.portal.clients),
-                ],
-                "level": 0
-            },
-            "sort_on": "created",
-            "sort_order": "descending",
+            "sort_on": SORT_INDEX,
+            "sort_order": "ascending",
         }
 
         self.context_actions = {
@@ -78,7 +77,7 @@ class PatientFolderView(ListingView):
                 "title": _("Identifiers"), }),
             ("fullname", {
                 "title": _("Fullname"),
-                "index": "patient_fullname"}),
+                "index": SORT_INDEX}),
             ("email_report", {
                 "title": _("Email Report"),
                 "index": "patient_email_report"}),
@@ -95,6 +94,12 @@ class PatientFolderView(ListingView):
             ("folder", {
                 "title": _("Folder"),
                 "index": "path"}),
+            ("samples", {
+                "title": _("Samples"),
+                "index": "patient_samples_count"}),
+            ("last_visit", {
+                "title": _("Last visit"),
+                "index": "patient_last_sample_date"}),
         ))
 
         self.review_states = [
@@ -125,6 +130,20 @@ class PatientFolderView(ListingView):
         """Update hook
         """
         super(PatientFolderView, self).update()
+        # narrow down to the values selected in the facets, if any
+        selected = get_selected_facets(self.request)
+        self.contentFilter.update(get_facets_query(selected))
+
+    def search(self, searchterm="", ignorecase=True):
+        """Returns the patients sorted by name with keyset pagination, so that
+        the listing does not sort all patients on every page
+        """
+        if searchterm or self.contentFilter.get("sort_on") != SORT_INDEX:
+            return super(PatientFolderView, self).search(
+                searchterm=searchterm, ignorecase=ignorecase)
+        # start right after the given patient, if any
+        after = self.request.form.get("after")
+        return KeysetResults(self.contentFilter, after=after)
 
     def before_render(self):
         """Before template render hook
@@ -155,6 +174,12 @@ class PatientFolderView(ListingView):
         return tags
 
     def folderitem(self, obj, item, index):
+        # sample statistics are taken from the catalog metadata
+        samples = getattr(obj, "patient_samples_count", None)
+        last_visit = getattr(obj, "patient_last_sample_date", None)
+        if last_visit == NO_SAMPLE_DATE:
+            last_visit = None
+
         obj = api.get_object(obj)
         url = api.get_url(obj)
 
@@ -217,4 +242,12 @@ class PatientFolderView(ListingView):
         item["folder"] = parent.Title()
         item["replace"]["folder"] = get_link(parent_url, value=parent.Title())
 
+        # Samples
+        item["samples"] = samples or 0
+        item["replace"]["samples"] = get_link(
+            "{}/samples".format(url), value=item["samples"])
+
+        # Last visit
+        item["last_visit"] = dtime.to_localized_time(last_visit) or ""
+
         return item
@@ -0,0 +1,832 @@
+!function(e){var t={};function n(r){if(t[r])return t[r].exports;var i=t[r]={i:r,l:!1,exports:{}};return e[r].call(i.exports,i,i.exports,n),i.l=!0,i.exports}n.m=e,n.c=t,n.d=function(e,t,r){n.o(e,t)||Object.defineProperty(e,t,{enumerable:!0,get:r})},n.r=function(e){"undefined"!=typeof Symbol&&Symbol.toStringTag&&Object.defineProperty(e,Symbol.toStringTag,{value:"Module"}),Object.defineProperty(e,"__esModule",{value:!0})},n.t=function(e,t){if(1&t&&(e=n(e)),8&t)return e;if(4&t&&"object"==typeof e&&e&&e.__esModule)return e;var r=Object.create(null);if(n.r(r),Object.defineProperty(r,"default",{enumerable:!0,value:e}),2&t&&"string"!=typeof e)for(var i in e)n.d(r,i,function(t){return e[t]}.bind(null,i));return r},n.n=function(e){var t=e&&e.__esModule?function(){return e.default}:function(){return e};return n.d(t,"a",t),t},n.o=function(e,t){return Object.prototype.hasOwnProperty.call(e,t)},n.p="/++plone++senaite.patient.static/bundles",n(n.s=1)}([
+/* 0 */
+/*!*** external "jQuery" ***!*/
+/***/ (function(module, exports) {
+
+module.exports = jQuery;
+
+}),
+/* 1 */
+/*!*** multi ./senaite.patient.js ***!*/
+/***/ (function(module, exports, __webpack_require__) {
+
+module.exports = __webpack_require__(2);
+
+}),
+/* 2 */
+/*!*** ./senaite.patient.js ***!*/
+/***/ (function(module, __webpack_exports__, __webpack_require__) {
+
+"use strict";
+__webpack_require__.r(__webpack_exports__);
+var _components_temporaryidentifierwidget_coffee__WEBPACK_IMPORTED_MODULE_0__ = __webpack_require__(3);
+var _components_agedobwidget_coffee__WEBPACK_IMPORTED_MODULE_1__ = __webpack_require__(5);
+var _components_patientform_coffee__WEBPACK_IMPORTED_MODULE_2__ = __webpack_require__(6);
+
+var TemporaryIdentifierWidgetController = _components_temporaryidentifierwidget_coffee__WEBPACK_IMPORTED_MODULE_0__["default"];
+var AgeDoBWidgetController = _components_agedobwidget_coffee__WEBPACK_IMPORTED_MODULE_1__["default"];
+var PatientFormController = _components_patientform_coffee__WEBPACK_IMPORTED_MODULE_2__["default"];
+
+document.addEventListener("DOMContentLoaded", function () {
+  console.debug("*** SENAITE PATIENT JS LOADED ***");
+
+  // Initialize controllers
+  window.temporary_identifier_widget = new TemporaryIdentifierWidgetController();
+  window.age_dob_widget = new AgeDoBWidgetController();
+  window.patient_form = new PatientFormController();
+});
+
+}),
+/* 3 */
+/*!*** ./components/temporaryidentifierwidget.coffee ***!*/
+/***/ (function(module, __webpack_exports__, __webpack_require__) {
+
+"use strict";
+__webpack_require__.r(__webpack_exports__);
+var jquery__WEBPACK_IMPORTED_MODULE_0__ = __webpack_require__(0);
+var jquery__WEBPACK_IMPORTED_MODULE_0___default = /*#__PURE__*/__webpack_require__.n(jquery__WEBPACK_IMPORTED_MODULE_0__);
+var _searchcache_js__WEBPACK_IMPORTED_MODULE_1__ = __webpack_require__(4);
+
+var $ = jquery__WEBPACK_IMPORTED_MODULE_0___default.a;
+var SearchCache = _searchcache_js__WEBPACK_IMPORTED_MODULE_1__["SearchCache"];
+var debounce = _searchcache_js__WEBPACK_IMPORTED_MODULE_1__["debounce"];
+
+var SEARCH_DELAY = 250;
+
+var bind = function(fn, me) { return function() { return fn.apply(me, arguments); }; };
+
+var TemporaryIdentifierWidgetController = (function() {
+
+  function TemporaryIdentifierWidgetController() {
+    this.debug = bind(this.debug, this);
+    this.get_portal_url = bind(this.get_portal_url, this);
+    this.ajax_submit = bind(this.ajax_submit, this);
+    this.search_patient = bind(this.search_patient, this);
+    this.cancel_search = bind(this.cancel_search, this);
+    this.format_date = bind(this.format_date, this);
+    this.native_set_value = bind(this.native_set_value, this);
+    this.set_sibling_value = bind(this.set_sibling_value, this);
+    this.get_sibling = bind(this.get_sibling, this);
+    this.get_field_name = bind(this.get_field_name, this);
+    this.get_input_element = bind(this.get_input_element, this);
+    this.load_patient = bind(this.load_patient, this);
+    this.on_mrn_selected = bind(this.on_mrn_selected, this);
+    this.on_mrn_deselected = bind(this.on_mrn_deselected, this);
+    this.on_temporary_change = bind(this.on_temporary_change, this);
+    this.set_patient_data = bind(this.set_patient_data, this);
+    this.reset_temporary_identifiers = bind(this.reset_temporary_identifiers, this);
+    console.debug("TemporaryIdentifierWidget::load");
+    this.auto_wildcard = "-- autogenerated --";
+    this.is_add_sample_form = document.body.classList.contains("template-ar_add");
+    this.patients = new SearchCache({
+      size: 100
+    });
+    this.searches = {};
+    this.pending = new Map();
+    this.load_patient = debounce(this.load_patient, SEARCH_DELAY, function(el) {
+      return el;
+    });
+    if (this.is_add_sample_form) {
+      this.reset_temporary_identifiers();
+    }
+    $("body").on("change", ".TemporaryIdentifier input[type='checkbox']", this.on_temporary_change);
+    $("body").on("select", ".TemporaryIdentifier", this.on_mrn_selected);
+    $("body").on("deselect", ".TemporaryIdentifier", this.on_mrn_deselected);
+    return this;
+  }
+
+  TemporaryIdentifierWidgetController.prototype.reset_temporary_identifiers = function() {
+    var fields;
+    this.debug("TemporaryIdentifierWidget::reset_temporary_identifiers");
+    fields = document.querySelectorAll(".TemporaryIdentifier");
+    return fields.forEach((function(_this) {
+      return function(field, index) {
+        var auto_id_field, input_field, temporary;
+        temporary = field.querySelector("input[name*='_temporary']");
+        if (!(temporary != null ? temporary.checked : void 0)) {
+          return;
+        }
+        temporary.checked = false;
+        auto_id_field = field.querySelector("input[name*='_value_auto']");
+        _this.native_set_value(auto_id_field, "");
+        input_field = field.querySelector("textarea");
+        return _this.native_set_value(input_field, "");
+      };
+    })(this));
+  };
+
+  TemporaryIdentifierWidgetController.prototype.set_patient_data = function(el, data) {
+    var field, record, results, value;
+    record = {
+      "MedicalRecordNumber": "",
+      "PatientFullName.firstname": "",
+      "PatientFullName.middlename": "",
+      "PatientFullName.lastname": "",
+      "PatientFullName.maternal_lastname": "",
+      "PatientAddress": "",
+      "DateOfBirth.dob": "",
+      "Age": "",
+      "Sex": "",
+      "Gender": ""
+    };
+    record = Object.assign(record, data);
+    results = [];
+    for (field in record) {
+      value = record[field];
+      results.push(this.set_sibling_value(el, field, value));
+    }
+    return results;
+  };
+
+  TemporaryIdentifierWidgetController.prototype.on_temporary_change = function(event) {
+    var el, fieldname, input_field, is_temporary;
+    this.debug("°°° TemporaryIdentifierWidget::on_temporary_change °°°");
+    el = event.currentTarget;
+    fieldname = this.get_field_name(el);
+    is_temporary = el.checked;
+    input_field = this.get_input_element(fieldname);
+    if (is_temporary && !input_field.value) {
+      return this.native_set_value(input_field, this.auto_wildcard);
+    } else if (!is_temporary && input_field.value === this.auto_wildcard) {
+      return this.native_set_value(input_field, "");
+    }
+  };
+
+  TemporaryIdentifierWidgetController.prototype.on_mrn_deselected = function(event) {
+    var el, fieldname, temporary_checkbox;
+    this.debug("°°° TemporaryIdentifierWidget::on_mrn_deselected °°°");
+    el = event.currentTarget;
+    fieldname = this.get_field_name(el);
+    this.cancel_search(el);
+    temporary_checkbox = document.getElementById(fieldname + "_temporary");
+    temporary_checkbox.checked = false;
+    return this.set_patient_data(el, {});
+  };
+
+  TemporaryIdentifierWidgetController.prototype.on_mrn_selected = function(event) {
+    var el, mrn;
+    this.debug("°°° TemporaryIdentifierWidget::on_mrn_selected °°°");
+    el = event.currentTarget;
+    mrn = event.detail.value;
+    if (mrn === this.auto_wildcard) {
+      return;
+    }
+    this.cancel_search(el);
+    this.pending.set(el, mrn);
+    return this.load_patient(el, mrn);
+  };
+
+  TemporaryIdentifierWidgetController.prototype.load_patient = function(el, mrn) {
+    this.debug("°°° TemporaryIdentifierWidget::load_patient:mrn=" + mrn + " °°°");
+    if (this.pending.get(el) !== mrn) {
+      return;
+    }
+    return this.search_patient({
+      patient_mrn: mrn
+    }).done((function(_this) {
+      return function(data) {
+        var address, physical_address, record, ref;
+        if (_this.pending.get(el) !== mrn) {
+          return;
+        }
+        _this.pending["delete"](el);
+        if (!data) {
+          return;
+        }
+        physical_address = ((ref = data.address) != null ? ref : [])[0] || {};
+        address = [physical_address.address, physical_address.zip, physical_address.city, physical_address.country].filter(function(v) {
+          return v;
+        }).join(", ");
+        record = {
+          "MedicalRecordNumber": data.mrn,
+          "PatientFullName.firstname": data.firstname || "",
+          "PatientFullName.middlename": data.middlename || "",
+          "PatientFullName.lastname": data.lastname || "",
+          "PatientFullName.maternal_lastname": data.maternal_lastname || "",
+          "PatientAddress": address,
+          "DateOfBirth.dob": _this.format_date(data.birthdate),
+          "Age": data.age,
+          "Sex": data.sex,
+          "Gender": data.gender,
+          "review_state": data.review_state
+        };
+        return _this.set_patient_data(el, record);
+      };
+    })(this));
+  };
+
+  TemporaryIdentifierWidgetController.prototype.get_input_element = function(field) {
+    return document.querySelector("#" + field + " textarea");
+  };
+
+  TemporaryIdentifierWidgetController.prototype.get_field_name = function(element) {
+    var parent;
+    parent = element.closest("div[data-fieldname]");
+    return $(parent).attr("data-fieldname");
+  };
+
+  TemporaryIdentifierWidgetController.prototype.get_sibling = function(element, name, subfield) {
+    var field, parent, sample_num, selector;
+    if (subfield == null) {
+      subfield = '';
+    }
+    field = name;
+    if (this.is_add_sample_form) {
+      parent = element.closest("td[arnum]");
+      sample_num = $(parent).attr("arnum");
+      field = name + '-' + sample_num;
+    }
+    selector = '[name="' + field + '"]';
+    if (subfield !== '') {
+      field = field + '.' + subfield;
+      selector = '[name^="' + field + ':"]';
+    }
+    return document.querySelector(selector);
+  };
+
+  TemporaryIdentifierWidgetController.prototype.set_sibling_value = function(element, name, value) {
+    var field, split, subfield;
+    this.debug(">>> set " + name + " = " + value);
+    subfield = '';
+    if (name.indexOf(".") >= 0) {
+      split = name.split(".");
+      name = split[0];
+      subfield = split[1];
+    }
+    field = this.get_sibling(element, name, subfield);
+    if (!field) {
+      return;
+    }
+    return this.native_set_value(field, value);
+  };
+
+  TemporaryIdentifierWidgetController.prototype.native_set_value = function(input, value) {
+    var evt, setter;
+    setter = null;
+    if ((input != null ? input.tagName : void 0) === "TEXTAREA") {
+      setter = Object.getOwnPropertyDescriptor(window.HTMLTextAreaElement.prototype, "value").set;
+    } else if ((input != null ? input.tagName : void 0) === "SELECT") {
+      setter = Object.getOwnPropertyDescriptor(window.HTMLSelectElement.prototype, "value").set;
+    } else if ((input != null ? input.tagName : void 0) === "INPUT") {
+      setter = Object.getOwnPropertyDescriptor(window.HTMLInputElement.prototype, "value").set;
+    } else {
+      if (input != null) {
+        input.value = value;
+      }
+    }
+    if (setter && input) {
+      setter.call(input, value);
+      evt = new Event("input", {
+        bubbles: true
+      });
+      return input.dispatchEvent(evt);
+    }
+  };
+
+  TemporaryIdentifierWidgetController.prototype.format_date = function(date_value) {
+    var d;
+    if (date_value == null) {
+      return "";
+    }
+    d = new Date(date_value);
+    return [d.getFullYear(), ('0' + (d.getMonth() + 1)).slice(-2), ('0' + d.getDate()).slice(-2)].join('-');
+  };
+
+  TemporaryIdentifierWidgetController.prototype.cancel_search = function(el) {
+    var key, mrn, search, waiting;
+    mrn = this.pending.get(el);
+    if (mrn == null) {
+      return;
+    }
+    this.pending["delete"](el);
+    key = JSON.stringify({
+      patient_mrn: mrn
+    });
+    search = this.searches[key];
+    if (!search) {
+      return;
+    }
+    waiting = Array.from(this.pending.values()).filter(function(value) {
+      return value === mrn;
+    });
+    if (waiting.length) {
+      return;
+    }
+    search.xhr.abort();
+    return delete this.searches[key];
+  };
+
+  TemporaryIdentifierWidgetController.prototype.search_patient = function(query) {
+    var cached, catalog_name, data, deferred, fields, key, options, xhr;
+    this.debug("°°° TemporaryIdentifierWidget::search_patient °°°");
+    key = JSON.stringify(query);
+    cached = this.patients.get(key);
+    if (cached != null) {
+      return $.Deferred().resolveWith(this, [cached]).promise();
+    }
+    if (this.searches[key]) {
+      return this.searches[key].promise;
+    }
+    catalog_name = document.querySelector('[name="config_catalog"]').value;
+    fields = ["mrn", "firstname", "middlename", "lastname", "maternal_lastname", "age", "birthdate", "sex", "gender", "email", "address", "review_state"];
+    data = {
+      portal_type: "Patient",
+      catalog_name: catalog_name,
+      include_fields: fields,
+      page_size: 1
+    };
+    data = Object.assign(data, query);
+    deferred = $.Deferred();
+    options = {
+      url: this.get_portal_url() + "/@@API/read",
+      data: data
+    };
+    xhr = this.ajax_submit(options).done(function(data) {
+      var object, ref;
+      object = {};
+      if ((ref = data.objects) != null ? ref.length : void 0) {
+        object = data.objects[0];
+        this.patients.set(key, object);
+      }
+      return deferred.resolveWith(this, [object]);
+    }).always((function(_this) {
+      return function() {
+        return delete _this.searches[key];
+      };
+    })(this));
+    this.searches[key] = {
+      xhr: xhr,
+      promise: deferred.promise()
+    };
+    return deferred.promise();
+  };
+
+  TemporaryIdentifierWidgetController.prototype.ajax_submit = function(options) {
+    var done;
+    if (options == null) {
+      options = {};
+    }
+    this.debug("°°° TemporaryIdentifierWidget::ajax_submit °°°");
+    if (options.type == null) {
+      options.type = "POST";
+    }
+    if (options.url == null) {
+      options.url = this.get_portal_url();
+    }
+    if (options.context == null) {
+      options.context = this;
+    }
+    if (options.dataType == null) {
+      options.dataType = "json";
+    }
+    if (options.data == null) {
+      options.data = {};
+    }
+    if (options._authenticator == null) {
+      options._authenticator = $("input[name='_authenticator']").val();
+    }
+    console.debug(">>> ajax_submit::options=", options);
+    $(this).trigger("ajax:submit:start");
+    done = function() {
+      return $(this).trigger("ajax:submit:end");
+    };
+    return $.ajax(options).done(done);
+  };
+
+  TemporaryIdentifierWidgetController.prototype.get_portal_url = function() {
+    var url;
+    url = $("input[name=portal_url]").val();
+    return url || window.portal_url;
+  };
+
+  TemporaryIdentifierWidgetController.prototype.debug = function(message) {
+    return console.debug("[senaite.patient.temporary_identifier_widget] ", message);
+  };
+
+  return TemporaryIdentifierWidgetController;
+
+})();
+
+__webpack_exports__["default"] = TemporaryIdentifierWidgetController;
+
+}),
+/* 4 */
+/*!*** ./components/searchcache.js ***!*/
+/***/ (function(module, exports) {
+
+/*
+ * Per-page cache of search results
+ *
+ * Keeps the results of the last searches in a LRU map, so that searching the
+ * same term again, e.g. the same MRN selected in another column of the sample
+ * add form, does not query the server.
+ */
+
+class SearchCache {
+
+  constructor(options = {}) {
+    this.size = options.size || 100;
+    this.entries = new Map();
+  }
+
+  /**
+   * Returns the cached results for the term, or undefined
+   */
+  get(term) {
+    if (this.entries.has(term)) {
+      let results = this.entries.get(term);
+      // move to the end, so the least recently used entry comes first
+      this.entries.delete(term);
+      this.entries.set(term, results);
+      return results;
+    }
+    return undefined;
+  }
+
+  /**
+   * Stores the results of the term, evicting the least recently used entries
+   */
+  set(term, results) {
+    this.entries.delete(term);
+    this.entries.set(term, results);
+    while (this.entries.size > this.size) {
+      this.entries.delete(this.entries.keys().next().value);
+    }
+  }
+
+  clear() {
+    this.entries.clear();
+  }
+}
+
+/**
+ * Returns a function that delays the calls to `fn` until `wait` milliseconds
+ * have passed without further calls for the same key
+ */
+function debounce(fn, wait, key = () => "") {
+  let timers = new Map();
+  return function (...args) {
+    let id = key(...args);
+    clearTimeout(timers.get(id));
+    timers.set(id, setTimeout(() => {
+      timers.delete(id);
+      fn.apply(this, args);
+    }, wait));
+  };
+}
+
+module.exports = { SearchCache, debounce };
+
+}),
+/* 5 */
+/*!*** ./components/agedobwidget.coffee ***!*/
+/***/ (function(module, __webpack_exports__, __webpack_require__) {
+
+"use strict";
+__webpack_require__.r(__webpack_exports__);
+var jquery__WEBPACK_IMPORTED_MODULE_0__ = __webpack_require__(0);
+var jquery__WEBPACK_IMPORTED_MODULE_0___default = /*#__PURE__*/__webpack_require__.n(jquery__WEBPACK_IMPORTED_MODULE_0__);
+
+var $ = jquery__WEBPACK_IMPORTED_MODULE_0___default.a;
+
+var bind = function(fn, me) { return function() { return fn.apply(me, arguments); }; };
+
+var AgeDoBWidgetController = (function() {
+
+  function AgeDoBWidgetController() {
+    this.on_fallback_dob_change = bind(this.on_fallback_dob_change, this);
+    this.on_age_selector_change = bind(this.on_age_selector_change, this);
+    this.bind_event_handler = bind(this.bind_event_handler, this);
+    var el, i, len, radios, ref;
+    console.debug("AgeDoBWidgetController::load");
+    this.bind_event_handler();
+    radios = ".AgeDoBWidget input[type='radio'][checked]";
+    ref = document.querySelectorAll(radios);
+    for (i = 0, len = ref.length; i < len; i++) {
+      el = ref[i];
+      $(el).trigger("change");
+    }
+    return this;
+  }
+
+  AgeDoBWidgetController.prototype.bind_event_handler = function() {
+    var selector;
+    console.debug("AgeDoBWidgetController::bind_event_handler");
+    selector = ".AgeDoBWidget input[type='radio']";
+    $("body").on("change", selector, this.on_age_selector_change);
+    selector = ".AgeDoBWidget input[id$='-dob-fallback']";
+    return $("body").on("change", selector, this.on_fallback_dob_change);
+  };
+
+  AgeDoBWidgetController.prototype.on_age_selector_change = function(event) {
+    var age_controls, dob_controls, dob_field, el, ref, required, wrapper, year_field;
+    console.debug("AgeDoBWidgetController::on_age_selector_change");
+    el = event.currentTarget;
+    wrapper = el.closest(".AgeDoBWidget");
+    required = (ref = $(wrapper).attr("data-required") === '1') != null ? ref : {
+      required: ''
+    };
+    age_controls = wrapper.querySelector('[id$="_age_controls"]');
+    dob_controls = wrapper.querySelector('[id$="_dob_controls"]');
+    year_field = wrapper.querySelector('[id$=".years:ignore_empty:record"]');
+    dob_field = wrapper.querySelector('[id$=".dob:ignore_empty:record"]');
+    if ($(el).val() === "age") {
+      $(age_controls).show();
+      $(dob_controls).hide();
+      year_field.setAttribute('required', required);
+      return dob_field.removeAttribute('required');
+    } else {
+      $(age_controls).hide();
+      $(dob_controls).show();
+      year_field.removeAttribute('required');
+      return dob_field.setAttribute('required', required);
+    }
+  };
+
+  AgeDoBWidgetController.prototype.on_fallback_dob_change = function(event) {
+    var dob_field, dob_selector, el, wrapper;
+    console.debug("AgeDoBWidgetController::on_fallback_dob_change");
+    el = event.currentTarget;
+    wrapper = el.closest(".AgeDoBWidget");
+    dob_selector = wrapper.querySelector("input[id$='_dob_selector']");
+    dob_selector.setAttribute('checked', '');
+    $(dob_selector).trigger("change");
+    dob_field = wrapper.querySelector('[id$=".dob:ignore_empty:record"]');
+    return dob_field.value = el.value;
+  };
+
+  return AgeDoBWidgetController;
+
+})();
+
+__webpack_exports__["default"] = AgeDoBWidgetController;
+
+}),
+/* 6 */
+/*!*** ./components/patientform.coffee ***!*/
+/***/ (function(module, __webpack_exports__, __webpack_require__) {
+
+"use strict";
+__webpack_require__.r(__webpack_exports__);
+var jquery__WEBPACK_IMPORTED_MODULE_0__ = __webpack_require__(0);
+var jquery__WEBPACK_IMPORTED_MODULE_0___default = /*#__PURE__*/__webpack_require__.n(jquery__WEBPACK_IMPORTED_MODULE_0__);
+var _ymd_js__WEBPACK_IMPORTED_MODULE_1__ = __webpack_require__(7);
+
+var $ = jquery__WEBPACK_IMPORTED_MODULE_0___default.a;
+var get_ymd = _ymd_js__WEBPACK_IMPORTED_MODULE_1__["get_ymd"];
+var get_since_date = _ymd_js__WEBPACK_IMPORTED_MODULE_1__["get_since_date"];
+var is_ymd = _ymd_js__WEBPACK_IMPORTED_MODULE_1__["is_ymd"];
+var to_date = _ymd_js__WEBPACK_IMPORTED_MODULE_1__["to_date"];
+
+var AGE_FIELD = "form.widgets.age";
+var BIRTHDATE_FIELD = "form.widgets.birthdate";
+var ESTIMATED_FIELD = "form.widgets.estimated_birthdate";
+
+var bind = function(fn, me) { return function() { return fn.apply(me, arguments); }; };
+
+var PatientFormController = (function() {
+
+  function PatientFormController() {
+    this.update_age = bind(this.update_age, this);
+    this.is_estimated = bind(this.is_estimated, this);
+    this.set_birthdate = bind(this.set_birthdate, this);
+    this.get_birthdate = bind(this.get_birthdate, this);
+    this.get_form = bind(this.get_form, this);
+    this.on_age_change = bind(this.on_age_change, this);
+    this.on_estimated_change = bind(this.on_estimated_change, this);
+    this.on_birthdate_change = bind(this.on_birthdate_change, this);
+    this.bind_event_handler = bind(this.bind_event_handler, this);
+    var form;
+    console.debug("PatientFormController::load");
+    this.bind_event_handler();
+    form = this.get_form();
+    if (form) {
+      this.update_age(form);
+    }
+    return this;
+  }
+
+  PatientFormController.prototype.bind_event_handler = function() {
+    var selector;
+    console.debug("PatientFormController::bind_event_handler");
+    selector = "form input[name^='" + BIRTHDATE_FIELD + "']";
+    $("body").on("change", selector, this.on_birthdate_change);
+    selector = "form input[name^='" + ESTIMATED_FIELD + "']";
+    $("body").on("change", selector, this.on_estimated_change);
+    selector = "form input[name='" + AGE_FIELD + "']";
+    return $("body").on("change", selector, this.on_age_change);
+  };
+
+  PatientFormController.prototype.on_birthdate_change = function(event) {
+    console.debug("PatientFormController::on_birthdate_change");
+    return this.update_age(event.currentTarget.form);
+  };
+
+  PatientFormController.prototype.on_estimated_change = function(event) {
+    console.debug("PatientFormController::on_estimated_change");
+    return this.update_age(event.currentTarget.form);
+  };
+
+  PatientFormController.prototype.on_age_change = function(event) {
+    var age, el, form;
+    console.debug("PatientFormController::on_age_change");
+    el = event.currentTarget;
+    form = el.form;
+    age = el.value.trim();
+    if (this.is_estimated(form) && is_ymd(age)) {
+      this.set_birthdate(form, get_since_date(age));
+    }
+    return this.update_age(form);
+  };
+
+  PatientFormController.prototype.get_form = function() {
+    var field;
+    field = document.querySelector("form input[name='" + AGE_FIELD + "']");
+    return field != null ? field.form : void 0;
+  };
+
+  PatientFormController.prototype.get_birthdate = function(form) {
+    var field, parts;
+    field = form.querySelector("input[name='" + BIRTHDATE_FIELD + "']");
+    if (field == null) {
+      field = form.querySelector("input[name='" + BIRTHDATE_FIELD + "-date']");
+    }
+    if (field != null ? field.value : void 0) {
+      return to_date(field.value);
+    }
+    parts = ["year", "month", "day"].map(function(part) {
+      var ref;
+      return (ref = form.querySelector("[name='" + BIRTHDATE_FIELD + "-" + part + "']")) != null ? ref.value : void 0;
+    });
+    if (!parts.every(function(part) {
+      return part;
+    })) {
+      return null;
+    }
+    return to_date.apply(null, parts);
+  };
+
+  PatientFormController.prototype.set_birthdate = function(form, date) {
+    var field, pad;
+    if (!date) {
+      return;
+    }
+    field = form.querySelector("input[name='" + BIRTHDATE_FIELD + "']");
+    if (field == null) {
+      field = form.querySelector("input[name='" + BIRTHDATE_FIELD + "-date']");
+    }
+    if (!field) {
+      return;
+    }
+    pad = function(num) {
+      return ("0" + num).slice(-2);
+    };
+    return field.value = [date.getFullYear(), pad(date.getMonth() + 1), pad(date.getDate())].join("-");
+  };
+
+  PatientFormController.prototype.is_estimated = function(form) {
+    var field;
+    field = form.querySelector("input[type='checkbox'][name^='" + ESTIMATED_FIELD + "']");
+    return (field != null ? field.checked : void 0) || false;
+  };
+
+  PatientFormController.prototype.update_age = function(form) {
+    var age_field, birthdate, wrapper;
+    age_field = form.querySelector("input[name='" + AGE_FIELD + "']");
+    if (!age_field) {
+      return;
+    }
+    birthdate = this.get_birthdate(form);
+    if (birthdate) {
+      age_field.value = get_ymd(birthdate).toUpperCase();
+    }
+    wrapper = age_field.closest("[id^='formfield-']") || age_field;
+    if (birthdate || this.is_estimated(form)) {
+      return $(wrapper).show();
+    } else {
+      return $(wrapper).hide();
+    }
+  };
+
+  return PatientFormController;
+
+})();
+
+__webpack_exports__["default"] = PatientFormController;
+
+}),
+/* 7 */
+/*!*** ./components/ymd.js ***!*/
+/***/ (function(module, exports) {
+
+/*
+ * Age computation in ymd format ("12y 3m 4d")
+ *
+ * Mirrors `senaite.core.api.dtime.get_ymd`, that relies on dateutil's
+ * `relativedelta`. Both implementations are checked against the same vectors
+ * from `src/senaite/patient/tests/data/ymd.json`.
+ */
+
+const YMD_REGEX = /^\s*(\d+y)?\s*(\d+m)?\s*(\d+d)?\s*$/i;
+
+/**
+ * Returns a date (at midnight, local time) from a "YYYY-MM-DD" string, a Date
+ * or from year, month and day parts. Returns null if not a valid date
+ */
+function to_date(value, month, day) {
+  let year = value;
+  if (value instanceof Date) {
+    if (isNaN(value.getTime())) return null;
+    return new Date(value.getFullYear(), value.getMonth(), value.getDate());
+  }
+  if (month === undefined) {
+    let match = /^\s*(\d{4})-(\d{1,2})-(\d{1,2})/.exec(value || "");
+    if (!match) return null;
+    [year, month, day] = match.slice(1);
+  }
+  [year, month, day] = [year, month, day].map((it) => parseInt(it, 10));
+  if ([year, month, day].some(isNaN)) return null;
+  let date = new Date(year, month - 1, day);
+  // reject overflows, e.g. 2001-02-29
+  if (date.getMonth() !== month - 1 || date.getDate() !== day) return null;
+  return date;
+}
+
+function days_in_month(year, month) {
+  return new Date(year, month + 1, 0).getDate();
+}
+
+/**
+ * Adds the months to the date, clamping the day to the end of the month
+ */
+function add_months(date, months) {
+  let total = date.getFullYear() * 12 + date.getMonth() + months;
+  let year = Math.floor(total / 12);
+  let month = total - year * 12;
+  let day = Math.min(date.getDate(), days_in_month(year, month));
+  return new Date(year, month, day);
+}
+
+/**
+ * Returns the [years, months, days] elapsed from `from` to `to`, with the
+ * same semantics as relativedelta(to, from)
+ */
+function relative_delta(from, to) {
+  let sign = to >= from ? 1 : -1;
+  let months = (to.getFullYear() - from.getFullYear()) * 12
+    + to.getMonth() - from.getMonth();
+  let shifted = add_months(from, months);
+  if ((shifted - to) * sign > 0) {
+    months -= sign;
+    shifted = add_months(from, months);
+  }
+  // dates are at midnight, round to absorb DST changes
+  let days = Math.round((to - shifted) / 86400000);
+  let years = Math.trunc(months / 12);
+  return [years, months - years * 12, days];
+}
+
+/**
+ * Returns the age in ymd format of the given birthdate on the given date
+ * (defaults to today). Returns an empty string if the birthdate is not valid
+ */
+function get_ymd(birthdate, on_date) {
+  let from = to_date(birthdate);
+  let to = on_date ? to_date(on_date) : to_date(new Date());
+  if (!from || !to) return "";
+  let parts = relative_delta(from, to)
+    .map((value, idx) => value ? `${value}${"ymd"[idx]}` : "")
+    .filter((it) => it);
+  return parts.join(" ") || "0d";
+}
+
+/**
+ * Returns the date (at midnight, local time) when a period in ymd format
+ * started, counting back from the given date (defaults to today). Returns null
+ * if the period is not valid
+ */
+function get_since_date(ymd, on_date) {
+  if (!is_ymd(ymd)) return null;
+  let to = on_date ? to_date(on_date) : to_date(new Date());
+  if (!to) return null;
+  let [years, months, days] = ["y", "m", "d"].map((unit) => {
+    let match = new RegExp(`(\\d+)${unit}`, "i").exec(ymd);
+    return match ? parseInt(match[1], 10) : 0;
+  });
+  let since = add_months(to, -(years * 12 + months));
+  since.setDate(since.getDate() - days);
+  return since;
+}
+
+/**
+ * Returns whether the value is a period in ymd format
+ */
+function is_ymd(value) {
+  if (!value || !value.trim()) return false;
+  return YMD_REGEX.test(value);
+}
+
+module.exports = { to_date, relative_delta, get_ymd, get_since_date, is_ymd };
+
+})
+]);
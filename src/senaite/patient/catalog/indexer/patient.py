@@ -19,7 +19,12 @@
 # Some rights reserved, see README and LICENSE.
 
 from plone.indexer import indexer
+from senaite.patient.api import get_patient_change
+from senaite.patient.api import get_patient_client_uids
+from senaite.patient.api import get_sortable_name
 from senaite.patient.interfaces import IPatient
+from senaite.patient.stats import get_sample_stats
+from senaite.patient.stats import NO_SAMPLE_DATE
 
 
 @indexer(IPatient)
@@ -61,6 +66,27 @@ def patient_marital_status(instance):
     return instance.getMaritalStatus()
 
 
+@indexer(IPatient)
+def patient_client_uids(instance):
+    """Return the UIDs of the container client and the shared clients
+    """
+    return get_patient_client_uids(instance)
+
+
+@indexer(IPatient)
+def patient_sex(instance):
+    """Return patient sex
+    """
+    return instance.getSex()
+
+
+@indexer(IPatient)
+def patient_gender(instance):
+    """Return patient gender
+    """
+    return instance.getGender()
+
+
 @indexer(IPatient)
 def patient_mrn(instance):
     """Index Medical Record #
@@ -76,6 +102,13 @@ def patient_fullname(instance):
     return fullname
 
 
+@indexer(IPatient)
+def patient_sortable_name(instance):
+    """Index the name folded for sorting, unique per patient
+    """
+    return get_sortable_name(instance)
+
+
 @indexer(IPatient)
 def patient_email(instance):
     """Index email
@@ -137,3 +170,35 @@ def patient_searchable_mrn(instance):
     ]
     searchable_text_tokens = filter(None, searchable_text_tokens)
     return " ".join(searchable_text_tokens)
+
+
+@indexer(IPatient)
+def patient_change_seq(instance):
+    """Index the sequence of the last change
+    """
+    return get_patient_change(instance).get("seq", 0)
+
+
+@indexer(IPatient)
+def patient_change_kind(instance):
+    """Metadata with the kind of the last change
+    """
+    return get_patient_change(instance).get("kind", "")
+
+
+@indexer(IPatient)
+def patient_samples_count(instance):
+    """Index the number of samples of the patient
+    """
+    return get_sample_stats(instance).get("total", 0)
+
+
+@indexer(IPatient)
+def patient_last_sample_date(instance):
+    """Index the date of the last sample of the patient
+
+    Patients without samples are indexed with a sentinel date, so they are
+    not left out when sorting by this index
+    """
+    last_sample_date = get_sample_stats(instance).get("last_sample_date")
+    return last_sample_date or NO_SAMPLE_DATE
@@ -41,6 +41,20 @@ def medical_record_number(instance):
     return [instance.getMedicalRecordNumberValue() or None]
 
 
+@indexer(IAnalysisRequest)
+def patient_uid(instance):
+    """Returns the UID of the patient assigned to the sample
+    """
+    return instance.getPatientUID() or None
+
+
+@indexer(IAnalysisRequest)
+def age_at_sampling(instance):
+    """Returns the age of the patient in days when the sample was collected
+    """
+    return instance.getAgeAtSampling()
+
+
 @adapter(IAnalysisRequest, ISenaitePatientLayer, ISampleCatalog)
 @implementer(IListingSearchableTextProvider)
 class ListingSearchableTextProvider(object):
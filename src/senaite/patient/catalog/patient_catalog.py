@@ -18,6 +18,9 @@
 # Copyright 2020-2025 by it's authors.
 # Some rights reserved, see README and LICENSE.
 
+from zlib import crc32
+
+from Acquisition import aq_parent
 from App.class_init import InitializeClass
 from senaite.core.catalog.base_catalog import COLUMNS as BASE_COLUMNS
 from senaite.core.catalog.base_catalog import INDEXES as BASE_INDEXES
@@ -26,6 +29,7 @@ from senaite.patient.interfaces import IPatientCatalog
 from zope.interface import implementer
 
 CATALOG_ID = "senaite_catalog_patient"
+SHADOW_CATALOG_ID = "senaite_catalog_patient_shadow"
 CATALOG_TITLE = "Senaite Patient Catalog"
 
 INDEXES = BASE_INDEXES + [
@@ -36,18 +40,44 @@ INDEXES = BASE_INDEXES + [
     ("patient_race_keys", "", "KeywordIndex"),
     ("patient_ethnicity_keys", "", "KeywordIndex"),
     ("patient_marital_status", "", "FieldIndex"),
+    ("patient_sex", "", "FieldIndex"),
+    ("patient_gender", "", "FieldIndex"),
+    ("patient_client_uids", "", "KeywordIndex"),
     ("patient_email", "", "FieldIndex"),
     ("patient_email_report", "", "BooleanIndex"),
     ("patient_fullname", "", "FieldIndex"),
+    ("patient_sortable_name", "", "FieldIndex"),
     ("patient_birthdate", "", "DateIndex"),
     ("patient_searchable_text", "", "ZCTextIndex"),
     ("patient_searchable_mrn", "", "ZCTextIndex"),
     ("patient_deceased", "", "BooleanIndex"),
+    ("patient_change_seq", "", "FieldIndex"),
+    ("patient_samples_count", "", "FieldIndex"),
+    ("patient_last_sample_date", "", "DateIndex"),
 ]
 
 COLUMNS = BASE_COLUMNS + [
     # attribute name
     "mrn",
+    "getFullname",
+    "getFirstname",
+    "getMiddlename",
+    "getLastname",
+    "getMaternalLastname",
+    "getSex",
+    "getGender",
+    "getBirthdate",
+    "getEstimatedBirthdate",
+    "getEmail",
+    "getEmailReport",
+    "getPhone",
+    "getIdentifiers",
+    "getDeceased",
+    "patient_change_seq",
+    "patient_change_kind",
+    "patient_samples_count",
+    "patient_last_sample_date",
+    "patient_sortable_name",
 ]
 
 TYPES = [
@@ -67,5 +97,34 @@ class PatientCatalog(BaseCatalog):
     def mapped_catalog_types(self):
         return TYPES
 
+    def catalog_object(self, object, uid=None, *args, **kwargs):
+        """Catalog the object and track the write for the shadow build
+        """
+        BaseCatalog.catalog_object(self, object, uid, *args, **kwargs)
+        if uid is None:
+            uid = "/".join(object.getPhysicalPath())
+        self.track_write(uid)
+
+    def uncatalog_object(self, uid):
+        """Uncatalog the object and track the write for the shadow build
+        """
+        BaseCatalog.uncatalog_object(self, uid)
+        self.track_write(uid)
+
+    def track_write(self, uid):
+        """Records the path of the written object in the shadow catalog that
+        is being built, so the write can be replayed there before the swap
+        """
+        if self.getId() != CATALOG_ID:
+            return
+        shadow = getattr(aq_parent(self), SHADOW_CATALOG_ID, None)
+        pending = getattr(shadow, "_pending", None)
+        if not pending:
+            return
+        # writes are spread over several sets, so that concurrent
+        # transactions rarely write to the same one
+        shard = (crc32(uid) & 0xffffffff) % len(pending)
+        pending[shard].insert(uid)
+
 
 InitializeClass(PatientCatalog)
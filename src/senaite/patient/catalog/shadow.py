@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Online rebuild of the patient catalog
+
+The catalog is rebuilt into a shadow catalog, while the live catalog keeps
+serving queries. Writes to the live catalog during the build are tracked in
+the shadow catalog and replayed there. Once the shadow is up to date, it
+replaces the live catalog in a single transaction, so searches never see a
+partially built index.
+
+Transactions that started before the swap and commit after it still write
+into the former live catalog. Their writes keep being tracked in the new
+catalog, that replays them until no further writes come in.
+"""
+
+import time
+
+import transaction
+from Acquisition import aq_base
+from BTrees.OOBTree import OOTreeSet
+from bika.lims import api
+from senaite.core.api.catalog import add_column
+from senaite.core.api.catalog import add_index
+from senaite.patient import logger
+from senaite.patient.catalog.patient_catalog import CATALOG_ID
+from senaite.patient.catalog.patient_catalog import COLUMNS
+from senaite.patient.catalog.patient_catalog import INDEXES
+from senaite.patient.catalog.patient_catalog import SHADOW_CATALOG_ID
+from senaite.patient.catalog.patient_catalog import PatientCatalog
+
+# Number of objects to catalog before committing
+BATCH_SIZE = 1000
+
+# Swap when less pending writes than this are left after a replay
+MAX_PENDING_SWAP = 100
+
+# Maximum number of replays before swapping anyway
+MAX_REPLAYS = 10
+
+# Number of sets the pending writes are spread over
+PENDING_SHARDS = 16
+
+# Seconds without writes to the former live catalog before the tracking of
+# the writes stops
+DRAIN_WAIT = 60
+
+
+def create_shadow_catalog(portal):
+    """Creates an empty shadow catalog with the declared indexes and columns
+    """
+    if SHADOW_CATALOG_ID in portal.objectIds():
+        raise ValueError("Shadow catalog {} exists already, rebuild with "
+                         "reset to remove it".format(SHADOW_CATALOG_ID))
+    shadow = PatientCatalog()
+    shadow.id = SHADOW_CATALOG_ID
+    portal._setObject(SHADOW_CATALOG_ID, shadow, suppress_events=True)
+    shadow = portal._getOb(SHADOW_CATALOG_ID)
+    for index, attr, index_type in INDEXES:
+        add_index(shadow, index, index_type)
+    for column in COLUMNS:
+        add_column(shadow, column)
+    # start tracking the writes to the live catalog
+    shadow._pending = tuple([OOTreeSet() for num in range(PENDING_SHARDS)])
+    return shadow
+
+
+def remove_shadow_catalog(portal):
+    """Removes the shadow catalog, e.g. the one left by a failed rebuild
+
+    :returns: True if the shadow catalog existed
+    """
+    if SHADOW_CATALOG_ID not in portal.objectIds():
+        return False
+    portal._delObject(SHADOW_CATALOG_ID, suppress_events=True)
+    return True
+
+
+def catalog_paths(shadow, paths, batch_size=BATCH_SIZE):
+    """Catalogs the objects of the given paths in the shadow catalog
+    """
+    portal = api.get_portal()
+    total = len(paths)
+    started = time.time()
+    for num, path in enumerate(paths, 1):
+        obj = portal.unrestrictedTraverse(path, None)
+        if obj is None:
+            # the object was deleted in the meantime
+            if shadow.getrid(path) is not None:
+                shadow.uncatalog_object(path)
+            continue
+        shadow.catalog_object(obj, path)
+        obj._p_deactivate()
+
+        if num % batch_size == 0:
+            transaction.commit()
+            portal._p_jar.cacheMinimize()
+            logger.info("Shadow catalog: {}/{} ({:.1f}/s)".format(
+                num, total, num / (time.time() - started)))
+    transaction.commit()
+
+
+def count_pending(shadow):
+    """Returns the number of writes tracked so far
+    """
+    return sum(map(len, shadow._pending))
+
+
+def pop_pending(shadow):
+    """Returns the paths of the writes tracked so far and forgets them
+    """
+    paths = []
+    for pending in shadow._pending:
+        shard = list(pending)
+        for path in shard:
+            pending.remove(path)
+        paths.extend(shard)
+    return sorted(set(paths))
+
+
+def swap(portal, shadow):
+    """Replaces the live catalog by the shadow catalog
+    """
+    portal._delObject(CATALOG_ID, suppress_events=True)
+    portal._delObject(SHADOW_CATALOG_ID, suppress_events=True)
+    shadow = aq_base(shadow)
+    shadow.id = CATALOG_ID
+    portal._setObject(CATALOG_ID, shadow, suppress_events=True)
+    return portal._getOb(CATALOG_ID)
+
+
+def build_and_swap(portal, live, shadow, batch_size=BATCH_SIZE):
+    """Catalogs the patients in the shadow catalog, replays the writes to the
+    live catalog and swaps them
+    """
+    # the live catalog knows all the patients
+    paths = [brain.getPath() for brain in live(portal_type="Patient")]
+    catalog_paths(shadow, paths, batch_size=batch_size)
+
+    # replay the writes to the live catalog until only a few are left
+    for replay in range(MAX_REPLAYS):
+        paths = pop_pending(shadow)
+        logger.info("Replaying {} writes to the patient catalog".format(
+            len(paths)))
+        catalog_paths(shadow, paths, batch_size=batch_size)
+        if count_pending(shadow) < MAX_PENDING_SWAP:
+            break
+
+    # replay the last writes and swap in a single transaction
+    paths = pop_pending(shadow)
+    for path in paths:
+        obj = portal.unrestrictedTraverse(path, None)
+        if obj is not None:
+            shadow.catalog_object(obj, path)
+        elif shadow.getrid(path) is not None:
+            shadow.uncatalog_object(path)
+    catalog = swap(portal, shadow)
+    transaction.commit()
+    return catalog
+
+
+def drain_pending(catalog, wait=DRAIN_WAIT, batch_size=BATCH_SIZE):
+    """Replays the writes tracked after the swap until none came in for the
+    given seconds, and stops tracking the writes
+
+    The writes are those of the transactions that started before the swap,
+    that still see the former live catalog.
+    """
+    quiet = time.time()
+    while True:
+        # see the writes committed in the meantime
+        transaction.begin()
+        paths = pop_pending(catalog)
+        if paths:
+            logger.info("Replaying {} late writes to the patient "
+                        "catalog".format(len(paths)))
+            catalog_paths(catalog, paths, batch_size=batch_size)
+            quiet = time.time()
+        elif time.time() - quiet >= wait:
+            break
+        else:
+            time.sleep(1)
+    del catalog._pending
+    transaction.commit()
+
+
+def rebuild_patient_catalog(batch_size=BATCH_SIZE, reset=False,
+                            wait=DRAIN_WAIT):
+    """Rebuilds the patient catalog into a shadow catalog and swaps it with
+    the live catalog once it is complete
+
+    The shadow catalog is removed if the rebuild fails before the swap, so
+    that the writes to the live catalog are no longer tracked. With reset, a
+    shadow catalog that exists already is removed before the rebuild. After
+    the swap, the late writes are replayed until none came in for `wait`
+    seconds.
+    """
+    logger.info("Rebuilding patient catalog online ...")
+    portal = api.get_portal()
+    live = api.get_tool(CATALOG_ID)
+    if reset and remove_shadow_catalog(portal):
+        logger.warn("Removed existing shadow catalog {}".format(
+            SHADOW_CATALOG_ID))
+    shadow = create_shadow_catalog(portal)
+    transaction.commit()
+
+    try:
+        catalog = build_and_swap(portal, live, shadow, batch_size=batch_size)
+    except Exception:
+        transaction.abort()
+        logger.error("Rebuilding patient catalog failed, removing the "
+                     "shadow catalog {}".format(SHADOW_CATALOG_ID))
+        remove_shadow_catalog(portal)
+        transaction.commit()
+        raise
+
+    # writes committed after the swap were tracked in the new catalog
+    drain_pending(catalog, wait=wait, batch_size=batch_size)
+
+    logger.info("Rebuilding patient catalog online [DONE]")
+    return catalog
@@ -19,6 +19,7 @@
 # Some rights reserved, see README and LICENSE.
 
 from archetypes.schemaextender.field import ExtensionField
+from Products.Archetypes.public import IntegerField
 from Products.Archetypes.public import StringField
 from Products.Archetypes.public import TextField
 from senaite.core.browser.fields.datetime import DateTimeField
@@ -29,6 +30,11 @@ class ExtDateTimeField(ExtensionField, DateTimeField):
     """
 
 
+class ExtIntegerField(ExtensionField, IntegerField):
+    """Extended Integer Field
+    """
+
+
 class ExtStringField(ExtensionField, StringField):
     """Extended String Field
     """
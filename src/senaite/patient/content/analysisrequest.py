@@ -36,6 +36,7 @@ from senaite.patient.browser.widgets import TemporaryIdentifierWidget
 from senaite.patient.catalog import PATIENT_CATALOG
 from senaite.patient.config import GENDERS
 from senaite.patient.config import SEXES
+from senaite.patient.content import ExtIntegerField
 from senaite.patient.content import ExtStringField
 from senaite.patient.content import ExtTextField
 from senaite.patient.content.fields import AgeDateOfBirthField
@@ -240,6 +241,35 @@ RoomNumberField = ExtStringField(
 )
 # ------ fin nuevos campos -----
 
+# UID of the patient the sample is assigned to, set when the patient is
+# resolved or created from the Medical Record Number
+PatientUIDField = ExtStringField(
+    "PatientUID",
+    required=False,
+    default="",
+    read_permission=View,
+    write_permission=FieldEditMRN,
+    widget=StringWidget(
+        label=_("Patient UID"),
+        visible=False,
+    ),
+)
+# Age of the patient in days when the sample was collected, set when the date
+# of birth or the date sampled change, so that samples can be searched and
+# sorted by age
+AgeAtSamplingField = ExtIntegerField(
+    "AgeAtSampling",
+    required=False,
+    default=None,
+    read_permission=View,
+    write_permission=FieldEditDateOfBirth,
+    widget=StringWidget(
+        label=_("Age at sampling"),
+        visible=False,
+    ),
+)
+
+
 @implementer(IOrderableSchemaExtender, IBrowserLayerAwareExtender)
 class AnalysisRequestSchemaExtender(object):
     """Extends the AnalysisRequest with additional fields
@@ -264,6 +294,8 @@ class AnalysisRequestSchemaExtender(object):
             # ⬇️ añadidos para que se muestren
             PatientWeightField,
             RoomNumberField,
+            PatientUIDField,
+            AgeAtSamplingField,
         ]
 
 
@@ -25,12 +25,15 @@ from archetypes.schemaextender.field import ExtensionField
 from Products.Archetypes.Field import ObjectField
 from senaite.core.api import dtime
 from senaite.patient import api as patient_api
+from senaite.patient.adapters.guards import invalidate_guards
 from senaite.patient.browser.widgets import AgeDoBWidget
 from senaite.patient.browser.widgets import FullnameWidget
 from senaite.patient.browser.widgets import TemporaryIdentifierWidget
 from senaite.patient.config import AUTO_ID_MARKER
 from senaite.patient.config import PATIENT_CATALOG
 from senaite.patient.interfaces import IAgeDateOfBirthField
+from senaite.patient.migration import migrate
+from senaite.patient.migration import needs_migration
 from zope.interface import implementer
 
 
@@ -58,6 +61,11 @@ class TemporaryIdentifierField(ExtensionField, ObjectField):
             val = {"value": val, "temporary": False}
         return val
 
+    def set(self, instance, value, **kwargs):
+        super(TemporaryIdentifierField, self).set(instance, value, **kwargs)
+        # the transition guards memoize whether the identifier is temporary
+        invalidate_guards(instance)
+
     def get_linked_patient(self, instance):
         """Get the linked patient
         """
@@ -143,7 +151,14 @@ class AgeDateOfBirthField(ExtensionField, ObjectField):
     })
     security = ClassSecurityInfo()
 
+    def get(self, instance, **kwargs):
+        if needs_migration(instance):
+            migrate(instance)
+        return super(AgeDateOfBirthField, self).get(instance, **kwargs)
+
     def set(self, instance, value, **kwargs):
+        if needs_migration(instance):
+            migrate(instance)
 
         dob, from_age, estimated = None, False, False
 
@@ -49,6 +49,8 @@ from senaite.patient.config import GENDERS
 from senaite.patient.config import SEXES
 from senaite.patient.i18n import translate
 from senaite.patient.interfaces import IPatient
+from senaite.patient.migration import migrate
+from senaite.patient.migration import needs_migration
 from six import string_types
 from z3c.form.interfaces import NO_VALUE
 from zope import schema
@@ -471,6 +473,22 @@ class Patient(Container):
 
     security = ClassSecurityInfo()
 
+    @security.private
+    def accessor(self, *args, **kwargs):
+        """Returns the field accessor, migrating the object first if needed
+        """
+        if needs_migration(self):
+            migrate(self)
+        return super(Patient, self).accessor(*args, **kwargs)
+
+    @security.private
+    def mutator(self, *args, **kwargs):
+        """Returns the field mutator, migrating the object first if needed
+        """
+        if needs_migration(self):
+            migrate(self)
+        return super(Patient, self).mutator(*args, **kwargs)
+
     @security.protected(permissions.View)
     def Title(self):
         return self.getFullname()
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Detection of duplicate patients registered with different MRNs
+
+Patients are grouped in blocks that share a blocking key (normalized name
+parts, birthdate and identifiers), so candidates are only compared within a
+block instead of comparing every patient with each other. A pair of patients
+that shares more than one key is only scored in the block of the lowest key
+they have in common, so that no pair is scored twice. Blocks are scored in a
+process pool and the pairs above the threshold are written to a CSV report.
+
+The functions of this module work with plain records (dicts), built from the
+patient catalog metadata, so that no object is woken up.
+"""
+
+import csv
+import time
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from multiprocessing import Pool
+
+from senaite.patient import logger
+from senaite.patient.api import get_patient_catalog
+
+# Blocks with more patients are skipped, as they are not selective enough
+MAX_BLOCK_SIZE = 500
+
+# Minimum score for a pair of patients to be reported
+DEFAULT_THRESHOLD = 0.8
+
+# Number of blocks sent to a worker process at once
+BLOCKS_PER_TASK = 200
+
+# Columns of the report
+REPORT_COLUMNS = (
+    "score", "reasons",
+    "mrn_a", "fullname_a", "birthdate_a", "sex_a", "uid_a",
+    "mrn_b", "fullname_b", "birthdate_b", "sex_b", "uid_b",
+)
+
+
+def normalize(value):
+    """Returns the value in lowercase, without accents nor non-alphanumeric
+    characters
+    """
+    if not value:
+        return u""
+    if not isinstance(value, unicode):
+        value = value.decode("utf8")
+    value = unicodedata.normalize("NFKD", value)
+    value = u"".join([c for c in value if not unicodedata.combining(c)])
+    return u"".join([c for c in value.lower() if c.isalnum()])
+
+
+def to_record(brain):
+    """Returns a plain record from a patient catalog brain
+    """
+    birthdate = brain.getBirthdate
+    identifiers = brain.getIdentifiers or []
+    return {
+        "uid": brain.UID,
+        "mrn": brain.mrn,
+        "fullname": brain.getFullname,
+        "firstname": normalize(brain.getFirstname),
+        "middlename": normalize(brain.getMiddlename),
+        "lastname": normalize(brain.getLastname),
+        "maternal_lastname": normalize(brain.getMaternalLastname),
+        "birthdate": birthdate.isoformat() if birthdate else u"",
+        "sex": brain.getSex or u"",
+        "identifiers": [(i.get("key"), normalize(i.get("value")))
+                        for i in identifiers if i.get("value")],
+    }
+
+
+def get_blocking_keys(record):
+    """Returns the blocking keys of the record
+    """
+    keys = set()
+    first = record["firstname"]
+    last = record["lastname"] or record["maternal_lastname"]
+    dob = record["birthdate"]
+    if dob and last:
+        keys.add(u"b:{}:l:{}".format(dob, last[:3]))
+    if dob and first:
+        keys.add(u"b:{}:f:{}".format(dob, first[:3]))
+    if first and last:
+        # tolerates typos in the birthdate
+        keys.add(u"n:{}:{}".format(last, first))
+    for key, value in record["identifiers"]:
+        keys.add(u"i:{}:{}".format(key, value))
+    return sorted(keys)
+
+
+def build_blocks(records):
+    """Returns a dict of blocking key -> list of records
+    """
+    blocks = defaultdict(list)
+    for record in records:
+        record["keys"] = get_blocking_keys(record)
+        for key in record["keys"]:
+            blocks[key].append(record)
+
+    # drop the blocks that are not selective enough, as well as their keys
+    # from the records, so the pairs are still scored in the other blocks
+    oversized = set()
+    for key, block in blocks.items():
+        if len(block) > MAX_BLOCK_SIZE:
+            logger.warn("Skipping block {} with {} patients".format(
+                key, len(block)))
+            oversized.add(key)
+            del blocks[key]
+    if oversized:
+        for record in records:
+            record["keys"] = filter(lambda k: k not in oversized,
+                                    record["keys"])
+    return blocks
+
+
+def similarity(a, b):
+    """Returns the similarity ratio between two strings
+    """
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def score(a, b):
+    """Returns a tuple of (score, reasons) for the two records
+    """
+    reasons = []
+
+    ids_a = set(a["identifiers"])
+    if ids_a.intersection(b["identifiers"]):
+        reasons.append("identifier")
+
+    name_a = u" ".join(filter(None, [a["firstname"], a["lastname"],
+                                     a["maternal_lastname"]]))
+    name_b = u" ".join(filter(None, [b["firstname"], b["lastname"],
+                                     b["maternal_lastname"]]))
+    name = similarity(name_a, name_b)
+    if name >= 0.9:
+        reasons.append("name")
+
+    dob = 0.0
+    if a["birthdate"] and a["birthdate"] == b["birthdate"]:
+        dob = 1.0
+        reasons.append("birthdate")
+    elif a["birthdate"] and b["birthdate"]:
+        # e.g. day and month swapped or a single digit typo
+        dob = similarity(a["birthdate"], b["birthdate"]) * 0.5
+
+    value = 0.6 * name + 0.4 * dob
+    if "identifier" in reasons:
+        value = max(value, 0.95)
+    if a["sex"] and b["sex"] and a["sex"] != b["sex"]:
+        value *= 0.8
+        reasons.append("sex mismatch")
+    return round(value, 3), reasons
+
+
+def score_blocks(args):
+    """Scores the pairs of the given blocks. Returns a list of matches
+
+    A pair is only scored in the block of the lowest key both records share.
+    """
+    blocks, threshold = args
+    matches = []
+    for key, records in blocks:
+        for i, a in enumerate(records):
+            for b in records[i + 1:]:
+                common = set(a["keys"]).intersection(b["keys"])
+                if min(common) != key:
+                    continue
+                value, reasons = score(a, b)
+                if value >= threshold:
+                    matches.append((value, reasons, a, b))
+    return matches
+
+
+def iter_tasks(blocks, threshold):
+    """Generates the tasks for the worker processes
+    """
+    chunk = []
+    for key, records in blocks.iteritems():
+        if len(records) < 2:
+            continue
+        chunk.append((key, records))
+        if len(chunk) >= BLOCKS_PER_TASK:
+            yield chunk, threshold
+            chunk = []
+    if chunk:
+        yield chunk, threshold
+
+
+def find_duplicates(records, threshold=DEFAULT_THRESHOLD, processes=None):
+    """Returns the list of (score, reasons, record a, record b) of the
+    possible duplicates, sorted by score in descending order
+
+    :param records: iterable of patient records
+    :param threshold: minimum score of the pairs to return
+    :param processes: number of worker processes. Defaults to the number of
+        CPUs. If 1, pairs are scored in the current process
+    """
+    started = time.time()
+    records = list(records)
+    blocks = build_blocks(records)
+    logger.info("Built {} blocks in {:.1f}s".format(
+        len(blocks), time.time() - started))
+
+    tasks = iter_tasks(blocks, threshold)
+    matches = []
+    if processes == 1:
+        for task in tasks:
+            matches.extend(score_blocks(task))
+    else:
+        pool = Pool(processes=processes)
+        try:
+            for result in pool.imap_unordered(score_blocks, tasks):
+                matches.extend(result)
+        finally:
+            pool.close()
+            pool.join()
+
+    matches.sort(key=lambda match: match[0], reverse=True)
+    logger.info("Found {} possible duplicates in {:.1f}s".format(
+        len(matches), time.time() - started))
+    return matches
+
+
+def write_report(matches, path):
+    """Writes the matches to a CSV report
+    """
+    def to_utf8(value):
+        if isinstance(value, unicode):
+            return value.encode("utf8")
+        return value
+
+    with open(path, "wb") as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_COLUMNS)
+        for value, reasons, a, b in matches:
+            row = [value, ", ".join(reasons)]
+            for record in (a, b):
+                row.extend([record["mrn"], record["fullname"],
+                            record["birthdate"], record["sex"],
+                            record["uid"]])
+            writer.writerow(map(to_utf8, row))
+
+
+def get_patient_records():
+    """Generates the records of all patients from the patient catalog
+    """
+    catalog = get_patient_catalog()
+    for brain in catalog(portal_type="Patient"):
+        yield to_record(brain)
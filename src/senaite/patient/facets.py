@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Facets of the patient folder
+
+The number of patients per facet value is computed by intersecting the result
+sets of the indexes of the patient catalog, as sets of record ids, so that no
+brain nor object is loaded. As in the catalog searches, only the patients the
+current user is allowed to view are counted. The counts are cached by site,
+by the roles of the user and by the counters of the patient and client
+catalogs, so they are computed again when any of the catalogs changes.
+"""
+
+from datetime import date
+from datetime import timedelta
+
+from BTrees.IIBTree import intersection
+from BTrees.IIBTree import IITreeSet
+from bika.lims import api
+from DateTime import DateTime
+from dateutil.relativedelta import relativedelta
+from senaite.core.catalog import CLIENT_CATALOG
+from senaite.patient import messageFactory as _
+from senaite.patient.catalog import PATIENT_CATALOG
+from senaite.patient.pagination import get_allowed_roles_and_users
+
+# Tuples of (facet, index) of the facets computed from the values of an index
+INDEX_FACETS = (
+    ("sex", "patient_sex"),
+    ("gender", "patient_gender"),
+    ("marital_status", "patient_marital_status"),
+    ("race", "patient_race_keys"),
+    ("ethnicity", "patient_ethnicity_keys"),
+    ("identifier", "patient_identifier_keys"),
+)
+
+# Tuples of (id, title, min years, max years) of the age bands
+AGE_BANDS = (
+    ("0-1", _(u"Under 1 year"), 0, 1),
+    ("1-12", _(u"1 to 11 years"), 1, 12),
+    ("12-18", _(u"12 to 17 years"), 12, 18),
+    ("18-65", _(u"18 to 64 years"), 18, 65),
+    ("65+", _(u"65 years or more"), 65, None),
+)
+
+# Facets in the order they are displayed
+FACETS = tuple([facet for facet, index in INDEX_FACETS]) + (
+    "age_band", "client")
+
+# Query of the patients the facets are computed for
+BASE_QUERY = {
+    "portal_type": "Patient",
+}
+
+# Maximum number of facet selections whose counts are cached
+MAX_CACHE_SIZE = 500
+
+# Facet counts by (site path, user roles, catalog counters, selection, query,
+# day)
+_cache = {}
+
+
+def get_age_band_query(band, today=None):
+    """Returns the query of the birthdates of the given age band
+    """
+    bands = dict([(b[0], b[2:]) for b in AGE_BANDS])
+    if band not in bands:
+        return None
+    min_years, max_years = bands[band]
+    today = today or date.today()
+    # the patients born that very day are min_years old
+    end = today - relativedelta(years=min_years)
+    end = DateTime(end.isoformat()) + 1 - 1.0 / 86400
+    if max_years is None:
+        return {"query": end, "range": "max"}
+    start = today - relativedelta(years=max_years) + timedelta(days=1)
+    start = DateTime(start.isoformat())
+    return {"query": [start, end], "range": "min:max"}
+
+
+def get_clients():
+    """Returns a dict of client UID -> (path, title)
+    """
+    query = {"portal_type": "Client"}
+    brains = api.search(query, CLIENT_CATALOG)
+    return dict([(b.UID, (b.getPath(), api.safe_unicode(b.Title)))
+                 for b in brains])
+
+
+def get_facets_query(selected, today=None):
+    """Returns the catalog query of the selected facet values
+
+    :param selected: dict of facet -> selected value
+    """
+    indexes = dict(INDEX_FACETS)
+    query = {}
+    for facet, value in selected.items():
+        if not value:
+            continue
+        if facet in indexes:
+            query[indexes[facet]] = value
+        elif facet == "age_band":
+            band = get_age_band_query(value, today=today)
+            if band:
+                query["patient_birthdate"] = band
+        elif facet == "client":
+            query["patient_client_uids"] = value
+    return query
+
+
+def get_rids(catalog, query):
+    """Returns the record ids of the catalog that match the query, from the
+    intersection of the result sets of each index
+    """
+    rids = None
+    for name, value in query.items():
+        index = catalog._catalog.getIndex(name)
+        result = index._apply_index({name: value})
+        if result is None:
+            continue
+        result = result[0]
+        rids = result if rids is None else intersection(rids, result)
+    if rids is None:
+        rids = IITreeSet(catalog._catalog.paths.keys())
+    return rids
+
+
+def count(rids, value_rids):
+    """Returns the number of record ids of the value that are in rids
+    """
+    if isinstance(value_rids, int):
+        # indexes store a single record id as an int
+        return 1 if value_rids in rids else 0
+    return len(intersection(rids, value_rids))
+
+
+def get_index_counts(catalog, index, rids):
+    """Returns a dict of value -> count of the values of the index
+    """
+    index = catalog._catalog.getIndex(index)
+    counts = {}
+    for value, value_rids in index._index.items():
+        num = count(rids, value_rids)
+        if num:
+            counts[value] = num
+    return counts
+
+
+def get_age_band_counts(catalog, rids, today=None):
+    """Returns a dict of age band -> count
+    """
+    index = catalog._catalog.getIndex("patient_birthdate")
+    counts = {}
+    for band in AGE_BANDS:
+        query = get_age_band_query(band[0], today=today)
+        result = index._apply_index({"patient_birthdate": query})
+        num = result and count(rids, result[0]) or 0
+        if num:
+            counts[band[0]] = num
+    return counts
+
+
+def get_client_counts(catalog, rids):
+    """Returns a dict of client UID -> count
+    """
+    clients = get_clients()
+    counts = get_index_counts(catalog, "patient_client_uids", rids)
+    # skip the clients that no longer exist
+    return dict(filter(lambda it: it[0] in clients, counts.items()))
+
+
+def get_counters():
+    """Returns the counters of the catalogs the facets depend on
+    """
+    return (api.get_tool(PATIENT_CATALOG).getCounter(),
+            api.get_tool(CLIENT_CATALOG).getCounter())
+
+
+def get_facet_counts(selected=None, query=None):
+    """Returns a dict of facet -> dict of value -> number of patients
+
+    The count of the values of each facet is computed with the values
+    selected in the other facets, so that drilling down on a facet does not
+    hide the other values of the same facet.
+
+    :param selected: dict of facet -> selected value
+    :param query: additional catalog query, e.g. the review state
+    """
+    selected = dict(filter(lambda it: it[1], (selected or {}).items()))
+    base = dict(BASE_QUERY, **(query or {}))
+    today = date.today()
+    allowed = get_allowed_roles_and_users()
+
+    # counts are computed from the catalogs as seen by this transaction, so
+    # they are stored under the counters of this same snapshot
+    key = (api.get_path(api.get_portal()), allowed, get_counters(),
+           repr(sorted(selected.items())), repr(sorted(base.items())), today)
+    counts = _cache.get(key)
+    if counts is not None:
+        return counts
+    if len(_cache) >= MAX_CACHE_SIZE:
+        # counts of older counters are never hit again
+        _cache.clear()
+
+    catalog = api.get_tool(PATIENT_CATALOG)
+    indexes = dict(INDEX_FACETS)
+    rids_by_query = {}
+    counts = {}
+    for facet in FACETS:
+        others = dict(filter(lambda it: it[0] != facet, selected.items()))
+        facet_query = dict(base, **get_facets_query(others, today=today))
+        # restrict to the patients the user can view, as searchResults does
+        facet_query["allowedRolesAndUsers"] = list(allowed)
+        rids_key = repr(sorted(facet_query.items()))
+        if rids_key not in rids_by_query:
+            rids_by_query[rids_key] = get_rids(catalog, facet_query)
+        rids = rids_by_query[rids_key]
+        if facet in indexes:
+            counts[facet] = get_index_counts(catalog, indexes[facet], rids)
+        elif facet == "age_band":
+            counts[facet] = get_age_band_counts(catalog, rids, today=today)
+        elif facet == "client":
+            counts[facet] = get_client_counts(catalog, rids)
+
+    _cache[key] = counts
+    return counts
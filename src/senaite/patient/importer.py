@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Bulk import of patients from CSV or NDJSON files
+
+The input file is streamed row by row. MRN uniqueness is checked against an
+in-memory set seeded from the patient catalog, so that no catalog query is
+done per row. Indexing is deferred to the end of each batch, when the indexing
+queue is flushed and the transaction is committed. Each row is imported within
+a savepoint, so a row that fails is rolled back and rejected without aborting
+the import. A checkpoint file keeps the number of rows processed, so that an
+interrupted import can be resumed. The checkpoint is bound to the size and
+modification time of the file and removed once the import completes.
+"""
+
+import csv
+import json
+import os
+import time
+
+import transaction
+from bika.lims import api
+from Products.CMFCore.indexing import processQueue
+from senaite.core.api import dtime
+from senaite.patient import api as patient_api
+from senaite.patient import logger
+
+# Values considered as True for boolean columns of CSV files
+TRUE_VALUES = ("1", "true", "yes", "y", "on")
+
+# Fields that are booleans
+BOOLEAN_FIELDS = ("estimated_birthdate", "deceased", "email_report")
+
+# Fields that are lists of records
+LIST_FIELDS = ("identifiers", "races", "ethnicities")
+
+
+def read_csv(path):
+    """Generates a dict of unicode values for each row of the CSV file
+    """
+    with open(path, "rb") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield dict([(api.safe_unicode(key).strip(), api.safe_unicode(val))
+                        for key, val in row.items() if key])
+
+
+def read_ndjson(path):
+    """Generates a dict for each line of the newline-delimited JSON file
+    """
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                # keep the line count in sync with the checkpoint
+                yield {}
+                continue
+            yield json.loads(line)
+
+
+def read_rows(path):
+    """Returns a row generator based on the extension of the file
+    """
+    ext = os.path.splitext(path)[-1].lower()
+    if ext in [".json", ".ndjson", ".jsonl"]:
+        return read_ndjson(path)
+    return read_csv(path)
+
+
+def to_values(row):
+    """Converts a raw row to the values accepted by the patient setters
+    """
+    values = {}
+    for key, value in row.items():
+        if key in BOOLEAN_FIELDS and api.is_string(value):
+            value = value.strip().lower() in TRUE_VALUES
+        elif key == "address" and api.is_string(value):
+            value = value.strip()
+            value = [{"type": "physical", "address": value}] if value else []
+        elif key in LIST_FIELDS and value and \
+                not isinstance(value, (list, tuple)):
+            raise ValueError("Invalid {}: {}".format(key, value))
+        elif key == "birthdate" and value:
+            # validate before the patient is created
+            birthdate = dtime.to_dt(value)
+            if not birthdate:
+                raise ValueError("Invalid birthdate: {}".format(value))
+            value = birthdate
+        values[key] = value
+    return values
+
+
+class PatientImporter(object):
+    """Imports patients in batches from a CSV or NDJSON file
+    """
+
+    def __init__(self, path, container=None, batch_size=1000, update=False,
+                 checkpoint=None):
+        self.path = path
+        self.container = container or patient_api.get_patient_folder()
+        self.batch_size = batch_size
+        self.update = update
+        self.checkpoint = checkpoint or "{}.checkpoint".format(path)
+        self.mrns = None
+        # tuples of (row number, error) of the rejected rows
+        self.rejected = []
+        self.stats = {
+            "rows": 0,
+            "created": 0,
+            "updated": 0,
+            "skipped": 0,
+            "errors": 0,
+        }
+
+    def load_mrns(self):
+        """Seed the set of existing MRNs from the patient catalog index
+        """
+        catalog = patient_api.get_patient_catalog()
+        mrns = catalog.uniqueValuesFor("patient_mrn")
+        self.mrns = set(map(api.safe_unicode, mrns))
+        logger.info("Loaded {} existing MRNs".format(len(self.mrns)))
+
+    def get_file_info(self):
+        """Returns the path, size and modification time of the input file
+        """
+        info = os.stat(self.path)
+        return {
+            "path": os.path.abspath(self.path),
+            "size": info.st_size,
+            "mtime": info.st_mtime,
+        }
+
+    def read_checkpoint(self):
+        """Returns the number of rows processed in a previous run
+        """
+        if not os.path.exists(self.checkpoint):
+            return 0
+        with open(self.checkpoint, "rb") as f:
+            data = json.load(f)
+        info = self.get_file_info()
+        if data.get("path") != info["path"]:
+            raise ValueError("Checkpoint {} does not belong to {}".format(
+                self.checkpoint, self.path))
+        if data.get("size") != info["size"] or \
+                data.get("mtime") != info["mtime"]:
+            # a new file was written at the same path
+            logger.warn("Discarding checkpoint {} of a previous version of "
+                        "{}".format(self.checkpoint, self.path))
+            self.remove_checkpoint()
+            return 0
+        self.stats.update(data.get("stats", {}))
+        return data.get("rows", 0)
+
+    def write_checkpoint(self, rows):
+        """Stores the number of rows processed so far
+        """
+        data = dict(self.get_file_info(), rows=rows, stats=self.stats)
+        tmp = "{}.tmp".format(self.checkpoint)
+        with open(tmp, "wb") as f:
+            json.dump(data, f)
+        # atomic replace, so a crash never leaves a half-written checkpoint
+        os.rename(tmp, self.checkpoint)
+
+    def remove_checkpoint(self):
+        """Removes the checkpoint, if any
+        """
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+    def create_patient(self, mrn, values):
+        """Creates a new patient without querying the catalog
+        """
+        patient = api.create(self.container, patient_api.PATIENT_TYPE)
+        # MRN uniqueness is already checked against the in-memory set
+        patient.mutator("mrn")(patient, mrn)
+        for key, field, setter, normalize in patient_api._get_upsert_fields():
+            value = values.get(key)
+            if value in [None, ""]:
+                continue
+            if normalize is patient_api._normalize_text:
+                # e.g. numbers from NDJSON files
+                value = normalize(value)
+            getattr(patient, setter)(value)
+        patient.reindexObject()
+        return patient
+
+    def import_row(self, row):
+        """Imports a single row. Returns the name of the stat to increase
+        """
+        values = to_values(row)
+        mrn = api.safe_unicode(values.pop("mrn", None) or u"").strip()
+        if not mrn:
+            return "skipped"
+        if mrn in self.mrns:
+            if not self.update:
+                return "skipped"
+            patient, changes = patient_api.upsert_patient(mrn, **values)
+            return "updated" if changes else "skipped"
+        self.create_patient(mrn, values)
+        self.mrns.add(mrn)
+        return "created"
+
+    def commit(self, rows):
+        """Flush the indexing queue, commit and store the checkpoint
+        """
+        processQueue()
+        transaction.commit()
+        self.write_checkpoint(rows)
+        # release the objects of this batch from the ZODB cache
+        api.get_portal()._p_jar.cacheMinimize()
+
+    def run(self):
+        """Runs the import and returns the stats
+        """
+        if self.mrns is None:
+            self.load_mrns()
+
+        start = self.read_checkpoint()
+        if start:
+            logger.info("Resuming import of {} from row {}".format(
+                self.path, start))
+
+        started = time.time()
+        processed = 0
+        num = 0
+        for num, row in enumerate(read_rows(self.path), 1):
+            if num <= start or not row:
+                continue
+            savepoint = transaction.savepoint()
+            try:
+                stat = self.import_row(row)
+            except Exception as exc:
+                # discard whatever the row wrote, e.g. a half-built patient
+                savepoint.rollback()
+                logger.error("Row {}: {}".format(num, exc))
+                self.rejected.append((num, exc))
+                stat = "errors"
+            self.stats[stat] += 1
+            self.stats["rows"] += 1
+            processed += 1
+
+            if processed % self.batch_size == 0:
+                self.commit(num)
+                elapsed = time.time() - started
+                logger.info(
+                    "Imported {} rows ({:.1f} rows/s): {}".format(
+                        num, processed / elapsed, self.stats))
+
+        self.commit(num)
+        # done, a new file at the same path is imported from the start
+        self.remove_checkpoint()
+        elapsed = time.time() - started
+        logger.info("Import of {} finished in {:.1f}s ({:.1f} rows/s): "
+                    "{}".format(self.path, elapsed,
+                                processed / (elapsed or 1), self.stats))
+        return self.stats
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Bulk reassignment of samples from a source MRN to a target patient
+
+This is used to resolve temporary MRNs or to merge two patients. The samples
+are searched with a single query against the `medical_record_number` index and
+the patient fields are written directly, without firing modification events.
+Only the patient related indexes of the samples are updated and the side
+effects of the sample subscribers are run once at the end.
+"""
+
+import transaction
+from bika.lims import api
+from bika.lims.workflow import doActionFor
+from bika.lims.workflow import isTransitionAllowed
+from Products.CMFCore.indexing import processQueue
+from senaite.core.behaviors import IClientShareableBehavior
+from senaite.core.catalog import SAMPLE_CATALOG
+from senaite.patient import api as patient_api
+from senaite.patient import logger
+from senaite.patient.stats import reconcile_patient_stats
+from senaite.patient.subscribers.analysisrequest import add_cc_email
+from senaite.patient.subscribers.analysisrequest import set_age_at_sampling
+from senaite.patient.subscribers.analysisrequest import update_patient_results
+from senaite.patient.subscribers.analysisrequest import update_results_ranges
+
+# Sample indexes that depend on the patient fields
+SAMPLE_INDEXES = [
+    "medical_record_number",
+    "is_temporary_mrn",
+    "patient_uid",
+    "listing_searchable_text",
+]
+
+
+def get_sample_values(patient):
+    """Returns a dict of sample field name -> value for the given patient
+    """
+    return {
+        "MedicalRecordNumber": {
+            "value": patient.getMRN(),
+            "temporary": False,
+        },
+        "PatientFullName": {
+            "firstname": patient.getFirstname(),
+            "middlename": patient.getMiddlename(),
+            "lastname": patient.getLastname(),
+            "maternal_lastname": patient.getMaternalLastname(),
+        },
+        "DateOfBirth": (
+            patient.getBirthdate(as_date=False),
+            False,
+            patient.getEstimatedBirthdate(),
+        ),
+        "Sex": patient.getSex(),
+        "Gender": patient.getGender(),
+        "PatientUID": api.get_uid(patient),
+    }
+
+
+def reassign_sample(sample, values, email=None):
+    """Writes the patient values to the sample without firing events
+
+    :returns: True if the sex or date of birth of the sample changed
+    """
+    sex = sample.getField("Sex").get(sample)
+    dob = sample.getField("DateOfBirth").get_date_of_birth(sample)
+    old_uid = sample.getField("PatientUID").get(sample)
+
+    for name, value in values.items():
+        sample.getField(name).set(sample, value)
+
+    uid = values["PatientUID"]
+    if uid != old_uid:
+        old_patient = old_uid and api.get_object_by_uid(old_uid, default=None)
+        patient = api.get_object_by_uid(uid, default=None)
+        update_patient_results(sample, old_patient, patient)
+
+    if email:
+        add_cc_email(sample, email)
+
+    # results ranges are looked up by the stored age at sampling
+    set_age_at_sampling(sample)
+
+    new_dob = sample.getField("DateOfBirth").get_date_of_birth(sample)
+    return sex != values["Sex"] or dob != new_dob
+
+
+def merge_patient(source_mrn, target, batch_size=500, commit=True):
+    """Reassigns all samples with the source MRN to the target patient
+
+    If a patient with the source MRN exists and is not the target, it is
+    deactivated and flagged as merged in the change feed.
+
+    :param source_mrn: MRN or temporary identifier to reassign
+    :param target: target patient object
+    :param batch_size: number of samples to process before committing
+    :param commit: whether to commit the transaction after each batch
+    :returns: number of samples reassigned
+    """
+    source_mrn = api.safe_unicode(source_mrn).strip()
+    if not source_mrn:
+        raise ValueError("Source MRN is required")
+    target_mrn = api.safe_unicode(target.getMRN())
+    if source_mrn == target_mrn:
+        raise ValueError("Source and target MRN are the same")
+
+    values = get_sample_values(target)
+    email = target.getEmail() if target.getEmailReport() else None
+
+    query = {
+        "portal_type": "AnalysisRequest",
+        "medical_record_number": [source_mrn.encode("utf8")],
+    }
+    brains = api.search(query, SAMPLE_CATALOG)
+    total = len(brains)
+    logger.info("Reassigning {} samples from {} to {} ...".format(
+        total, source_mrn, target_mrn))
+
+    client_uids = set()
+    for num, brain in enumerate(brains, 1):
+        sample = api.get_object(brain)
+        client_uids.add(brain.getClientUID)
+
+        if reassign_sample(sample, values, email=email):
+            # results ranges depend on the sex and age of the patient
+            update_results_ranges(sample)
+
+        sample.reindexObject(idxs=SAMPLE_INDEXES)
+
+        if num % batch_size == 0:
+            processQueue()
+            if commit:
+                transaction.commit()
+            logger.info("Reassigned {}/{} samples".format(num, total))
+
+    processQueue()
+
+    # share the target patient with the clients of the samples
+    if api.get_registry_record("senaite.patient.share_patients",
+                               default=False):
+        behavior = IClientShareableBehavior(target)
+        clients = behavior.getRawClients() or []
+        missing = filter(lambda uid: uid not in clients, client_uids)
+        if missing:
+            behavior.setClients(clients + missing)
+            target.reindexObject()
+
+    # deactivate the source patient
+    source = patient_api.get_patient_by_mrn(source_mrn, include_inactive=True)
+    if source and source != target:
+        if isTransitionAllowed(source, "deactivate"):
+            doActionFor(source, "deactivate")
+        patient_api.mark_patient_changed(source, "merged")
+        reconcile_patient_stats(source)
+
+    # samples were reassigned without events, recompute the statistics
+    reconcile_patient_stats(target)
+
+    if commit:
+        transaction.commit()
+
+    logger.info("Reassigning {} samples from {} to {} [DONE]".format(
+        total, source_mrn, target_mrn))
+    return total
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Lazy on-access schema migrations
+
+Objects are migrated the first time one of their fields is read or written,
+instead of rewriting all objects in an upgrade step. Each object keeps the
+schema version it was migrated to, and migrations are registered per portal
+type with the version they migrate to. Objects that are never accessed are
+migrated by the sweeper, that processes a limited number of objects per call.
+"""
+
+from bika.lims import api
+from plone.protect.utils import safeWrite
+from senaite.core.api import dtime
+from senaite.core.catalog import SAMPLE_CATALOG
+from senaite.patient import logger
+from senaite.patient.config import PATIENT_CATALOG
+from zope.annotation.interfaces import IAnnotations
+
+# Attribute where the schema version of the object is stored
+VERSION_ATTR = "_senaite_patient_schema_version"
+
+# Annotation key of the portal where the sweeper positions are stored
+SWEEPER_STORAGE = "senaite.patient.migration.sweeper"
+
+# Mapping of portal_type -> list of (version, migration function)
+MIGRATIONS = {}
+
+# Catalogs the sweeper uses to find the objects of each portal type
+SWEEPER_CATALOGS = (
+    ("Patient", PATIENT_CATALOG),
+    ("AnalysisRequest", SAMPLE_CATALOG),
+)
+
+_marker = object()
+
+
+def register_migration(portal_type, version):
+    """Decorator to register a migration function for the portal type
+
+    Migration functions must be idempotent, as objects created before the
+    framework was in place don't have a schema version yet. They return True
+    when they changed the object, so that it is reindexed.
+    """
+    def wrapper(func):
+        migrations = MIGRATIONS.setdefault(portal_type, [])
+        migrations.append((version, func))
+        migrations.sort(key=lambda migration: migration[0])
+        return func
+    return wrapper
+
+
+def get_schema_version(portal_type):
+    """Returns the latest schema version of the given portal type
+    """
+    migrations = MIGRATIONS.get(portal_type)
+    if not migrations:
+        return 0
+    return migrations[-1][0]
+
+
+def needs_migration(obj):
+    """Returns whether the object is not on the latest schema version
+    """
+    version = getattr(obj, VERSION_ATTR, 0)
+    return version < get_schema_version(obj.portal_type)
+
+
+def stamp(obj):
+    """Flags the object as being on the latest schema version
+    """
+    version = get_schema_version(obj.portal_type)
+    if getattr(obj, VERSION_ATTR, 0) != version:
+        setattr(obj, VERSION_ATTR, version)
+
+
+def migrate(obj):
+    """Runs the pending migrations of the object and reindexes it if any of
+    the migrations changed it
+
+    :returns: True if the object was migrated
+    """
+    if not needs_migration(obj):
+        return False
+    if getattr(obj, "_v_migrating", False):
+        # migration functions use the accessors of the object as well
+        return False
+
+    current = getattr(obj, VERSION_ATTR, 0)
+    changed = False
+    obj._v_migrating = True
+    try:
+        for version, func in MIGRATIONS.get(obj.portal_type, []):
+            if version <= current:
+                continue
+            changed = func(obj) or changed
+            setattr(obj, VERSION_ATTR, version)
+    finally:
+        obj._v_migrating = False
+
+    # objects can be migrated on GET requests
+    safeWrite(obj)
+    if changed:
+        # the catalogs still have the values of the old schema
+        obj.reindexObject()
+    return True
+
+
+def get_sweeper_positions():
+    """Returns the mapping of portal type -> sweeper position
+
+    The position is a dict with the schema version the objects are swept to,
+    the UID of the last object swept and the number of objects swept
+    """
+    annotations = IAnnotations(api.get_portal())
+    positions = annotations.get(SWEEPER_STORAGE)
+    if positions is None:
+        positions = {}
+    return dict(positions)
+
+
+def get_sweeper_position(positions, portal_type):
+    """Returns the position of the sweeper for the latest schema version
+
+    The sweep starts from the beginning when a migration with a newer version
+    is registered for the portal type, as the objects swept before were only
+    migrated up to the version of that time.
+    """
+    version = get_schema_version(portal_type)
+    position = positions.get(portal_type)
+    if not isinstance(position, dict) or position.get("version") != version:
+        position = {"version": version, "uid": None, "swept": 0}
+    return dict(position)
+
+
+def sweep(limit=100):
+    """Migrates up to limit objects not yet on the latest schema version
+
+    Objects are walked in UID order, with a range query that starts right
+    after the UID of the last object swept, so that each call costs the same
+    regardless of how many objects were swept before. The position is stored
+    in the portal annotations, so that each call continues where the previous
+    one stopped.
+
+    :returns: dict of portal type -> (swept, total)
+    """
+    positions = get_sweeper_positions()
+    progress = {}
+    for portal_type, catalog_id in SWEEPER_CATALOGS:
+        if not get_schema_version(portal_type):
+            continue
+        query = {"portal_type": portal_type}
+        total = len(api.search(query, catalog_id))
+        position = get_sweeper_position(positions, portal_type)
+        if limit <= 0:
+            progress[portal_type] = (min(position["swept"], total), total)
+            continue
+
+        last = position["uid"]
+        if last:
+            query["UID"] = {"query": last, "range": "min"}
+        query.update({
+            "sort_on": "UID",
+            "sort_order": "ascending",
+            "sort_limit": limit + 1,
+        })
+        brains = api.search(query, catalog_id)[:limit + 1]
+        # the range is inclusive, skip the last object swept
+        batch = filter(lambda brain: brain.UID != last, brains)[:limit]
+
+        migrated = 0
+        for brain in batch:
+            obj = api.get_object(brain)
+            if migrate(obj):
+                migrated += 1
+            obj._p_deactivate()
+
+        if batch:
+            limit -= len(batch)
+            position["uid"] = batch[-1].UID
+            position["swept"] += len(batch)
+            logger.info("Swept {}/{} objects of type {} ({} migrated)".format(
+                position["swept"], total, portal_type, migrated))
+        positions[portal_type] = position
+        progress[portal_type] = (min(position["swept"], total), total)
+
+    portal = api.get_portal()
+    IAnnotations(portal)[SWEEPER_STORAGE] = positions
+    safeWrite(portal)
+    return progress
+
+
+@register_migration("Patient", 1)
+def migrate_patient_address(patient):
+    """Migrate the plain address attributes to the address field
+    """
+    address = patient.__dict__.get("address", _marker)
+    if not api.is_string(address):
+        return
+    value = {"type": "physical", "address": address}
+    for attr, key in (("city", "city"), ("zipcode", "zip"),
+                      ("country", "country")):
+        value[key] = patient.__dict__.pop(attr, "")
+    patient._p_changed = True
+    patient.setAddress([value] if any(value.values()) else [])
+    return True
+
+
+@register_migration("Patient", 2)
+def migrate_patient_id(patient):
+    """Migrate the Patient ID attribute to identifiers
+    """
+    patient_id = patient.__dict__.pop("patient_id", _marker)
+    if patient_id is _marker:
+        return
+    patient._p_changed = True
+
+    if isinstance(patient_id, list):
+        patient_id = filter(None, patient_id)
+        patient_id = patient_id[0] if patient_id else ""
+    if not patient_id or not api.is_string(patient_id):
+        return
+
+    # patient ID already set
+    if "patient_id" in patient.get_identifier_ids():
+        return
+
+    identifiers = patient.getIdentifiers() or []
+    identifiers.append({u"key": u"patient_id", u"value": patient_id})
+    patient.setIdentifiers(identifiers)
+    return True
+
+
+@register_migration("AnalysisRequest", 1)
+def migrate_date_of_birth(sample):
+    """Migrate the date of birth to a tuple of (dob, from_age, estimated)
+    """
+    age_selected_attr = "_AgeDoBWidget_age_selected"
+    dob_estimated_attr = "_AgeDoBWidget_dob_estimated"
+
+    # additional flags were saved as attributes
+    age_selected = sample.__dict__.pop(age_selected_attr, False)
+    dob_estimated = sample.__dict__.pop(dob_estimated_attr, False)
+
+    field = sample.getField("DateOfBirth")
+    if field is None:
+        return
+    value = field.get(sample)
+    if dtime.is_date(value):
+        field.set(sample, (dtime.to_dt(value), age_selected, dob_estimated))
+        return True
+    elif not isinstance(value, tuple):
+        field.set(sample, (None, False, False))
+        return True
+
+
+@register_migration("AnalysisRequest", 2)
+def migrate_naive_date_of_birth(sample):
+    """Set the timezone of timezone-naive dates of birth
+    """
+    field = sample.getField("DateOfBirth")
+    if field is None:
+        return
+    value = field.get(sample)
+    dob = value[0] if value else None
+    if dob and dtime.is_timezone_naive(dob):
+        # the field sets the default timezone of the system
+        field.set(sample, value)
+        return True
@@ -19,6 +19,8 @@
 # Some rights reserved, see README and LICENSE.
 
 from senaite.patient import check_installed
+from senaite.patient.api import get_patient_by_mrn
+from senaite.patient.api import get_patient_by_uid
 
 
 @check_installed(False)
@@ -45,6 +47,27 @@ def getMedicalRecordNumberValue(self):  # noqa camelcase, but compliant with AT'
     return mrn.get("value")
 
 
+@check_installed(None)
+def getPatientUID(self):  # noqa camelcase
+    """Returns the UID of the patient assigned to the sample
+    """
+    return self.getField("PatientUID").get(self) or None
+
+
+@check_installed(None)
+def getPatient(self):  # noqa camelcase
+    """Returns the patient assigned to the sample
+    """
+    uid = self.getPatientUID()
+    if uid:
+        return get_patient_by_uid(uid)
+    # samples not assigned yet, e.g. created before the PatientUID field
+    mrn = self.getMedicalRecordNumberValue()
+    if not mrn or self.isMedicalRecordTemporary():
+        return None
+    return get_patient_by_mrn(mrn, include_inactive=True)
+
+
 @check_installed(None)
 def getPatientFullName(self):  # noqa camelcase
     """Returns the patient's full name
@@ -96,6 +119,13 @@ def getAge(self):  # noqa camelcase
     return field.get_age(self, on_date=sampled)
 
 
+@check_installed(None)
+def getAgeAtSampling(self):  # noqa camelcase
+    """Returns the patient's age in days when the sample was collected
+    """
+    return self.getField("AgeAtSampling").get(self)
+
+
 @check_installed(None)
 def getAgeYmd(self):  # noqa camelcase
     """Returns the patient's age when the sample was collected in ymd format
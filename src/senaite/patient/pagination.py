@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Keyset pagination of the patient listings
+
+Patients are sorted by the `patient_sortable_name` index, whose keys are
+unique. Instead of sorting the whole result set and skipping the patients of
+the previous pages, a page is fetched with a range query that starts right
+after the key of the last patient of the previous page, so that any page
+costs the same as the first one. The key of the last patient of each page is
+kept, by query, offset and the roles of the user the patients are filtered
+for, until the patient catalog changes.
+"""
+
+from AccessControl import getSecurityManager
+from bika.lims import api
+from senaite.patient.catalog import PATIENT_CATALOG
+
+# Index the patients are sorted by
+SORT_INDEX = "patient_sortable_name"
+
+# Maximum number of page cursors kept
+MAX_CURSORS = 10000
+
+# Number of patients fetched at once when iterating over the results
+BATCH_SIZE = 100
+
+# Keys of the last patient of a page, by (query, offset), along with the
+# counter of the patient catalog they were computed for
+_cursors = {"counter": None, "keys": {}}
+
+
+def get_allowed_roles_and_users():
+    """Returns the roles, groups and id of the current user the catalog filters
+    the patients by (`allowedRolesAndUsers`)
+    """
+    catalog = api.get_tool(PATIENT_CATALOG)
+    user = getSecurityManager().getUser()
+    return tuple(sorted(catalog._listAllowedRolesAndUsers(user)))
+
+
+def get_cursor(query_key, offset):
+    """Returns the sort key of the patient before the given offset, if known
+    """
+    counter = api.get_tool(PATIENT_CATALOG).getCounter()
+    if _cursors["counter"] != counter:
+        _cursors["counter"] = counter
+        _cursors["keys"] = {}
+    return _cursors["keys"].get((query_key, offset))
+
+
+def set_cursor(query_key, offset, key):
+    """Stores the sort key of the patient before the given offset
+    """
+    if len(_cursors["keys"]) >= MAX_CURSORS:
+        _cursors["keys"] = {}
+    _cursors["keys"][(query_key, offset)] = key
+
+
+class KeysetResults(object):
+    """Lazy sequence of the patient brains of a query, sorted by name
+
+    Slices are fetched with a range query after the key of the last patient
+    of the previous page, when known. Otherwise, the results are sorted up to
+    the end of the slice only.
+    """
+
+    def __init__(self, query, after=None):
+        query = dict(query)
+        self.reverse = query.pop("sort_order", None) in (
+            "descending", "reverse")
+        for key in ("sort_on", "sort_limit", SORT_INDEX):
+            query.pop(key, None)
+        self.query = query
+        self.after = after or None
+        # users with different roles see different patients, and pages
+        self.query_key = repr((sorted(query.items()), self.after,
+                               self.reverse, get_allowed_roles_and_users()))
+        self._len = None
+
+    def search(self, after, limit):
+        """Returns up to limit brains sorted by name, after the given key
+        """
+        query = dict(self.query)
+        if after:
+            direction = "max" if self.reverse else "min"
+            query[SORT_INDEX] = {"query": after, "range": direction}
+        query.update({
+            "sort_on": SORT_INDEX,
+            "sort_order": "descending" if self.reverse else "ascending",
+            "sort_limit": limit + 1,
+        })
+        brains = api.search(query, PATIENT_CATALOG)[:limit + 1]
+        # the range is inclusive, skip the patient with the given key
+        brains = filter(lambda b: b.patient_sortable_name != after, brains)
+        return brains[:limit]
+
+    def get_page(self, start, stop):
+        """Returns the brains from start to stop
+        """
+        if stop <= start:
+            return []
+        after = self.after if start == 0 else get_cursor(self.query_key, start)
+        if start == 0 or after:
+            brains = self.search(after, stop - start)
+        else:
+            # previous page not fetched yet, sort up to the end of the slice
+            brains = self.search(self.after, stop)[start:]
+        if brains:
+            end = start + len(brains)
+            set_cursor(self.query_key, end, brains[-1].patient_sortable_name)
+        return brains
+
+    def __len__(self):
+        if self._len is None:
+            query = dict(self.query)
+            if self.after:
+                direction = "max" if self.reverse else "min"
+                query[SORT_INDEX] = {"query": self.after, "range": direction}
+            # no sorting needed to count the results
+            results = api.search(query, PATIENT_CATALOG)
+            self._len = len(results)
+            if self.after and any(map(
+                    lambda b: b.patient_sortable_name == self.after,
+                    results[:1])):
+                self._len -= 1
+        return self._len
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            if item.step not in (None, 1):
+                raise ValueError("Slices with step are not supported")
+            start, stop, step = item.indices(len(self))
+            return self.get_page(start, stop)
+        if item < 0:
+            item += len(self)
+        page = self.get_page(item, item + 1)
+        if not page:
+            raise IndexError(item)
+        return page[0]
+
+    def __iter__(self):
+        start = 0
+        while True:
+            page = self.get_page(start, start + BATCH_SIZE)
+            for brain in page:
+                yield brain
+            if len(page) < BATCH_SIZE:
+                break
+            start += BATCH_SIZE
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Partitioned reindexing of catalogs
+
+The UID space is split into partitions, so that several processes (ZEO
+clients) can reindex the same catalog in parallel, each one only the objects
+of its own partition. Transactions are committed in batches and retried on
+conflicts, as different partitions can still touch the same index buckets.
+"""
+
+import random
+import time
+
+import transaction
+from bika.lims import api
+from senaite.patient import logger
+from ZODB.POSException import ConflictError
+
+# Number of objects to reindex before committing
+BATCH_SIZE = 500
+
+# Number of times a batch is retried on conflict errors
+MAX_RETRIES = 5
+
+
+# Number of leading hex digits of the UIDs the partitions are computed from
+PREFIX_LENGTH = 8
+
+# Size of the space of UID prefixes
+PREFIX_SPACE = 16 ** PREFIX_LENGTH
+
+
+def get_partition(uid, partitions):
+    """Returns the partition number of the UID
+
+    UIDs are random hex strings, so they are evenly distributed. Each
+    partition is a contiguous range of the UID space
+    """
+    return int(uid[:PREFIX_LENGTH], 16) * partitions // PREFIX_SPACE
+
+
+def get_partition_bounds(partition, partitions):
+    """Returns the lower and upper UID prefixes of the partition
+
+    The lower bound is inclusive and the upper bound is exclusive. The upper
+    bound of the last partition is None
+    """
+    def to_prefix(num):
+        start = -(-num * PREFIX_SPACE // partitions)
+        return "{:0{}x}".format(start, PREFIX_LENGTH)
+
+    lower = to_prefix(partition)
+    upper = None
+    if partition + 1 < partitions:
+        upper = to_prefix(partition + 1)
+    return lower, upper
+
+
+def get_partition_query(partition, partitions, query=None):
+    """Returns the catalog query of the objects within the partition
+    """
+    query = dict(query or {})
+    lower, upper = get_partition_bounds(partition, partitions)
+    if upper is None:
+        query["UID"] = {"query": lower, "range": "min"}
+    else:
+        # UIDs are longer than the prefixes, so a UID that starts with the
+        # upper prefix sorts after it and is left out of the range
+        query["UID"] = {"query": [lower, upper], "range": "min:max"}
+    return query
+
+
+def get_partition_paths(catalog, partition, partitions, query=None):
+    """Returns the paths of the catalogued objects within the partition
+
+    The objects are searched with a range query on the UID index, so that
+    each worker only loads the brains of its own partition
+    """
+    query = get_partition_query(partition, partitions, query=query)
+    return [brain.getPath() for brain in catalog(query)]
+
+
+def reindex_batch(catalog, paths, idxs=None):
+    """Reindexes the objects of the given paths
+
+    :returns: number of objects reindexed
+    """
+    count = 0
+    for path in paths:
+        obj = catalog.unrestrictedTraverse(path, None)
+        if obj is None:
+            # stale entry
+            catalog.uncatalog_object(path)
+            continue
+        if idxs:
+            catalog.catalog_object(obj, path, idxs=idxs, update_metadata=0)
+        else:
+            catalog.catalog_object(obj, path)
+        obj._p_deactivate()
+        count += 1
+    return count
+
+
+def reindex_partition(catalog_id, partition, partitions, idxs=None,
+                      query=None, batch_size=BATCH_SIZE):
+    """Reindexes the objects of the catalog within the partition
+
+    :param catalog_id: ID of the catalog to reindex
+    :param partition: number of the partition to reindex, from 0
+    :param partitions: total number of partitions
+    :param idxs: list of indexes to reindex. All indexes and metadata if empty
+    :param query: catalog query to restrict the objects to reindex
+    :param batch_size: number of objects to reindex before committing
+    :returns: number of objects reindexed
+    """
+    catalog = api.get_tool(catalog_id)
+    paths = get_partition_paths(catalog, partition, partitions, query=query)
+    total = len(paths)
+    logger.info("Reindexing {} objects of partition {}/{} of {} ...".format(
+        total, partition + 1, partitions, catalog_id))
+
+    started = time.time()
+    done = 0
+    for start in range(0, total, batch_size):
+        batch = paths[start:start + batch_size]
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                count = reindex_batch(catalog, batch, idxs=idxs)
+                transaction.commit()
+                done += count
+                break
+            except ConflictError:
+                transaction.abort()
+                if attempt == MAX_RETRIES:
+                    raise
+                logger.warn("Conflict on partition {}, retrying batch "
+                            "({}/{})".format(partition, attempt + 1,
+                                             MAX_RETRIES))
+                # back off, so that the partitions get out of sync
+                time.sleep(random.uniform(0.1, 1) * (attempt + 1))
+        api.get_portal()._p_jar.cacheMinimize()
+        elapsed = time.time() - started
+        logger.info("Partition {}: {}/{} ({:.1f}/s)".format(
+            partition, start + len(batch), total, done / (elapsed or 1)))
+
+    logger.info("Reindexing {} objects of partition {}/{} of {} "
+                "[DONE]".format(total, partition + 1, partitions, catalog_id))
+    return done
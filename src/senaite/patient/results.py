@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Cumulative results of a patient over time
+
+The verified analyses of a patient are fetched with a single query against
+the analysis catalog, restricted to the samples assigned to the patient, and
+grouped in one time series per analysis keyword. The series are cached in an
+annotation of the patient, with the dates and numeric values packed in
+arrays, so the results of patients with hundreds of samples are served without
+waking up any sample or analysis. The cache is dropped when an analysis of the
+patient is verified, retracted or rejected, or when a sample is moved to or
+from the patient, and rebuilt on the next access.
+"""
+
+from array import array
+
+from Acquisition import aq_base
+from BTrees.OOBTree import OOBTree
+from bika.lims import api
+from DateTime import DateTime
+from persistent import Persistent
+from plone.protect.utils import safeWrite
+from senaite.core.catalog import ANALYSIS_CATALOG
+from senaite.core.catalog import SAMPLE_CATALOG
+from zope.annotation.interfaces import IAnnotations
+
+# Annotation key of the patient where the series are cached
+RESULTS_STORAGE = "senaite.patient.results"
+
+# Review states of the analyses with a valid result
+VALID_STATES = ("verified", "published")
+
+# Analysis transitions that change the valid results of a patient
+INVALIDATE_TRANSITIONS = ("verify", "retract", "reject")
+
+NAN = float("nan")
+
+
+class Series(Persistent):
+    """Results of an analysis keyword sorted by date
+
+    Dates (as timestamps) and numeric values are stored as packed arrays of
+    doubles. Non-numeric results have a NaN value and are kept as they are in
+    the results tuple, along with the IDs of their samples.
+    """
+
+    def __init__(self, keyword, title=u"", unit=u""):
+        self.keyword = keyword
+        self.title = title
+        self.unit = unit
+        self._dates = array("d").tostring()
+        self._values = array("d").tostring()
+        self.results = ()
+        self.samples = ()
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def dates(self):
+        return array("d", self._dates)
+
+    @property
+    def values(self):
+        return array("d", self._values)
+
+    def set_points(self, points):
+        """Sets the points of the series from (date, value, result, sample)
+        tuples
+        """
+        points = sorted(points)
+        self._dates = array("d", [p[0] for p in points]).tostring()
+        self._values = array("d", [p[1] for p in points]).tostring()
+        self.results = tuple([p[2] for p in points])
+        self.samples = tuple([p[3] for p in points])
+
+    def to_dict(self):
+        """Returns the series in a JSON serializable format
+        """
+        values = [None if value != value else value for value in self.values]
+        dates = [DateTime(date).ISO8601() for date in self.dates]
+        return {
+            "keyword": self.keyword,
+            "title": self.title,
+            "unit": self.unit,
+            "dates": dates,
+            "values": values,
+            "results": list(self.results),
+            "samples": list(self.samples),
+        }
+
+
+def to_value(result):
+    """Returns the result as a float or NaN if not numeric
+    """
+    return api.to_float(result, NAN)
+
+
+def get_patient_sample_uids(patient):
+    """Returns the UIDs of the samples assigned to the patient
+    """
+    query = {
+        "portal_type": "AnalysisRequest",
+        "patient_uid": api.get_uid(patient),
+    }
+    return [brain.UID for brain in api.search(query, SAMPLE_CATALOG)]
+
+
+def build_series(patient):
+    """Returns a dict of keyword -> Series with the valid results of the
+    patient, built from the analysis catalog metadata
+    """
+    sample_uids = get_patient_sample_uids(patient)
+    if not sample_uids:
+        return {}
+
+    query = {
+        "portal_type": "Analysis",
+        "getAncestorsUIDs": sample_uids,
+        "review_state": VALID_STATES,
+    }
+    series = {}
+    points = {}
+    for brain in api.search(query, ANALYSIS_CATALOG):
+        keyword = brain.getKeyword
+        if keyword not in series:
+            title = api.safe_unicode(brain.Title)
+            unit = api.safe_unicode(getattr(brain, "getUnit", None) or u"")
+            series[keyword] = Series(keyword, title=title, unit=unit)
+        date = brain.getResultCaptureDate or brain.created
+        result = brain.getResult
+        point = (DateTime(date).timeTime(), to_value(result), result,
+                 brain.getRequestID)
+        points.setdefault(keyword, []).append(point)
+
+    for keyword, values in points.items():
+        series[keyword].set_points(values)
+    return series
+
+
+def get_series(patient):
+    """Returns the cached series of the patient, built if necessary
+    """
+    annotations = IAnnotations(patient)
+    storage = annotations.get(RESULTS_STORAGE)
+    if storage is None:
+        storage = OOBTree(build_series(patient))
+        annotations[RESULTS_STORAGE] = storage
+        # the cache is built on GET requests, the annotations container is
+        # written as well, as patients have annotations already
+        safeWrite(patient)
+        safeWrite(getattr(aq_base(patient), "__annotations__", None))
+        safeWrite(storage)
+    return storage
+
+
+def invalidate_series(patient):
+    """Drops the cached series of the patient
+    """
+    annotations = IAnnotations(patient)
+    if RESULTS_STORAGE in annotations:
+        del annotations[RESULTS_STORAGE]
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+from AccessControl.SecurityManagement import newSecurityManager
+from Testing.makerequest import makerequest
+from zope.component.hooks import setSite
+
+
+def setup_site(app, site_id, username="admin"):
+    """Setup the site and the security manager for `bin/instance run` scripts
+
+    :param app: Zope application root, injected by `bin/instance run`
+    :param site_id: ID of the SENAITE site
+    :param username: ID of the user to run the script with
+    :returns: the portal object
+    """
+    app = makerequest(app)
+    portal = app[site_id]
+    setSite(portal)
+    for acl_users in (portal.acl_users, app.acl_users):
+        user = acl_users.getUser(username)
+        if user is not None:
+            break
+    else:
+        raise ValueError("User {} not found".format(username))
+    newSecurityManager(None, user.__of__(acl_users))
+    return portal
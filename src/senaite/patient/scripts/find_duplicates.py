@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Writes a CSV report of possible duplicate patients
+
+Usage:
+
+    bin/instance run find_duplicates.py --site senaite --output dups.csv
+"""
+
+import argparse
+
+from senaite.patient.duplicates import DEFAULT_THRESHOLD
+from senaite.patient.duplicates import find_duplicates
+from senaite.patient.duplicates import get_patient_records
+from senaite.patient.duplicates import write_report
+from senaite.patient.scripts import setup_site
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--site", "-s", default="senaite",
+                    help="ID of the SENAITE site")
+parser.add_argument("--user", "-u", default="admin",
+                    help="User to run the script with")
+parser.add_argument("--output", "-o", default="duplicates.csv",
+                    help="Path of the CSV report")
+parser.add_argument("--threshold", "-t", type=float,
+                    default=DEFAULT_THRESHOLD,
+                    help="Minimum score of the reported pairs")
+parser.add_argument("--processes", "-p", type=int, default=None,
+                    help="Number of worker processes")
+
+
+def main(app):
+    args, _ = parser.parse_known_args()
+    setup_site(app, args.site, args.user)
+    records = list(get_patient_records())
+    matches = find_duplicates(records, threshold=args.threshold,
+                              processes=args.processes)
+    write_report(matches, args.output)
+
+
+if __name__ == "__main__":
+    main(app)  # noqa: F821 (app is injected by `bin/instance run`)
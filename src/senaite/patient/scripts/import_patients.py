@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Imports patients from a CSV or NDJSON file
+
+Usage:
+
+    bin/instance run import_patients.py --site senaite --file patients.csv
+
+The import can be resumed after a crash by running the same command again, as
+long as the checkpoint file (defaults to `<file>.checkpoint`) is kept.
+"""
+
+import argparse
+
+from senaite.patient.importer import PatientImporter
+from senaite.patient.scripts import setup_site
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--site", "-s", default="senaite",
+                    help="ID of the SENAITE site")
+parser.add_argument("--file", "-f", required=True,
+                    help="Path to the CSV or NDJSON file to import")
+parser.add_argument("--user", "-u", default="admin",
+                    help="User to run the import with")
+parser.add_argument("--batch-size", "-b", type=int, default=1000,
+                    help="Number of rows to commit at once")
+parser.add_argument("--checkpoint", default=None,
+                    help="Path to the checkpoint file")
+parser.add_argument("--update", action="store_true",
+                    help="Update the patients that already exist")
+
+
+def main(app):
+    args, _ = parser.parse_known_args()
+    setup_site(app, args.site, args.user)
+    importer = PatientImporter(args.file,
+                               batch_size=args.batch_size,
+                               update=args.update,
+                               checkpoint=args.checkpoint)
+    importer.run()
+
+
+if __name__ == "__main__":
+    main(app)  # noqa: F821 (app is injected by `bin/instance run`)
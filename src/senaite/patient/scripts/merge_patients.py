@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Reassigns all samples of a source MRN to a target patient
+
+Usage:
+
+    bin/instance run merge_patients.py --site senaite --source TA000012 \
+        --target 4711
+"""
+
+import argparse
+
+from senaite.patient.api import get_patient_by_mrn
+from senaite.patient.merge import merge_patient
+from senaite.patient.scripts import setup_site
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--site", "-s", default="senaite",
+                    help="ID of the SENAITE site")
+parser.add_argument("--user", "-u", default="admin",
+                    help="User to run the script with")
+parser.add_argument("--source", required=True,
+                    help="MRN or temporary identifier to reassign")
+parser.add_argument("--target", required=True,
+                    help="MRN of the target patient")
+parser.add_argument("--batch-size", "-b", type=int, default=500,
+                    help="Number of samples to commit at once")
+
+
+def main(app):
+    args, _ = parser.parse_known_args()
+    setup_site(app, args.site, args.user)
+    target = get_patient_by_mrn(args.target, include_inactive=True)
+    if target is None:
+        raise ValueError("No patient found for MRN {}".format(args.target))
+    merge_patient(args.source, target, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main(app)  # noqa: F821 (app is injected by `bin/instance run`)
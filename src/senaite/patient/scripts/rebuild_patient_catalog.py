@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Rebuilds the patient catalog online
+
+The catalog is rebuilt into a shadow catalog, that replaces the live catalog
+once complete, so patient searches keep working during the rebuild. Usage:
+
+    bin/instance run rebuild_patient_catalog.py --site senaite
+
+Use --reset to remove the shadow catalog of a rebuild that was interrupted.
+"""
+
+import argparse
+
+from senaite.patient.catalog.shadow import BATCH_SIZE
+from senaite.patient.catalog.shadow import DRAIN_WAIT
+from senaite.patient.catalog.shadow import rebuild_patient_catalog
+from senaite.patient.scripts import setup_site
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--site", "-s", default="senaite",
+                    help="ID of the SENAITE site")
+parser.add_argument("--user", "-u", default="admin",
+                    help="User to run the script with")
+parser.add_argument("--batch-size", "-b", type=int, default=BATCH_SIZE,
+                    help="Number of patients to commit at once")
+parser.add_argument("--reset", action="store_true",
+                    help="Remove the shadow catalog of a previous rebuild")
+parser.add_argument("--wait", "-w", type=int, default=DRAIN_WAIT,
+                    help="Seconds without late writes before finishing")
+
+
+def main(app):
+    args, _ = parser.parse_known_args()
+    setup_site(app, args.site, args.user)
+    rebuild_patient_catalog(batch_size=args.batch_size, reset=args.reset,
+                            wait=args.wait)
+
+
+if __name__ == "__main__":
+    main(app)  # noqa: F821 (app is injected by `bin/instance run`)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Reconciles the sample statistics of all patients
+
+The statistics are recomputed from the sample catalog and the ones that
+drifted are fixed. It is safe to run it periodically, e.g. from a cron job:
+
+    bin/instance run reconcile_sample_stats.py --site senaite
+
+Use --stale to only reindex the statistics of the patients whose samples
+changed since the last run. It is cheap, so it can run every few minutes.
+"""
+
+import argparse
+
+from senaite.patient.scripts import setup_site
+from senaite.patient.stats import reconcile_sample_stats
+from senaite.patient.stats import reindex_stale_stats
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--site", "-s", default="senaite",
+                    help="ID of the SENAITE site")
+parser.add_argument("--user", "-u", default="admin",
+                    help="User to run the script with")
+parser.add_argument("--stale", action="store_true",
+                    help="Only reindex the patients whose samples changed")
+
+
+def main(app):
+    args, _ = parser.parse_known_args()
+    setup_site(app, args.site, args.user)
+    if args.stale:
+        reindex_stale_stats()
+    else:
+        reconcile_sample_stats()
+
+
+if __name__ == "__main__":
+    main(app)  # noqa: F821 (app is injected by `bin/instance run`)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Reindexes a catalog in parallel worker processes
+
+The UID space is split into as many partitions as workers. Each worker is a
+separate `bin/instance run` process (a ZEO client) that reindexes its own
+partition, so the instance must be a ZEO client. Usage:
+
+    bin/instance run reindex.py --site senaite --workers 4 \
+        --catalog senaite_catalog_sample \
+        --index listing_searchable_text --index medical_record_number
+
+When no index is given, all indexes and metadata are updated.
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+from senaite.patient import logger
+from senaite.patient.catalog import PATIENT_CATALOG
+from senaite.patient.reindex import reindex_partition
+from senaite.patient.scripts import setup_site
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--site", "-s", default="senaite",
+                    help="ID of the SENAITE site")
+parser.add_argument("--user", "-u", default="admin",
+                    help="User to run the script with")
+parser.add_argument("--catalog", default=PATIENT_CATALOG,
+                    help="ID of the catalog to reindex")
+parser.add_argument("--index", "-i", action="append", dest="indexes",
+                    default=[], help="Index to reindex. Can be repeated")
+parser.add_argument("--portal-type", "-t", action="append",
+                    dest="portal_types", default=[],
+                    help="Portal type to reindex. Can be repeated")
+parser.add_argument("--workers", "-w", type=int, default=2,
+                    help="Number of worker processes")
+parser.add_argument("--instance", default="bin/instance",
+                    help="Path to the instance script to start workers with")
+parser.add_argument("--partition", type=int, default=None,
+                    help="Partition to reindex (set for worker processes)")
+
+
+def get_worker_command(args, partition):
+    """Returns the command to start the worker of the partition
+    """
+    command = [args.instance, "run", __file__,
+               "--site", args.site,
+               "--user", args.user,
+               "--catalog", args.catalog,
+               "--workers", str(args.workers),
+               "--partition", str(partition)]
+    for index in args.indexes:
+        command.extend(["--index", index])
+    for portal_type in args.portal_types:
+        command.extend(["--portal-type", portal_type])
+    return command
+
+
+def run_workers(args):
+    """Starts a worker per partition and waits for them to finish
+    """
+    started = time.time()
+    workers = []
+    for partition in range(args.workers):
+        command = get_worker_command(args, partition)
+        workers.append(subprocess.Popen(command))
+
+    failed = 0
+    for partition, worker in enumerate(workers):
+        if worker.wait() != 0:
+            logger.error("Worker of partition {} failed with exit code "
+                         "{}".format(partition, worker.returncode))
+            failed += 1
+
+    logger.info("Reindexed {} with {} workers in {:.1f}s".format(
+        args.catalog, args.workers, time.time() - started))
+    return failed
+
+
+def main(app):
+    args, _ = parser.parse_known_args()
+    if args.partition is None:
+        sys.exit(1 if run_workers(args) else 0)
+
+    setup_site(app, args.site, args.user)
+    query = {}
+    if args.portal_types:
+        query["portal_type"] = args.portal_types
+    reindex_partition(args.catalog, args.partition, args.workers,
+                      idxs=args.indexes, query=query)
+
+
+if __name__ == "__main__":
+    main(app)  # noqa: F821 (app is injected by `bin/instance run`)
@@ -18,13 +18,19 @@
 # Copyright 2020-2025 by it's authors.
 # Some rights reserved, see README and LICENSE.
 
+import sys
+from collections import defaultdict
+
+import transaction
 from bika.lims import api
 from plone.registry.interfaces import IRegistry
 from Products.DCWorkflow.Guard import Guard
+from senaite.core.api.catalog import add_column
+from senaite.core.api.catalog import add_index
+from senaite.core.api.catalog import del_column
+from senaite.core.api.catalog import del_index
 from senaite.core.catalog import SAMPLE_CATALOG
 from senaite.core.catalog import set_catalogs
-from senaite.core.setuphandlers import setup_core_catalogs
-from senaite.core.setuphandlers import setup_other_catalogs
 from senaite.core.workflow import SAMPLE_WORKFLOW
 from senaite.patient import logger
 from senaite.patient import permissions
@@ -39,10 +45,24 @@ PROFILE_ID = "profile-{}:default".format(PRODUCT_NAME)
 # Default: 300 (5 minutes)
 MAX_SEC_THRESHOLD = 300
 
+# Number of objects to reindex before a savepoint takes place
+BATCH_SIZE = 1000
+
 CATALOGS = (
     PatientCatalog,
 )
 
+# Types of the indexes whose indexed attributes can be set, so that the
+# attributes declared can be compared with the live ones
+ATTRIBUTE_INDEX_TYPES = (
+    "BooleanIndex",
+    "DateIndex",
+    "FieldIndex",
+    "KeywordIndex",
+    "UUIDIndex",
+    "ZCTextIndex",
+)
+
 # Tuples of (portal_type, [catalog_id,])
 CATALOG_MAPPINGS = (
     ("Patient", [PATIENT_CATALOG]),
@@ -52,6 +72,8 @@ CATALOG_MAPPINGS = (
 INDEXES = [
     (SAMPLE_CATALOG, "is_temporary_mrn", "", "BooleanIndex"),
     (SAMPLE_CATALOG, "medical_record_number", "", "KeywordIndex"),
+    (SAMPLE_CATALOG, "patient_uid", "", "FieldIndex"),
+    (SAMPLE_CATALOG, "age_at_sampling", "", "FieldIndex"),
 ]
 
 # Tuples of (catalog, column_name)
@@ -59,6 +81,8 @@ COLUMNS = [
     (SAMPLE_CATALOG, "isMedicalRecordTemporary"),
     (SAMPLE_CATALOG, "getMedicalRecordNumberValue"),
     (SAMPLE_CATALOG, "getPatientFullName"),
+    (SAMPLE_CATALOG, "getPatientUID"),
+    (SAMPLE_CATALOG, "getAgeAtSampling"),
 ]
 
 NAVTYPES = [
@@ -253,11 +277,198 @@ def post_uninstall(portal_setup):
     logger.info("{} uninstall handler [DONE]".format(PRODUCT_NAME.upper()))
 
 
-def setup_catalogs(portal):
+def setup_catalogs(portal, populated=None, only=None, skip=None):
     """Setup patient catalogs
+
+    Only the indexes and columns that differ from the declared ones are added,
+    rebuilt or dropped, so reinstalling the add-on does not reindex the
+    catalogs from scratch.
+
+    :param populated: names of the new indexes and columns that the caller
+        populates on its own. The other new indexes and columns are populated
+        here with the objects that are already cataloged
+    :param only: names of the only indexes and columns to set up, e.g. the
+        ones introduced by an upgrade step
+    :param skip: names of the indexes and columns not to set up, e.g. the ones
+        set up by later upgrade steps
+    """
+    logger.info("Setup catalogs ...")
+
+    # catalogs owned by this add-on, undeclared indexes and columns are dropped
+    for catalog_class in CATALOGS:
+        catalog = catalog_class()
+        catalog_id = catalog.getId()
+        if catalog_id not in portal.objectIds():
+            logger.info("Adding catalog '{}'".format(catalog_id))
+            portal._setObject(catalog_id, catalog)
+        catalog = portal._getOb(catalog_id)
+        module = sys.modules[catalog_class.__module__]
+        setup_catalog(catalog, module.INDEXES, module.COLUMNS,
+                      drop=True, populated=populated, only=only, skip=skip)
+
+    # catalogs of other add-ons, only the declared indexes and columns are
+    # taken into account
+    indexes = defaultdict(list)
+    columns = defaultdict(list)
+    for catalog_id, index, attr, index_type in INDEXES:
+        indexes[catalog_id].append((index, attr, index_type))
+    for catalog_id, column in COLUMNS:
+        columns[catalog_id].append(column)
+    for catalog_id in set(indexes.keys() + columns.keys()):
+        catalog = api.get_tool(catalog_id)
+        setup_catalog(catalog, indexes[catalog_id], columns[catalog_id],
+                      populated=populated, only=only, skip=skip)
+
+    logger.info("Setup catalogs [DONE]")
+
+
+def get_catalog_changes(catalog, indexes, columns, drop=False):
+    """Returns a dict with the indexes and columns of the catalog that differ
+    from the declared ones
+
+    :param indexes: list of declared (index, attribute, index type) tuples
+    :param columns: list of declared columns
+    :param drop: whether undeclared indexes and columns have to be dropped
     """
-    setup_core_catalogs(portal, catalog_classes=CATALOGS)
-    setup_other_catalogs(portal, indexes=INDEXES, columns=COLUMNS)
+    changes = {
+        "add_indexes": [],
+        "rebuild_indexes": [],
+        "drop_indexes": [],
+        "add_columns": [],
+        "drop_columns": [],
+    }
+
+    live = dict([(index.getId(), index) for index in catalog.getIndexObjects()])
+    for name, attr, index_type in indexes:
+        index = live.get(name)
+        if index is None:
+            changes["add_indexes"].append((name, attr, index_type))
+            continue
+        if index.meta_type != index_type:
+            changes["rebuild_indexes"].append((name, attr, index_type))
+            continue
+        if index_type not in ATTRIBUTE_INDEX_TYPES:
+            # e.g. path indexes report getPhysicalPath as their source
+            continue
+        attrs = list(index.getIndexSourceNames())
+        if attrs != [attr or name]:
+            changes["rebuild_indexes"].append((name, attr, index_type))
+
+    schema = catalog.schema()
+    changes["add_columns"] = [col for col in columns if col not in schema]
+
+    if drop:
+        declared = [index[0] for index in indexes]
+        changes["drop_indexes"] = [name for name in live.keys()
+                                   if name not in declared]
+        changes["drop_columns"] = [col for col in schema
+                                   if col not in columns]
+    return changes
+
+
+def setup_catalog(catalog, indexes, columns, drop=False, populated=None,
+                  only=None, skip=None):
+    """Adds, rebuilds or drops the indexes and columns of the catalog that
+    differ from the declared ones. The objects are only reindexed when new
+    indexes or columns are added, in a single pass over the cataloged objects
+
+    :param indexes: list of declared (index, attribute, index type) tuples
+    :param columns: list of declared columns
+    :param drop: whether undeclared indexes and columns have to be dropped
+    :param populated: names of the new indexes and columns that the caller
+        populates on its own
+    :param only: names of the only indexes and columns to set up
+    :param skip: names of the indexes and columns not to set up
+    """
+    catalog_id = catalog.getId()
+    changes = get_catalog_changes(catalog, indexes, columns, drop=drop)
+    changes = filter_catalog_changes(changes, only=only, skip=skip)
+
+    for name in changes["drop_indexes"]:
+        logger.info("Removing index '{}' from '{}'".format(name, catalog_id))
+        del_index(catalog, name)
+
+    for name, attr, index_type in changes["rebuild_indexes"]:
+        logger.info("Rebuilding index '{}' of '{}'".format(name, catalog_id))
+        del_index(catalog, name)
+
+    to_index = changes["rebuild_indexes"] + changes["add_indexes"]
+    for name, attr, index_type in to_index:
+        logger.info("Adding index '{}' ({}) to '{}'".format(
+            name, index_type, catalog_id))
+        attrs = [attr] if attr else None
+        add_index(catalog, name, index_type, indexed_attrs=attrs)
+
+    for column in changes["drop_columns"]:
+        logger.info("Removing column '{}' from '{}'".format(
+            column, catalog_id))
+        del_column(catalog, column)
+
+    for column in changes["add_columns"]:
+        logger.info("Adding column '{}' to '{}'".format(column, catalog_id))
+        add_column(catalog, column)
+
+    populated = populated or []
+    idxs = [index[0] for index in to_index if index[0] not in populated]
+    update_metadata = any(map(lambda col: col not in populated,
+                              changes["add_columns"]))
+    if not any([idxs, update_metadata]):
+        logger.info("Catalog '{}' is up to date".format(catalog_id))
+        return changes
+
+    populate_catalog(catalog, idxs, update_metadata)
+    return changes
+
+
+def filter_catalog_changes(changes, only=None, skip=None):
+    """Returns the changes of the indexes and columns with the given names
+    only, and without the ones to skip
+
+    :param changes: dict returned by `get_catalog_changes`
+    """
+    def keep(name):
+        if only is not None and name not in only:
+            return False
+        return name not in (skip or [])
+
+    filtered = {}
+    for key, values in changes.items():
+        names = [value[0] if isinstance(value, tuple) else value
+                 for value in values]
+        filtered[key] = [value for name, value in zip(names, values)
+                         if keep(name)]
+    return filtered
+
+
+def populate_catalog(catalog, idxs, update_metadata=False):
+    """Populates the given indexes (and the metadata) of the catalog with the
+    objects that are already cataloged, in a single pass
+    """
+    catalog_id = catalog.getId()
+    if not idxs:
+        # metadata is updated regardless of the indexes, use a cheap one
+        idxs = ["UID"]
+    logger.info("Populating {} of '{}' ...".format(
+        ", ".join(idxs), catalog_id))
+
+    portal = api.get_portal()
+    paths = list(catalog._catalog.uids.keys())
+    total = len(paths)
+    for num, path in enumerate(paths, 1):
+        obj = portal.unrestrictedTraverse(path, None)
+        if obj is None:
+            continue
+        catalog.catalog_object(obj, path, idxs=idxs,
+                               update_metadata=update_metadata)
+        if num % BATCH_SIZE == 0:
+            logger.info("Populating '{}': {}/{}".format(
+                catalog_id, num, total))
+            # keep the memory bounded within the import step
+            transaction.savepoint(optimistic=True)
+            portal._p_jar.cacheGC()
+
+    logger.info("Populating {} of '{}' [DONE]".format(
+        ", ".join(idxs), catalog_id))
 
 
 def add_patient_folder(portal):
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+"""Per-patient sample statistics
+
+The number of samples of each patient, by review state, and the date of the
+last sample are kept in an annotation of the patient. They are updated
+incrementally when a sample is assigned to or unassigned from the patient and
+when a sample is transitioned, so the patient listings can display and sort
+by them without querying the sample catalog. The counters resolve concurrent
+updates without conflict errors.
+
+The statistics indexes of the patient are not updated along with the sample,
+to keep patient catalog writes out of sample creation. The patient is queued
+instead, and the queued patients are reindexed with `reindex_stale_stats`,
+e.g. from a cron job.
+
+Drift, e.g. from samples that were removed or assigned while the subscribers
+were not active, is repaired with `reconcile_sample_stats`.
+"""
+
+import transaction
+from BTrees.Length import Length
+from BTrees.OOBTree import OOBTree
+from BTrees.OOBTree import OOTreeSet
+from bika.lims import api
+from DateTime import DateTime
+from persistent import Persistent
+from persistent.mapping import PersistentMapping
+from senaite.core.catalog import SAMPLE_CATALOG
+from senaite.patient import logger
+from senaite.patient.catalog import PATIENT_CATALOG
+from senaite.patient.upgrade.utils import process_catalog
+from zope.annotation.interfaces import IAnnotations
+
+# Annotation key of the patient where the statistics are stored
+STATS_STORAGE = "senaite.patient.stats"
+
+# Annotation key of the portal where the UIDs of the patients whose statistics
+# are not reindexed yet are stored
+STALE_STORAGE = "senaite.patient.stats.stale"
+
+# Number of stale patients to reindex before committing
+BATCH_SIZE = 100
+
+# Patient indexes (and metadata columns) that depend on the statistics
+STATS_INDEXES = [
+    "patient_samples_count",
+    "patient_last_sample_date",
+]
+
+# Date of the last sample indexed for patients without samples. Date indexes
+# skip empty values, and patients not in the index are left out of the
+# results when sorting by it
+NO_SAMPLE_DATE = DateTime(0)
+
+
+class Maximum(Persistent):
+    """Persistent value that resolves write conflicts by keeping the maximum
+    """
+
+    def __init__(self, value=0):
+        self.value = value
+
+    def set(self, value):
+        if value > self.value:
+            self.value = value
+
+    def __call__(self):
+        return self.value
+
+    def _p_resolveConflict(self, old, committed, new):
+        state = dict(new)
+        state["value"] = max(committed["value"], new["value"])
+        return state
+
+
+def get_storage(patient, create=False):
+    """Returns the statistics storage of the patient
+    """
+    annotations = IAnnotations(patient)
+    storage = annotations.get(STATS_STORAGE)
+    if storage is None and create:
+        storage = PersistentMapping()
+        storage["total"] = Length()
+        storage["states"] = OOBTree()
+        storage["last"] = Maximum()
+        annotations[STATS_STORAGE] = storage
+    return storage
+
+
+def get_sample_stats(patient):
+    """Returns a dict with the number of samples of the patient, the number of
+    samples by review state and the date of the last sample
+    """
+    storage = get_storage(patient)
+    if storage is None:
+        return {"total": 0, "states": {}, "last_sample_date": None}
+    last = storage["last"]()
+    return {
+        "total": storage["total"](),
+        "states": dict([(state, length())
+                        for state, length in storage["states"].items()]),
+        "last_sample_date": DateTime(last) if last else None,
+    }
+
+
+def get_sample_date(sample):
+    """Returns the date of the sample as a timestamp
+    """
+    date = sample.getDateSampled() or api.get_creation_date(sample)
+    return date.timeTime()
+
+
+def change_state(storage, state, delta):
+    """Changes the number of samples with the given state by delta
+    """
+    states = storage["states"]
+    length = states.get(state)
+    if length is None:
+        length = states[state] = Length()
+    length.change(delta)
+
+
+def reindex_stats(patient):
+    """Reindexes the statistics of the patient
+    """
+    patient.reindexObject(idxs=STATS_INDEXES)
+
+
+def get_stale_storage(create=False):
+    """Returns the set of UIDs of the patients whose statistics changed since
+    they were last reindexed
+    """
+    annotations = IAnnotations(api.get_portal())
+    stale = annotations.get(STALE_STORAGE)
+    if stale is None and create:
+        stale = annotations[STALE_STORAGE] = OOTreeSet()
+    return stale
+
+
+def mark_stale(patient):
+    """Queues the patient, so its statistics are reindexed later
+    """
+    get_stale_storage(create=True).insert(api.get_uid(patient))
+
+
+def reindex_stale_stats(batch_size=BATCH_SIZE):
+    """Reindexes the statistics of the queued patients. Returns the number of
+    patients reindexed
+    """
+    stale = get_stale_storage()
+    if not stale:
+        return 0
+    uids = list(stale)
+    logger.info("Reindexing sample statistics of {} patients ...".format(
+        len(uids)))
+    for num, uid in enumerate(uids, 1):
+        stale.remove(uid)
+        patient = api.get_object_by_uid(uid, default=None)
+        if patient is not None:
+            reindex_stats(patient)
+        if num % batch_size == 0:
+            transaction.commit()
+    transaction.commit()
+    return len(uids)
+
+
+def add_sample(patient, sample):
+    """Counts the sample in the statistics of the patient
+    """
+    storage = get_storage(patient, create=True)
+    storage["total"].change(1)
+    change_state(storage, api.get_review_status(sample), 1)
+    storage["last"].set(get_sample_date(sample))
+    mark_stale(patient)
+
+
+def remove_sample(patient, sample):
+    """Discounts the sample from the statistics of the patient
+
+    The date of the last sample is kept, it is fixed when reconciled
+    """
+    storage = get_storage(patient, create=True)
+    storage["total"].change(-1)
+    change_state(storage, api.get_review_status(sample), -1)
+    mark_stale(patient)
+
+
+def transition_sample(patient, old_state, new_state):
+    """Moves a sample of the patient from the old to the new review state
+    """
+    if old_state == new_state:
+        return
+    storage = get_storage(patient, create=True)
+    change_state(storage, old_state, -1)
+    change_state(storage, new_state, 1)
+
+
+def compute_sample_stats(query=None):
+    """Returns a dict of patient UID -> statistics computed from the sample
+    catalog metadata, in a single pass over the samples
+    """
+    stats = {}
+    query = dict(query or {}, portal_type="AnalysisRequest")
+    for brain in api.search(query, SAMPLE_CATALOG):
+        uid = brain.getPatientUID
+        if not uid:
+            continue
+        values = stats.setdefault(uid, {"total": 0, "states": {}, "last": 0})
+        values["total"] += 1
+        state = brain.review_state
+        values["states"][state] = values["states"].get(state, 0) + 1
+        date = brain.getDateSampled or brain.created
+        if date:
+            values["last"] = max(values["last"], DateTime(date).timeTime())
+    return stats
+
+
+def set_sample_stats(patient, values):
+    """Overwrites the statistics of the patient. Returns whether they changed
+    """
+    current = get_sample_stats(patient)
+    states = dict(filter(lambda item: item[1], current["states"].items()))
+    last = current["last_sample_date"]
+    last = last.timeTime() if last else 0
+    changed = current["total"] != values["total"] or \
+        states != values["states"] or abs(last - values["last"]) > 1
+    if not changed:
+        return False
+    storage = get_storage(patient, create=True)
+    storage["total"].set(values["total"])
+    storage["states"].clear()
+    for state, count in values["states"].items():
+        storage["states"][state] = Length(count)
+    storage["last"].value = values["last"]
+    return True
+
+
+def reconcile_patient_stats(patient):
+    """Recomputes the sample statistics of the given patient
+    """
+    uid = api.get_uid(patient)
+    stats = compute_sample_stats({"patient_uid": uid})
+    values = stats.get(uid, {"total": 0, "states": {}, "last": 0})
+    if set_sample_stats(patient, values):
+        reindex_stats(patient)
+
+
+def reconcile_sample_stats(reindex=False):
+    """Recomputes the sample statistics of all patients and fixes the ones
+    that drifted. Returns the number of patients fixed
+
+    :param reindex: reindex the statistics of all patients, not only of the
+        ones fixed, e.g. to populate the statistics indexes
+    """
+    logger.info("Reconcile patient sample statistics ...")
+    stats = compute_sample_stats()
+    empty = {"total": 0, "states": {}, "last": 0}
+    fixed = []
+
+    def reconcile(patient, brain):
+        values = stats.get(brain.UID, empty)
+        if set_sample_stats(patient, values):
+            fixed.append(brain.UID)
+            reindex_stats(patient)
+        elif reindex:
+            reindex_stats(patient)
+
+    query = {"portal_type": "Patient"}
+    process_catalog("reconcile_sample_stats", PATIENT_CATALOG, query,
+                    reconcile)
+    # the patients fixed are reindexed already, but not the queued ones
+    reindex_stale_stats()
+    logger.info("Reconcile patient sample statistics [DONE]: {} patients "
+                "fixed".format(len(fixed)))
+    return len(fixed)
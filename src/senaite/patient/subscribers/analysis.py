@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+from senaite.patient import check_installed
+from senaite.patient.api import add_previous_result
+from senaite.patient.api import get_analysis_patient
+from senaite.patient.api import remove_previous_result
+from senaite.patient.results import INVALIDATE_TRANSITIONS
+from senaite.patient.results import invalidate_series
+
+
+@check_installed(None)
+def on_analysis_transitioned(analysis, event):
+    """Event handler when an analysis was transitioned
+    """
+    if not event.transition:
+        return
+    transition = event.transition.id
+    if transition not in INVALIDATE_TRANSITIONS:
+        return
+    patient = get_analysis_patient(analysis)
+    if not patient:
+        return
+
+    # the valid results of the patient changed
+    invalidate_series(patient)
+
+    # keep the last verified results of the patient up to date
+    if transition == "verify":
+        add_previous_result(patient, analysis)
+    else:
+        remove_previous_result(patient, analysis)
@@ -19,10 +19,17 @@
 # Some rights reserved, see README and LICENSE.
 
 from bika.lims import api
+from senaite.core.api import dtime
 from senaite.core.behaviors import IClientShareableBehavior
 from senaite.patient import api as patient_api
 from senaite.patient import check_installed
 from senaite.patient import logger
+from senaite.patient.adapters.guards import invalidate_guards
+from senaite.patient.migration import stamp
+from senaite.patient.results import invalidate_series
+from senaite.patient.stats import add_sample
+from senaite.patient.stats import remove_sample
+from senaite.patient.stats import transition_sample
 
 # Eventos para filtrar o reconocer
 try:
@@ -77,6 +84,10 @@ def on_object_created(instance, event):
     if not _is_analysis_request(instance):
         return
 
+    # new samples are on the latest schema version
+    stamp(instance)
+
+    set_age_at_sampling(instance)
     patient = update_patient(instance)
 
     if not patient:
@@ -96,6 +107,8 @@ def on_object_created(instance, event):
         if client_uid not in client_uids:
             client_uids.append(client_uid)
             behavior.setClients(client_uids)
+            # el listado de pacientes del cliente se consulta por este índice
+            patient.reindexObject(idxs=["patient_client_uids"])
 
 
 @check_installed(None)
@@ -111,6 +124,10 @@ def on_object_edited(instance, event):
     if not _is_analysis_request(instance):
         return
 
+    # El MRN pudo cambiar, descartar los guards memorizados en la petición
+    invalidate_guards(instance)
+
+    set_age_at_sampling(instance)
     update_patient(instance)
     update_results_ranges(instance)
 
@@ -133,12 +150,14 @@ def update_patient(instance):
     # Algunos wrappers no exponen el método; evitamos el AttributeError
     try:
         if instance.isMedicalRecordTemporary():
+            set_patient_uid(instance, None)
             return None
     except AttributeError:
         return None
 
     mrn = instance.getMedicalRecordNumberValue()
     if mrn is None:
+        set_patient_uid(instance, None)
         return None
 
     patient = patient_api.get_patient_by_mrn(mrn, include_inactive=True)
@@ -150,6 +169,7 @@ def update_patient(instance):
             container = patient_api.get_patient_folder()
 
         if not patient_api.is_patient_creation_allowed(container):
+            set_patient_uid(instance, None)
             return None
 
         logger.info("Creating new Patient in '{}' with MRN: '{}'".format(api.get_path(container), mrn))
@@ -161,9 +181,77 @@ def update_patient(instance):
             logger.error("%s" % exc)
             logger.error("Failed to create patient for values: %r" % values)
             raise exc
+
+    set_patient_uid(instance, patient)
     return patient
 
 
+def set_patient_uid(sample, patient):
+    """Stores the UID of the patient in the sample, if it changed
+    """
+    uid = api.get_uid(patient) if patient else ""
+    field = sample.getField("PatientUID")
+    old_uid = field.get(sample)
+    if old_uid == uid:
+        return
+    field.set(sample, uid)
+    sample.reindexObject(idxs=["patient_uid"])
+
+    # keep the sample statistics of the patients in sync
+    old_patient = old_uid and api.get_object_by_uid(old_uid, default=None)
+    if old_patient:
+        remove_sample(old_patient, sample)
+    if patient:
+        add_sample(patient, sample)
+
+    # the results of the sample moved from one patient to the other
+    update_patient_results(sample, old_patient, patient)
+
+
+def update_patient_results(sample, old_patient, patient):
+    """Updates the results of the patients a sample was moved between
+    """
+    for obj in filter(None, [old_patient, patient]):
+        invalidate_series(obj)
+    # the last verified results follow the sample
+    patient_api.move_previous_results(sample, old_patient, patient)
+
+
+def set_age_at_sampling(sample):
+    """Stores the age in days of the patient when the sample was collected,
+    if it changed
+    """
+    birthdate = sample.getField("DateOfBirth").get_date_of_birth(sample)
+    birthdate = dtime.to_dt(birthdate)
+    sampled = dtime.to_dt(sample.getDateSampled())
+    age = None
+    if birthdate and sampled:
+        age = (sampled.date() - birthdate.date()).days
+        # a birthdate after the sampling is not valid
+        age = age if age >= 0 else None
+    field = sample.getField("AgeAtSampling")
+    if field.get(sample) == age:
+        return
+    field.set(sample, age)
+    sample.reindexObject(idxs=["age_at_sampling"])
+
+
+@check_installed(None)
+def on_object_transitioned(instance, event):
+    """Se transiciona un AR (sample)."""
+    if not event.transition or not event.old_state:
+        return
+    # la fecha de muestreo se fija al muestrear
+    if event.transition.id == "sample":
+        set_age_at_sampling(instance)
+    # statistics follow the patient the sample is assigned to
+    uid = instance.getPatientUID()
+    patient = uid and api.get_object_by_uid(uid, default=None)
+    if not patient:
+        return
+    transition_sample(patient, event.old_state.id, event.new_state.id)
+
+
 def get_patient_fields(instance):
     instance = _unwrap(instance)
     mrn = instance.getMedicalRecordNumberValue()
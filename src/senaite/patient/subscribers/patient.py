@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+from senaite.patient import api as patient_api
+from senaite.patient.migration import stamp
+from zope.container.interfaces import IContainerModifiedEvent
+
+# Kind of change for patient transitions
+TRANSITION_CHANGES = {
+    "activate": "activated",
+    "deactivate": "deactivated",
+}
+
+
+def on_patient_added(patient, event):
+    """Event handler when a patient was created
+    """
+    # new patients are on the latest schema version
+    stamp(patient)
+    patient_api.mark_patient_changed(patient, "created")
+
+
+def on_patient_modified(patient, event):
+    """Event handler when a patient was modified
+    """
+    if IContainerModifiedEvent.providedBy(event):
+        return
+    patient_api.mark_patient_changed(patient, "modified")
+
+
+def on_patient_transitioned(patient, event):
+    """Event handler when a transition was performed on a patient
+    """
+    if event.transition is None:
+        # initial state on creation
+        return
+    transition_id = event.transition.id
+    kind = TRANSITION_CHANGES.get(transition_id, transition_id)
+    patient_api.mark_patient_changed(patient, kind)
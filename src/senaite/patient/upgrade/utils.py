@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of SENAITE.PATIENT.
+#
+# SENAITE.PATIENT is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, version 2.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# Copyright 2020-2025 by it's authors.
+# Some rights reserved, see README and LICENSE.
+
+import time
+from datetime import timedelta
+
+import transaction
+from bika.lims import api
+from persistent.mapping import PersistentMapping
+from senaite.core.upgrade.utils import uncatalog_brain
+from senaite.patient import logger
+from zope.annotation.interfaces import IAnnotations
+
+# Annotation key of the portal where the checkpoints are stored
+CHECKPOINTS_STORAGE = "senaite.patient.upgrade.checkpoints"
+
+# Number of objects to process before committing the transaction
+BATCH_SIZE = 1000
+
+# Number of objects to process before logging the progress
+LOG_SIZE = 100
+
+
+def get_checkpoints():
+    """Returns the mapping of process name -> last processed key
+    """
+    annotations = IAnnotations(api.get_portal())
+    checkpoints = annotations.get(CHECKPOINTS_STORAGE)
+    if checkpoints is None:
+        checkpoints = PersistentMapping()
+        annotations[CHECKPOINTS_STORAGE] = checkpoints
+    return checkpoints
+
+
+def get_checkpoint(name):
+    """Returns the key of the last object processed for the given name
+    """
+    annotations = IAnnotations(api.get_portal())
+    checkpoints = annotations.get(CHECKPOINTS_STORAGE) or {}
+    return checkpoints.get(name)
+
+
+def set_checkpoint(name, key):
+    """Stores the key of the last object processed for the given name
+    """
+    checkpoints = get_checkpoints()
+    if key is None:
+        checkpoints.pop(name, None)
+    else:
+        checkpoints[name] = key
+
+
+def commit():
+    """Commits the transaction and minimizes the ZODB cache
+    """
+    transaction.commit()
+    api.get_portal()._p_jar.cacheMinimize()
+
+
+def log_progress(name, num, total, started):
+    """Logs the progress with an estimation of the remaining time
+    """
+    elapsed = time.time() - started
+    rate = num / elapsed if elapsed else 0
+    remaining = (total - num) / rate if rate else 0
+    logger.info("{}: {}/{} ({:.1f}/s, ETA {})".format(
+        name, num, total, rate, timedelta(seconds=int(remaining))))
+
+
+def process(name, items, total, func, batch_size=BATCH_SIZE):
+    """Calls func for each item in batches
+
+    Items are tuples of (key, callable that returns the arguments of func),
+    sorted by key. The key of the last item of each batch is stored as a
+    checkpoint when the transaction is committed, so that a restarted process
+    skips the items that were processed already.
+
+    :param name: unique name of the process, used for the checkpoint
+    :param items: iterable of (key, args getter) tuples sorted by key
+    :param total: total number of items, for progress reporting
+    :param func: function to call for each item
+    :param batch_size: number of items to process before committing
+    """
+    checkpoint = get_checkpoint(name)
+    if checkpoint is not None:
+        logger.info("{}: resuming after {}".format(name, checkpoint))
+
+    started = time.time()
+    num = 0
+    processed = 0
+    for key, get_args in items:
+        num += 1
+        if checkpoint is not None and key <= checkpoint:
+            continue
+
+        args = get_args()
+        if args is not None:
+            func(*args)
+            # flush the object from memory, if not modified
+            args[0]._p_deactivate()
+        processed += 1
+
+        if num % LOG_SIZE == 0:
+            log_progress(name, num, total, started)
+
+        if processed % batch_size == 0:
+            set_checkpoint(name, key)
+            commit()
+
+    # processing done, remove the checkpoint
+    set_checkpoint(name, None)
+    commit()
+    log_progress(name, num, total, started)
+
+
+def process_catalog(name, catalog_id, query, func, batch_size=BATCH_SIZE):
+    """Calls func(obj, brain) for each object found by the catalog query
+
+    Brains are sorted by UID, that is used as the checkpoint key. A resumed
+    process only searches the brains from the checkpoint on, with a UID range.
+    Stale brains without object are uncataloged.
+    """
+    query = dict(query, sort_on="UID", sort_order="ascending")
+    checkpoint = get_checkpoint(name)
+    if checkpoint is not None:
+        # the range is inclusive, the checkpoint itself is skipped by process
+        query["UID"] = {"query": checkpoint, "range": "min"}
+    catalog = api.get_tool(catalog_id)
+    brains = catalog(query)
+
+    def get_args(brain):
+        def getter():
+            try:
+                return api.get_object(brain), brain
+            except AttributeError:
+                uncatalog_brain(brain)
+                return None
+        return getter
+
+    items = ((brain.UID, get_args(brain)) for brain in brains)
+    process(name, items, len(brains), func, batch_size=batch_size)
+
+
+def process_folder(name, folder, func, batch_size=BATCH_SIZE):
+    """Calls func(obj) for each object contained in the folder
+
+    The ids of the folder are used as checkpoint keys
+    """
+    ids = sorted(folder.objectIds())
+
+    def get_args(obj_id):
+        def getter():
+            obj = folder._getOb(obj_id, None)
+            return (obj, ) if obj is not None else None
+        return getter
+
+    items = ((obj_id, get_args(obj_id)) for obj_id in ids)
+    process(name, items, len(ids), func, batch_size=batch_size)
@@ -18,7 +18,6 @@
 # Copyright 2020-2025 by it's authors.
 # Some rights reserved, see README and LICENSE.
 
-import transaction
 from bika.lims import api
 from Products.BTreeFolder2.BTreeFolder2 import BTreeFolder2Base
 from senaite.core.api.catalog import del_column
@@ -33,6 +32,7 @@ from senaite.patient.config import PRODUCT_NAME
 from senaite.patient.content.patient import Patient
 from senaite.patient.setuphandlers import PROFILE_ID
 from senaite.patient.setuphandlers import setup_catalogs
+from senaite.patient.upgrade.utils import process_folder
 
 version = "1.0.0"
 
@@ -94,7 +94,8 @@ def migrate_patient_item_to_container(portal):
     """
     logger.info("Migrate patients to be folderish ...")
     patients = portal.patients
-    for patient in patients.objectValues():
+
+    def migrate(patient):
         pid = patient.getId()
         patients._delOb(pid)
         patient.__class__ = Patient
@@ -102,7 +103,7 @@ def migrate_patient_item_to_container(portal):
         BTreeFolder2Base._initBTrees(patients[pid])
         patients[pid].reindexObject()
 
-    transaction.commit()
+    process_folder("migrate_patient_item_to_container", patients, migrate)
     logger.info("Migrate patients to be folderish [DONE]")
 
 
@@ -143,10 +144,11 @@ def fix_patients_fullname(portal):
     """Update the value of attribute 'firstname' with the value of 'fullname'
     """
     logger.info("Fixing patients full names ...")
-    for patient in portal.patients.objectValues():
+
+    def fix_fullname(patient):
         if patient.get_firstname():
             # This one has the value set already
-            continue
+            return
 
         raw = patient.__dict__
         firstname = raw.get("fullname", None)
@@ -155,4 +157,5 @@ def fix_patients_fullname(portal):
             del(patient.__dict__["fullname"])
             patient.reindexObject()
 
+    process_folder("fix_patients_fullname", portal.patients, fix_fullname)
     logger.info("Fixing patients full names ... [DONE]")
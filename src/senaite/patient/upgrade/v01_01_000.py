@@ -27,6 +27,8 @@ from senaite.patient import logger
 from senaite.patient.config import PATIENT_CATALOG
 from senaite.patient.config import PRODUCT_NAME
 from senaite.patient.setuphandlers import setup_catalogs
+from senaite.patient.upgrade.utils import get_checkpoint
+from senaite.patient.upgrade.utils import process_folder
 
 version = "1.1.0"
 profile = "profile-{0}:default".format(PRODUCT_NAME)
@@ -108,26 +110,30 @@ def fix_unicode_issues(portal):
       - accessors return encoded strings
       - catalog indexes store encoded strings
     """
-    # Clear senaite_patient_catalog
-    patient_catalog = api.get_tool(PATIENT_CATALOG)
-    patient_catalog.manage_catalogClear()
+    name = "fix_unicode_issues"
 
-    # Unindex getFullname index from portal_catalog
+    # Clear the catalogs, unless resuming an interrupted process
     portal_catalog = api.get_tool("portal_catalog")
-    portal_catalog.clearIndex("getFullname")
+    if get_checkpoint(name) is None:
+        # Clear senaite_patient_catalog
+        patient_catalog = api.get_tool(PATIENT_CATALOG)
+        patient_catalog.manage_catalogClear()
+
+        # Unindex getFullname index from portal_catalog
+        portal_catalog.clearIndex("getFullname")
 
     invalid = []
 
     # Walk through all Patients, reset the values to ensure the value is stored
     # as unicode and reindex them encoded (because of accessors)
-    for patient in portal.patients.objectValues():
+    def fix_unicode(patient):
         # skip invalid patients
         # NOTE: This is obviously a bug in the data that should not happen!
         #       Anyhow, we we do not want this upgrade handler to fail on this
         #       and investigate elsewhere.
         if not patient.mrn:
-            invalid.append(patient)
-            continue
+            invalid.append(api.get_url(patient))
+            return
         patient.setEmail(patient.email)
         patient.setMRN(patient.mrn)
         try:
@@ -140,14 +146,16 @@ def fix_unicode_issues(portal):
         patient.setLastname(patient.lastname)
         patient.reindexObject()
 
+    process_folder(name, portal.patients, fix_unicode)
+
     # Reindex portal_catalog's getFullName index
     handler = ZLogHandler()
     portal_catalog.reindexIndex(["getFullname"], None, handler)
 
     if len(invalid) > 0:
         logger.error("Skipped %d patients w/o MRN set:" % len(invalid))
-        for obj in invalid:
-            logger.info("----> %s" % api.get_url(obj))
+        for url in invalid:
+            logger.info("----> %s" % url)
 
 
 def migrate_birthdates(portal):
@@ -194,7 +202,11 @@ def update_patients_role_mappings(portal):
     wf_tool = api.get_tool("portal_workflow")
     wf_id = "senaite_patient_workflow"
     workflow = wf_tool.getWorkflowById(wf_id)
-    for patient in portal.patients.objectValues():
+
+    def update_role_mappings(patient):
         workflow.updateRoleMappingsFor(patient)
         patient.reindexObjectSecurity()
+
+    process_folder("update_patients_role_mappings", portal.patients,
+                   update_role_mappings)
     logger.info("Fixing permissions for patients [DONE]")
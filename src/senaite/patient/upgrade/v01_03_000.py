@@ -18,7 +18,6 @@
 # Copyright 2020-2025 by it's authors.
 # Some rights reserved, see README and LICENSE.
 
-from bika.lims import api
 from senaite.core.catalog import SAMPLE_CATALOG
 from senaite.core.upgrade import upgradestep
 from senaite.core.upgrade.utils import UpgradeUtils
@@ -26,6 +25,8 @@ from senaite.patient import logger
 from senaite.patient.config import PRODUCT_NAME
 from senaite.patient.config import SEXES
 from senaite.patient.setuphandlers import setup_catalogs
+from senaite.patient.upgrade.utils import process_catalog
+from senaite.patient.upgrade.utils import process_folder
 
 version = "1.3.0"
 profile = "profile-{0}:default".format(PRODUCT_NAME)
@@ -76,27 +77,17 @@ def del_patients_action(portal):
 
 def update_patients_sex(portal):
     logger.info("Updating sex for patients without Sex assigned ...")
-    for patient in portal.patients.objectValues():
-        # Update the sex if necessary
-        update_sex_with_gender(patient)
-
-        # Flush the object from memory
-        patient._p_deactivate()
-
+    # Update the sex if necessary
+    process_folder("update_patients_sex", portal.patients,
+                   update_sex_with_gender)
     logger.info("Updating sex for patients without Sex assigned [DONE]")
 
 
 def update_samples_sex(portal):
     logger.info("Updating sex for samples without Sex assigned ...")
     query = {"portal_type": "AnalysisRequest"}
-    brains = api.search(query, SAMPLE_CATALOG)
-    for brain in brains:
-        sample = api.get_object(brain)
-        update_sex_with_gender(sample)
-
-        # Flush the object from memory
-        sample._p_deactivate()
-
+    process_catalog("update_samples_sex", SAMPLE_CATALOG, query,
+                    lambda sample, brain: update_sex_with_gender(sample))
     logger.info("Updating sex for samples without Sex assigned [DONE]")
 
 
@@ -26,7 +26,6 @@ from bika.lims.interfaces import IDoNotSupportSnapshots
 from bika.lims.workflow import isTransitionAllowed
 from persistent.list import PersistentList
 from plone import api as ploneapi
-from senaite.core.api import dtime
 from senaite.core.api.catalog import del_column
 from senaite.core.api.catalog import del_index
 from senaite.core.catalog import SAMPLE_CATALOG
@@ -39,6 +38,7 @@ from senaite.patient.api import patient_search
 from senaite.patient.catalog import PATIENT_CATALOG
 from senaite.patient.config import PRODUCT_NAME
 from senaite.patient.setuphandlers import setup_catalogs
+from senaite.patient.upgrade.utils import process_catalog
 from zope.annotation.interfaces import IAnnotations
 from zope.interface import alsoProvides
 from zope.interface import noLongerProvides
@@ -52,8 +52,6 @@ PATIENT_FOLDER_WORKFLOW = "senaite_patient_folder_workflow"
 PATIENT_ID = "patient_id"
 IDENTIFIERS = "senaite.patient.identifiers"
 
-_marker = object()
-
 
 @upgradestep(PRODUCT_NAME, version)
 def upgrade(tool):
@@ -150,14 +148,8 @@ def fix_samples_middlename(tool):
     in samples listing as well
     """
     logger.info("Fix samples middle name ...")
-    query = {"portal_type": "AnalysisRequest"}
-    brains = api.search(query, SAMPLE_CATALOG)
-    total = len(brains)
-    for num, brain in enumerate(brains):
-        if num > 0 and num % 100 == 0:
-            logger.info("Fix samples middle name: {}/{}".format(num, total))
 
-        obj = api.get_object(brain)
+    def fix_middlename(obj, brain):
         brain_fullname = brain.getPatientFullName
         try:
             obj_fullname = obj.getPatientFullName()
@@ -170,9 +162,9 @@ def fix_samples_middlename(tool):
         if reindex:
             obj.reindexObject()
 
-        # Flush the object from memory
-        obj._p_deactivate()
-
+    query = {"portal_type": "AnalysisRequest"}
+    process_catalog("fix_samples_middlename", SAMPLE_CATALOG, query,
+                    fix_middlename)
     logger.info("Fix samples middle name [DONE]")
 
 
@@ -301,42 +293,9 @@ def migrate_patient_id_to_identifiers(tool):
         })
     ploneapi.portal.set_registry_record(IDENTIFIERS, value=records)
 
-    query = {"portal_type": "Patient"}
-    brains = api.search(query, PATIENT_CATALOG)
-    total = len(brains)
-
-    for num, brain in enumerate(brains):
-        obj = api.get_object(brain)
-        logger.info("Processing patient %s/%s: %s"
-                    % (num+1, total, obj.getId()))
-
-        value = getattr(obj, PATIENT_ID, _marker)
-        if value is _marker:
-            continue
-
-        if api.is_string(value):
-            patient_id = value
-        elif isinstance(value, list):
-            if len(filter(None, value)) > 0:
-                patient_id = value[0]
-        else:
-            patient_id = ""
-
-        delattr(obj, PATIENT_ID)
-
-        if not patient_id:
-            continue
-
-        # patient ID already set
-        if PATIENT_ID in obj.get_identifier_ids():
-            continue
-
-        # set Patient ID to identifiers
-        identifiers = obj.getIdentifiers()
-        identifiers.append({u"key": "patient_id", u"value": patient_id})
-        obj.setIdentifiers(identifiers)
-
-        logger.info("Migrated Patient ID %s to identifiers" % patient_id)
+    # the patient ID attribute is moved to the identifiers on access or by
+    # the sweeper, see `senaite.patient.migration.migrate_patient_id`
+    logger.info("Patients are migrated lazily")
 
     logger.info("Migrate patient ID to identifiers [DONE]")
 
@@ -360,100 +319,23 @@ def remove_stale_patient_id_catalog_entries(tool):
 
 def migrate_date_of_birth_field(tool):
     """Resets the date of birth from samples
+
+    Samples are migrated on access or by the sweeper, see
+    `senaite.patient.migration.migrate_date_of_birth`
     """
     logger.info("Migrate DateOfBirth field to AgeDateOfBirthField ...")
-
-    age_seleted_attr = "_AgeDoBWidget_age_selected"
-    dob_estimated_attr = "_AgeDoBWidget_dob_estimated"
-
-    uc = api.get_tool("uid_catalog")
-    brains = uc(portal_type="AnalysisRequest")
-    total = len(brains)
-
-    for num, brain in enumerate(brains):
-        if num and num % 100 == 0:
-            logger.info("Migrated {0}/{1} fields".format(num, total))
-
-        if num and num % 1000 == 0:
-            # reduce memory size of the transaction
-            transaction.savepoint()
-
-        try:
-            obj = api.get_object(brain)
-        except AttributeError:
-            uncatalog_brain(brain)
-            continue
-
-        # additional flags were saved as attributes
-        age_selected = getattr(obj, age_seleted_attr, False),
-        dob_estimated = getattr(obj, dob_estimated_attr, False)
-
-        # remove them
-        attrs = [age_seleted_attr, dob_estimated_attr]
-        for attr in attrs:
-            if hasattr(obj, attr):
-                delattr(obj, attr)
-
-        # New field expects a tuple (dob, from_age, estimated)
-        field = obj.getField("DateOfBirth")
-        value = field.get(obj)
-
-        if dtime.is_date(value):
-            value = (dtime.to_dt(value), age_selected, dob_estimated)
-            field.set(obj, value)
-
-        elif not isinstance(value, tuple):
-            value = (None, False, False)
-            field.set(obj, value)
-
-        else:
-            obj._p_deactivate()
-            continue
-
-        # reset date of birth value
-        field.set(obj, value)
-
-        # Flush the object from memory
-        obj._p_deactivate()
-
+    logger.info("Samples are migrated lazily")
     logger.info("Migrate DateOfBirth field to AgeDateOfBirthField [DONE]")
 
 
 def update_naive_tz_dobs(tool):
     """Resets the date of birth from samples
+
+    Samples are migrated on access or by the sweeper, see
+    `senaite.patient.migration.migrate_naive_date_of_birth`
     """
     logger.info("Updating timezone-naive dates of birth ...")
-
-    uc = api.get_tool("uid_catalog")
-    brains = uc(portal_type="AnalysisRequest")
-    total = len(brains)
-
-    for num, brain in enumerate(brains):
-        if num and num % 100 == 0:
-            logger.info("Migrated {0}/{1} fields".format(num, total))
-
-        if num and num % 1000 == 0:
-            # reduce memory size of the transaction
-            transaction.savepoint()
-
-        try:
-            obj = api.get_object(brain)
-        except AttributeError:
-            uncatalog_brain(brain)
-            continue
-
-        # New field expects a tuple (dob, from_age, estimated)
-        field = obj.getField("DateOfBirth")
-        value = field.get(obj)
-        dob = value[0] if value else None
-
-        if dob and dtime.is_timezone_naive(dob):
-            # re-set the value
-            field.set(value)
-
-        # Flush the object from memory
-        obj._p_deactivate()
-
+    logger.info("Samples are migrated lazily")
     logger.info("Updating timezone-naive dates of birth [DONE]")
 
 
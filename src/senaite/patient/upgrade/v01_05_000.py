@@ -25,7 +25,21 @@ from senaite.patient.config import PRODUCT_NAME
 from senaite.patient.setuphandlers import setup_catalog_mappings
 from senaite.patient.setuphandlers import setup_catalogs
 
+from BTrees.OOBTree import OOBTree
 from bika.lims import api
+from senaite.core.catalog import ANALYSIS_CATALOG
+from senaite.core.catalog import SAMPLE_CATALOG
+from senaite.patient.api import CHANGE_STORAGE
+from senaite.patient.api import PREVIOUS_RESULTS_SIZE
+from senaite.patient.api import PREVIOUS_RESULTS_STORAGE
+from senaite.patient.api import to_previous_result
+from senaite.patient.catalog import PATIENT_CATALOG
+from senaite.patient.stats import reconcile_sample_stats
+from senaite.patient.stats import STATS_INDEXES
+from senaite.patient.subscribers.analysisrequest import set_age_at_sampling
+from senaite.patient.upgrade.utils import process
+from senaite.patient.upgrade.utils import process_catalog
+from zope.annotation.interfaces import IAnnotations
 try:
     # Disponible desde 1.5.x
     from senaite.patient.catalog.patient_catalog import PatientCatalog
@@ -35,10 +49,40 @@ except Exception:
 version = "1.5.0"
 profile = "profile-{0}:default".format(PRODUCT_NAME)
 
+# Indexes and columns introduced by the upgrade steps of this version, each
+# step sets up and populates its own ones only
+EXPORT_COLUMNS = [
+    "getFullname",
+    "getFirstname",
+    "getMiddlename",
+    "getLastname",
+    "getMaternalLastname",
+    "getSex",
+    "getGender",
+    "getBirthdate",
+    "getEstimatedBirthdate",
+    "getEmail",
+    "getEmailReport",
+    "getPhone",
+    "getIdentifiers",
+    "getDeceased",
+]
+CHANGE_FEED_NAMES = ["patient_change_seq", "patient_change_kind"]
+SAMPLE_PATIENT_UID_NAMES = ["patient_uid", "getPatientUID"]
+AGE_AT_SAMPLING_NAMES = ["age_at_sampling", "getAgeAtSampling"]
+FACET_INDEXES = ["patient_sex", "patient_gender"]
+SORTABLE_NAME_NAMES = ["patient_sortable_name"]
+CLIENT_UIDS_INDEXES = ["patient_client_uids"]
+STEP_NAMES = (EXPORT_COLUMNS + CHANGE_FEED_NAMES + SAMPLE_PATIENT_UID_NAMES
+              + STATS_INDEXES + AGE_AT_SAMPLING_NAMES + FACET_INDEXES
+              + SORTABLE_NAME_NAMES + CLIENT_UIDS_INDEXES)
+
 
 def _sync_patient_catalog(portal):
     """Asegura índices/columnas del catálogo de pacientes."""
-    setup_catalogs(portal)  # declara índices/columnas definidos por el add-on
+    # declara índices/columnas definidos por el add-on, salvo los que añaden
+    # y rellenan los pasos siguientes
+    setup_catalogs(portal, skip=STEP_NAMES)
     if PatientCatalog is not None:
         # idempotente: agrega columnas faltantes sin borrar existentes
         cat = api.get_tool("senaite_catalog_patient")
@@ -125,3 +169,216 @@ def upgrade(tool):
 
     logger.info("%s upgraded to version %s", PRODUCT_NAME, version)
     return True
+
+
+def add_patient_metadata_columns(tool):
+    """Adds the new metadata columns of the patient catalog and populates them
+    for the existing patients
+    """
+    logger.info("Add patient metadata columns ...")
+    portal = tool.aq_inner.aq_parent
+    # metadata is populated below, in a resumable way
+    setup_catalogs(portal, only=EXPORT_COLUMNS, populated=EXPORT_COLUMNS)
+    reindex_patients_metadata()
+    logger.info("Add patient metadata columns [DONE]")
+
+
+def reindex_patients_metadata():
+    """Updates the catalog metadata of all patients without reindexing
+    """
+    cat = api.get_tool(PATIENT_CATALOG)
+
+    def update_metadata(obj, brain):
+        # only the cheap UID index is touched, metadata is always updated
+        cat.catalog_object(obj, brain.getPath(), idxs=["UID"])
+
+    query = {"portal_type": "Patient"}
+    process_catalog("reindex_patients_metadata", PATIENT_CATALOG, query,
+                    update_metadata)
+
+
+def reindex_patients(name, idxs):
+    """Reindexes the given indexes of all patients, in a resumable way
+    """
+    cat = api.get_tool(PATIENT_CATALOG)
+
+    def reindex(obj, brain):
+        cat.catalog_object(obj, brain.getPath(), idxs=idxs)
+
+    query = {"portal_type": "Patient"}
+    process_catalog(name, PATIENT_CATALOG, query, reindex)
+
+
+def setup_patient_change_feed(tool):
+    """Adds the change sequence index to the patient catalog and initializes
+    the sequence of existing patients with their modification date
+    """
+    logger.info("Setup patient change feed ...")
+    portal = tool.aq_inner.aq_parent
+    # the index is populated below, once the sequences are initialized
+    setup_catalogs(portal, only=CHANGE_FEED_NAMES,
+                   populated=CHANGE_FEED_NAMES)
+
+    cat = api.get_tool(PATIENT_CATALOG)
+
+    def init_change_seq(obj, brain):
+        annotations = IAnnotations(obj)
+        if CHANGE_STORAGE not in annotations:
+            seq = int(obj.modified().micros())
+            annotations[CHANGE_STORAGE] = {"seq": seq, "kind": "modified"}
+        cat.catalog_object(obj, brain.getPath(), idxs=["patient_change_seq"])
+
+    query = {"portal_type": "Patient"}
+    process_catalog("setup_patient_change_feed", PATIENT_CATALOG, query,
+                    init_change_seq)
+    logger.info("Setup patient change feed [DONE]")
+
+
+def setup_sample_patient_uid(tool):
+    """Adds the patient_uid index to the sample catalog and stores the UID of
+    the patient in the samples with a Medical Record Number
+    """
+    logger.info("Setup patient UID of samples ...")
+    portal = tool.aq_inner.aq_parent
+    # the index is populated below, along with the field
+    setup_catalogs(portal, only=SAMPLE_PATIENT_UID_NAMES,
+                   populated=SAMPLE_PATIENT_UID_NAMES)
+
+    # map of MRN -> patient UID, so no patient search is done per sample
+    brains = api.search({"portal_type": "Patient"}, PATIENT_CATALOG)
+    uids = dict([(api.safe_unicode(brain.mrn), brain.UID)
+                 for brain in brains if brain.mrn])
+
+    cat = api.get_tool(SAMPLE_CATALOG)
+
+    def set_patient_uid(obj, brain):
+        mrn = api.safe_unicode(brain.getMedicalRecordNumberValue)
+        uid = uids.get(mrn, "")
+        obj.getField("PatientUID").set(obj, uid)
+        cat.catalog_object(obj, brain.getPath(), idxs=["patient_uid"])
+
+    query = {"portal_type": "AnalysisRequest", "is_temporary_mrn": False}
+    process_catalog("setup_sample_patient_uid", SAMPLE_CATALOG, query,
+                    set_patient_uid)
+    logger.info("Setup patient UID of samples [DONE]")
+
+
+def setup_patient_sample_stats(tool):
+    """Adds the sample statistics indexes to the patient catalog and computes
+    the statistics of the existing patients
+    """
+    logger.info("Setup patient sample statistics ...")
+    portal = tool.aq_inner.aq_parent
+    # the indexes are populated below, once the statistics are computed
+    setup_catalogs(portal, only=STATS_INDEXES, populated=STATS_INDEXES)
+    reconcile_sample_stats(reindex=True)
+    logger.info("Setup patient sample statistics [DONE]")
+
+
+def setup_previous_results(tool):
+    """Stores the last verified results of each patient per analysis keyword
+    from the analysis catalog metadata
+    """
+    logger.info("Setup previous results of patients ...")
+
+    # map of sample UID -> patient UID
+    query = {"portal_type": "AnalysisRequest", "is_temporary_mrn": False}
+    patients = dict([(brain.UID, brain.getPatientUID)
+                     for brain in api.search(query, SAMPLE_CATALOG)
+                     if brain.getPatientUID])
+
+    # map of patient UID -> keyword -> records, without waking up analyses
+    query = {"portal_type": "Analysis",
+             "review_state": ["verified", "published"]}
+    results = {}
+    for brain in api.search(query, ANALYSIS_CATALOG):
+        patient_uid = patients.get(brain.getRequestUID)
+        if not patient_uid:
+            continue
+        keywords = results.setdefault(patient_uid, {})
+        keywords.setdefault(brain.getKeyword, []).append(
+            to_previous_result(brain))
+
+    def set_previous_results(patient, keywords):
+        storage = OOBTree()
+        for keyword, records in keywords.items():
+            records.sort(key=lambda r: r["date"], reverse=True)
+            storage[keyword] = tuple(records[:PREVIOUS_RESULTS_SIZE])
+        IAnnotations(patient)[PREVIOUS_RESULTS_STORAGE] = storage
+
+    def get_args(uid):
+        def getter():
+            patient = api.get_object_by_uid(uid, default=None)
+            return (patient, results[uid]) if patient else None
+        return getter
+
+    uids = sorted(results.keys())
+    items = ((uid, get_args(uid)) for uid in uids)
+    process("setup_previous_results", items, len(uids),
+            set_previous_results)
+    logger.info("Setup previous results of patients [DONE]")
+
+
+def setup_age_at_sampling(tool):
+    """Adds the age_at_sampling index to the sample catalog and stores the
+    age of the patient when the sample was collected in the existing samples
+    """
+    logger.info("Setup age at sampling of samples ...")
+    portal = tool.aq_inner.aq_parent
+    # the index is populated below, along with the field
+    setup_catalogs(portal, only=AGE_AT_SAMPLING_NAMES,
+                   populated=AGE_AT_SAMPLING_NAMES)
+
+    def set_age(obj, brain):
+        set_age_at_sampling(obj)
+
+    query = {"portal_type": "AnalysisRequest"}
+    process_catalog("setup_age_at_sampling", SAMPLE_CATALOG, query, set_age)
+    logger.info("Setup age at sampling of samples [DONE]")
+
+
+def setup_patient_facets(tool):
+    """Adds the indexes patient_sex and patient_gender to the patient catalog,
+    used by the facets of the patient folder
+    """
+    logger.info("Setup patient facets ...")
+    portal = tool.aq_inner.aq_parent
+    # the indexes are populated below, they might exist empty already
+    setup_catalogs(portal, only=FACET_INDEXES, populated=FACET_INDEXES)
+    reindex_patients("setup_patient_facets", FACET_INDEXES)
+    logger.info("Setup patient facets [DONE]")
+
+
+def setup_patient_sortable_name(tool):
+    """Adds the patient_sortable_name index and metadata column to the patient
+    catalog, used to sort and paginate the patient listings by name
+    """
+    logger.info("Setup patient sortable name ...")
+    portal = tool.aq_inner.aq_parent
+    # the index is populated below, along with the metadata column
+    setup_catalogs(portal, only=SORTABLE_NAME_NAMES,
+                   populated=SORTABLE_NAME_NAMES)
+
+    cat = api.get_tool(PATIENT_CATALOG)
+
+    def index_sortable_name(obj, brain):
+        cat.catalog_object(obj, brain.getPath(),
+                           idxs=["patient_sortable_name"])
+
+    query = {"portal_type": "Patient"}
+    process_catalog("setup_patient_sortable_name", PATIENT_CATALOG, query,
+                    index_sortable_name)
+    logger.info("Setup patient sortable name [DONE]")
+
+
+def setup_patient_client_uids(tool):
+    """Adds the patient_client_uids index to the patient catalog, used to list
+    the patients stored in or shared with a client
+    """
+    logger.info("Setup patient client UIDs ...")
+    portal = tool.aq_inner.aq_parent
+    # the index is populated below, it might exist empty already
+    setup_catalogs(portal, only=CLIENT_UIDS_INDEXES,
+                   populated=CLIENT_UIDS_INDEXES)
+    reindex_patients("setup_patient_client_uids", CLIENT_UIDS_INDEXES)
+    logger.info("Setup patient client UIDs [DONE]")
@@ -0,0 +1,62 @@
+/*
+ * Per-page cache of search results
+ *
+ * Keeps the results of the last searches in a LRU map, so that searching the
+ * same term again, e.g. the same MRN selected in another column of the sample
+ * add form, does not query the server.
+ */
+
+class SearchCache {
+
+  constructor(options = {}) {
+    this.size = options.size || 100;
+    this.entries = new Map();
+  }
+
+  /**
+   * Returns the cached results for the term, or undefined
+   */
+  get(term) {
+    if (this.entries.has(term)) {
+      let results = this.entries.get(term);
+      // move to the end, so the least recently used entry comes first
+      this.entries.delete(term);
+      this.entries.set(term, results);
+      return results;
+    }
+    return undefined;
+  }
+
+  /**
+   * Stores the results of the term, evicting the least recently used entries
+   */
+  set(term, results) {
+    this.entries.delete(term);
+    this.entries.set(term, results);
+    while (this.entries.size > this.size) {
+      this.entries.delete(this.entries.keys().next().value);
+    }
+  }
+
+  clear() {
+    this.entries.clear();
+  }
+}
+
+/**
+ * Returns a function that delays the calls to `fn` until `wait` milliseconds
+ * have passed without further calls for the same key
+ */
+function debounce(fn, wait, key = () => "") {
+  let timers = new Map();
+  return function (...args) {
+    let id = key(...args);
+    clearTimeout(timers.get(id));
+    timers.set(id, setTimeout(() => {
+      timers.delete(id);
+      fn.apply(this, args);
+    }, wait));
+  };
+}
+
+module.exports = { SearchCache, debounce };
@@ -0,0 +1,108 @@
+/*
+ * Age computation in ymd format ("12y 3m 4d")
+ *
+ * Mirrors `senaite.core.api.dtime.get_ymd`, that relies on dateutil's
+ * `relativedelta`. Both implementations are checked against the same vectors
+ * from `src/senaite/patient/tests/data/ymd.json`.
+ */
+
+const YMD_REGEX = /^\s*(\d+y)?\s*(\d+m)?\s*(\d+d)?\s*$/i;
+
+/**
+ * Returns a date (at midnight, local time) from a "YYYY-MM-DD" string, a Date
+ * or from year, month and day parts. Returns null if not a valid date
+ */
+function to_date(value, month, day) {
+  let year = value;
+  if (value instanceof Date) {
+    if (isNaN(value.getTime())) return null;
+    return new Date(value.getFullYear(), value.getMonth(), value.getDate());
+  }
+  if (month === undefined) {
+    let match = /^\s*(\d{4})-(\d{1,2})-(\d{1,2})/.exec(value || "");
+    if (!match) return null;
+    [year, month, day] = match.slice(1);
+  }
+  [year, month, day] = [year, month, day].map((it) => parseInt(it, 10));
+  if ([year, month, day].some(isNaN)) return null;
+  let date = new Date(year, month - 1, day);
+  // reject overflows, e.g. 2001-02-29
+  if (date.getMonth() !== month - 1 || date.getDate() !== day) return null;
+  return date;
+}
+
+function days_in_month(year, month) {
+  return new Date(year, month + 1, 0).getDate();
+}
+
+/**
+ * Adds the months to the date, clamping the day to the end of the month
+ */
+function add_months(date, months) {
+  let total = date.getFullYear() * 12 + date.getMonth() + months;
+  let year = Math.floor(total / 12);
+  let month = total - year * 12;
+  let day = Math.min(date.getDate(), days_in_month(year, month));
+  return new Date(year, month, day);
+}
+
+/**
+ * Returns the [years, months, days] elapsed from `from` to `to`, with the
+ * same semantics as relativedelta(to, from)
+ */
+function relative_delta(from, to) {
+  let sign = to >= from ? 1 : -1;
+  let months = (to.getFullYear() - from.getFullYear()) * 12
+    + to.getMonth() - from.getMonth();
+  let shifted = add_months(from, months);
+  if ((shifted - to) * sign > 0) {
+    months -= sign;
+    shifted = add_months(from, months);
+  }
+  // dates are at midnight, round to absorb DST changes
+  let days = Math.round((to - shifted) / 86400000);
+  let years = Math.trunc(months / 12);
+  return [years, months - years * 12, days];
+}
+
+/**
+ * Returns the age in ymd format of the given birthdate on the given date
+ * (defaults to today). Returns an empty string if the birthdate is not valid
+ */
+function get_ymd(birthdate, on_date) {
+  let from = to_date(birthdate);
+  let to = on_date ? to_date(on_date) : to_date(new Date());
+  if (!from || !to) return "";
+  let parts = relative_delta(from, to)
+    .map((value, idx) => value ? `${value}${"ymd"[idx]}` : "")
+    .filter((it) => it);
+  return parts.join(" ") || "0d";
+}
+
+/**
+ * Returns the date (at midnight, local time) when a period in ymd format
+ * started, counting back from the given date (defaults to today). Returns null
+ * if the period is not valid
+ */
+function get_since_date(ymd, on_date) {
+  if (!is_ymd(ymd)) return null;
+  let to = on_date ? to_date(on_date) : to_date(new Date());
+  if (!to) return null;
+  let [years, months, days] = ["y", "m", "d"].map((unit) => {
+    let match = new RegExp(`(\\d+)${unit}`, "i").exec(ymd);
+    return match ? parseInt(match[1], 10) : 0;
+  });
+  let since = add_months(to, -(years * 12 + months));
+  since.setDate(since.getDate() - days);
+  return since;
+}
+
+/**
+ * Returns whether the value is a period in ymd format
+ */
+function is_ymd(value) {
+  if (!value || !value.trim()) return false;
+  return YMD_REGEX.test(value);
+}
+
+module.exports = { to_date, relative_delta, get_ymd, get_since_date, is_ymd };
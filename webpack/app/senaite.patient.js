@@ -1,5 +1,6 @@
 import TemporaryIdentifierWidgetController from "./components/temporaryidentifierwidget.coffee"
 import AgeDoBWidgetController from "./components/agedobwidget.coffee"
+import PatientFormController from "./components/patientform.coffee"
 
 document.addEventListener("DOMContentLoaded", () => {
   console.debug("*** SENAITE PATIENT JS LOADED ***");
@@ -7,5 +8,6 @@ document.addEventListener("DOMContentLoaded", () => {
   // Initialize controllers
   window.temporary_identifier_widget = new TemporaryIdentifierWidgetController();
   window.age_dob_widget = new AgeDoBWidgetController();
+  window.patient_form = new PatientFormController();
 
 });
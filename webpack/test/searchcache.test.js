@@ -0,0 +1,32 @@
+/*
+ * Checks the cache of search results of the temporary identifier widget.
+ * Run with `npm test`
+ */
+
+const assert = require("assert");
+const { SearchCache, debounce } = require("../app/components/searchcache.js");
+
+// least recently used entries are evicted first
+let cache = new SearchCache({ size: 2 });
+cache.set("a", [1]);
+cache.set("b", [2]);
+assert.deepStrictEqual(cache.get("a"), [1]);
+cache.set("c", [3]);
+assert.strictEqual(cache.get("b"), undefined);
+assert.deepStrictEqual(cache.get("a"), [1]);
+assert.deepStrictEqual(cache.get("c"), [3]);
+
+// clearing drops all the entries
+cache.clear();
+assert.strictEqual(cache.get("a"), undefined);
+
+// only the last call per key is done
+let calls = [];
+let fn = debounce((key, value) => calls.push([key, value]), 10, (key) => key);
+fn("x", 1);
+fn("x", 2);
+fn("y", 3);
+setTimeout(() => {
+  assert.deepStrictEqual(calls, [["x", 2], ["y", 3]]);
+  console.log("searchcache: passed");
+}, 50);
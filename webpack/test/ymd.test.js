@@ -0,0 +1,40 @@
+/*
+ * Checks the client-side ymd computation against the vectors shared with the
+ * server-side doctests. Run with `npm test`
+ */
+
+const assert = require("assert");
+const path = require("path");
+const { get_ymd, get_since_date, is_ymd, to_date } = require("../app/components/ymd.js");
+
+const vectors = require(path.join(
+  __dirname, "..", "..", "src", "senaite", "patient", "tests", "data",
+  "ymd.json"));
+
+vectors.forEach((vector) => {
+  assert.strictEqual(
+    get_ymd(vector.birthdate, vector.on_date), vector.ymd,
+    `${vector.birthdate} -> ${vector.on_date}`);
+  assert.ok(is_ymd(vector.ymd), vector.ymd);
+});
+
+const iso = (date) => [
+  date.getFullYear(),
+  `0${date.getMonth() + 1}`.slice(-2),
+  `0${date.getDate()}`.slice(-2),
+].join("-");
+assert.strictEqual(iso(get_since_date("45y", "2025-05-15")), "1980-05-15");
+assert.strictEqual(iso(get_since_date("1m", "2025-03-31")), "2025-02-28");
+assert.strictEqual(iso(get_since_date("20Y 2M 14D", "2025-10-19")),
+                   "2005-08-05");
+assert.strictEqual(get_since_date("20 years", "2025-10-19"), null);
+
+assert.strictEqual(get_ymd("2001-02-29", "2025-01-01"), "");
+assert.strictEqual(get_ymd("", "2025-01-01"), "");
+assert.strictEqual(to_date(2000, 2, 29).getDate(), 29);
+assert.strictEqual(to_date(2001, 2, 29), null);
+assert.ok(is_ymd("20Y 2M 14D"));
+assert.ok(!is_ymd("20 years"));
+assert.ok(!is_ymd(""));
+
+console.log(`ymd: ${vectors.length} vectors passed`);